@@ -1,38 +1,28 @@
-import subprocess
-import json
+import os
 from strands import Agent
 from strands.models.ollama import OllamaModel
-
-# Function to list available models
-def list_available_models():
-    try:
-        result = subprocess.run(["ollama", "list"], capture_output=True, text=True, check=True)
-        print("Available models:")
-        print(result.stdout)
-        return result.stdout
-    except subprocess.CalledProcessError as e:
-        print(f"Failed to list models: {e}")
-        return None
-
-# First check what models are available
-list_available_models()
+from model_manager import get_model_manager
+from ollama_pool import HOSTS_ENV
 
 # Use a model that's likely to be available
 # model_name = "llama2"  # Change from llama3 to llama2, which is more commonly available
 model_name = "llama3.2:latest"
 
-# Ensure the model is pulled before using it
+# Make sure the model is installed (pulling it if not) and loaded before using it
+# OLLAMA_HOSTS may list several comma-separated Ollama servers; the agent uses the least busy one
+manager = get_model_manager(model_name, os.getenv(HOSTS_ENV))
 try:
-    subprocess.run(["ollama", "pull", model_name], check=True)
-    print(f"Successfully pulled {model_name} model")
-except subprocess.CalledProcessError:
-    print(f"Failed to pull {model_name} model. Make sure Ollama is running.")
+    print(f"Available models: {sorted(manager.installed_models())}")
+    manager.prepare()
+except Exception as e:
+    print(f"Failed to prepare {model_name} model: {e}. Make sure Ollama is running.")
     exit(1)
 
 # Create a configured Ollama model
 ollama_model = OllamaModel(
-    host="http://localhost:11434",
-    model_id=model_name
+    host=manager.pick().host,
+    model_id=model_name,
+    keep_alive=manager.keep_alive
 )
 
 # Create an agent with the configured model
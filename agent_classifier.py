@@ -0,0 +1,45 @@
+"""
+Stateless Agent Classification
+The Strands path of tweet classification, used when direct Ollama calls fail. A Strands Agent
+appends every prompt and answer to its message history and sends the whole history again with the
+next prompt, so a long run over the fallback path got slower with every tweet. ClassificationAgent
+clears that history before each call (or keeps a fixed window of recent turns), so every call costs
+the same, and it decides whole batches with one JSON prompt.
+"""
+
+import threading
+
+from classifier import classify_batch
+
+class ClassificationAgent:
+    """Wraps a Strands Agent so each classification prompt is sent with at most history_turns earlier turns"""
+
+    def __init__(self, agent, history_turns=0):
+        self.agent = agent
+        self.history_turns = history_turns
+        # A Strands Agent handles one invocation at a time
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def _trim_history(self):
+        messages = self.agent.messages
+        keep = messages[-2 * self.history_turns:] if self.history_turns else []
+        # A conversation has to start with a user message
+        while keep and keep[0].get("role") != "user":
+            keep = keep[1:]
+        messages[:] = keep
+
+    def __call__(self, prompt):
+        """Send one self-contained prompt and return the answer text"""
+        with self._lock:
+            self._trim_history()
+            self.calls += 1
+            return str(self.agent(prompt))
+
+    def generate(self, model=None, prompt="", **kwargs):
+        """Answer in the shape of an Ollama generate response, so classify_batch can use the agent"""
+        return {"response": self(prompt)}
+
+    def classify_many(self, tweet_texts, keywords, model_name=None):
+        """Decide a batch of tweets with one JSON prompt per (sub-)batch"""
+        return classify_batch(tweet_texts, keywords, model_name, generate=self.generate)
@@ -0,0 +1,226 @@
+"""
+Backend Selection With Circuit Breakers
+Tweets can be classified by direct Ollama calls or by the Strands agent. Instead of trying Ollama
+and falling back to the agent for every tweet, each backend gets a circuit breaker: after a few
+consecutive failures its circuit opens and calls go straight to the next backend. Once a backoff
+has passed, a single probe call is let through, and the backoff doubles each time a probe fails.
+Latency and failures are tracked per backend. While every backend is failing, calls wait for the
+next probe rather than failing one tweet after another, and when that has gone on for a while the
+run is stopped instead of quietly keeping every remaining tweet.
+"""
+
+import threading
+import time
+from collections import deque
+
+from metrics import METRICS, get_logger
+from pipeline import StopPipeline
+
+log = get_logger("backends")
+
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_BASE_BACKOFF = 1.0
+DEFAULT_MAX_BACKOFF = 60.0
+# How long every backend may fail before the run is stopped
+DEFAULT_GIVE_UP_SECONDS = 120.0
+# How often a call waiting on open circuits looks for a probe it may make
+PROBE_POLL_SECONDS = 0.05
+# Latencies kept per backend for its percentiles
+LATENCY_SAMPLES = 1000
+
+class CircuitOpenError(Exception):
+    """Raised when the circuit of every backend a call could use is open and none is due for a probe"""
+
+class BackendsUnavailable(StopPipeline):
+    """Raised when every backend has been failing for longer than the selector waits; stops the pipeline"""
+
+class CircuitBreaker:
+    """Health of one backend: closed (in use), open (skipped until its backoff ends) or probing"""
+
+    def __init__(self, name, failure_threshold=DEFAULT_FAILURE_THRESHOLD, base_backoff=DEFAULT_BASE_BACKOFF,
+                 max_backoff=DEFAULT_MAX_BACKOFF):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._lock = threading.Lock()
+        self.failures = 0
+        self.backoff = base_backoff
+        self.open_until = None
+        self.probing = False
+        self.opened = 0
+        self.calls = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    @property
+    def is_open(self):
+        return self.open_until is not None
+
+    def allow(self):
+        """Whether a call may go to this backend now; an open circuit lets one probe through after its backoff"""
+        with self._lock:
+            if self.open_until is None:
+                return True
+            if self.probing or time.monotonic() < self.open_until:
+                return False
+            self.probing = True
+            return True
+
+    def success(self, seconds):
+        with self._lock:
+            if self.open_until is not None:
+                log.info(f"Backend {self.name} is healthy again")
+            self.calls += 1
+            self.latencies.append(seconds)
+            self.failures = 0
+            self.backoff = self.base_backoff
+            self.open_until = None
+            self.probing = False
+        METRICS.observe("backend_seconds", seconds, backend=self.name)
+
+    def failure(self, seconds, error):
+        with self._lock:
+            self.calls += 1
+            self.errors += 1
+            self.failures += 1
+            if self.probing:
+                # The probe failed, so wait twice as long before the next one
+                self.backoff = min(self.backoff * 2, self.max_backoff)
+                self.probing = False
+                self.open_until = time.monotonic() + self.backoff
+            elif self.open_until is None and self.failures >= self.failure_threshold:
+                self.opened += 1
+                self.open_until = time.monotonic() + self.backoff
+                log.warning(f"Backend {self.name} failed {self.failures} times in a row ({str(error)}); "
+                            f"skipping it for {self.backoff:.0f}s")
+        METRICS.inc("backend_failures_total", backend=self.name)
+
+    def percentile(self, fraction):
+        with self._lock:
+            latencies = sorted(self.latencies)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))]
+
+    def summary(self):
+        state = "open" if self.is_open else "closed"
+        if not self.latencies:
+            return f"{self.name}: {self.calls} calls, {self.errors} failed, circuit {state}"
+        average = sum(self.latencies) / len(self.latencies)
+        return (f"{self.name}: {self.calls} calls, {self.errors} failed, {average * 1000:.1f} ms avg, "
+                f"{self.percentile(0.95) * 1000:.1f} ms p95, opened {self.opened} times, circuit {state}")
+
+class BackendSelector:
+    """Routes each call to the first backend whose circuit is closed (or due for a probe)
+
+    retry_errors are errors that show the backend is up but could not answer this call (e.g. a
+    malformed verdict); they move the call on to the next backend without counting against the
+    backend's health.
+    """
+
+    def __init__(self, failure_threshold=DEFAULT_FAILURE_THRESHOLD, base_backoff=DEFAULT_BASE_BACKOFF,
+                 max_backoff=DEFAULT_MAX_BACKOFF, give_up_seconds=DEFAULT_GIVE_UP_SECONDS, retry_errors=(ValueError,)):
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.give_up_seconds = give_up_seconds
+        self.retry_errors = retry_errors
+        self._lock = threading.Lock()
+        self.breakers = {}
+        # Since when every backend's circuit has been open, for give_up_seconds
+        self._failing_since = None
+
+    def breaker(self, name):
+        with self._lock:
+            if name not in self.breakers:
+                self.breakers[name] = CircuitBreaker(name, self.failure_threshold, self.base_backoff, self.max_backoff)
+            return self.breakers[name]
+
+    def all_open(self):
+        """Whether every backend that has been used is currently failing"""
+        with self._lock:
+            breakers = list(self.breakers.values())
+        return bool(breakers) and all(breaker.is_open for breaker in breakers)
+
+    def next_probe_in(self):
+        """Seconds until the soonest open circuit lets a probe through (0 if one is due now)"""
+        with self._lock:
+            breakers = list(self.breakers.values())
+        deadlines = [breaker.open_until for breaker in breakers if breaker.open_until is not None]
+        if not deadlines:
+            return 0.0
+        return max(0.0, min(deadlines) - time.monotonic())
+
+    def _attempt(self, attempts):
+        """Try each backend whose circuit allows a call; returns (answered, result or last error)"""
+        error = None
+        for name, function in attempts:
+            breaker = self.breaker(name)
+            if not breaker.allow():
+                continue
+            started = time.perf_counter()
+            try:
+                result = function()
+            except self.retry_errors as e:
+                breaker.success(time.perf_counter() - started)
+                error = e
+                continue
+            except Exception as e:
+                breaker.failure(time.perf_counter() - started, e)
+                log.debug(f"Backend {name} failed: {str(e)}")
+                error = e
+                continue
+            breaker.success(time.perf_counter() - started)
+            with self._lock:
+                self._failing_since = None
+            return True, result
+        return False, error
+
+    def call(self, attempts):
+        """Return the result of the first backend in attempts, a list of (name, function), that answers
+
+        While every circuit is open the call waits for the next probe instead of failing at once,
+        so a run doesn't turn its remaining tweets into errors; once every backend has been failing
+        for give_up_seconds it raises BackendsUnavailable, which stops the run.
+        """
+        last_error = None
+        while True:
+            answered, outcome = self._attempt(attempts)
+            if answered:
+                return outcome
+            last_error = outcome or last_error
+            if not self.all_open():
+                if outcome is None:
+                    raise CircuitOpenError("every backend for this call is failing; waiting for the next probe")
+                raise outcome
+            with self._lock:
+                if self._failing_since is None:
+                    self._failing_since = time.monotonic()
+                failing_for = time.monotonic() - self._failing_since
+            if failing_for >= self.give_up_seconds:
+                raise BackendsUnavailable(f"every classification backend has been failing for {failing_for:.0f}s "
+                                          f"(last error: {str(last_error) if last_error else 'circuits open'})")
+            # Another thread may hold the probe, so look again at least every PROBE_POLL_SECONDS
+            wait = min(max(self.next_probe_in(), PROBE_POLL_SECONDS), self.give_up_seconds - failing_for)
+            log.debug(f"Every backend is failing; waiting {wait:.1f}s for the next probe")
+            time.sleep(wait)
+
+    def summary(self):
+        """Describe the calls, failures and latency of every backend"""
+        with self._lock:
+            breakers = list(self.breakers.values())
+        if not breakers:
+            return "Backends: none used"
+        return "Backends: " + "; ".join(breaker.summary() for breaker in breakers)
+
+_default = None
+_default_lock = threading.Lock()
+
+def get_backend_selector():
+    """The process-wide selector for callers that don't bring their own (e.g. one-off should_delete_tweet calls)"""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = BackendSelector()
+        return _default
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Multi-Account Batch Runner
+Cleans many accounts in one go. A JSON manifest lists the accounts with their credentials,
+keywords and limits, and every account runs the twitter_cleaner pipeline in its own worker
+process with its own API clients, so each keeps its own rate-limit budget. All accounts classify
+with the same Ollama host and model (or one classification service) and share one decision
+cache, and the batch ends with one aggregated report.
+"""
+
+import argparse
+import inspect
+import json
+import logging
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+from classifier import DEFAULT_MODEL
+from decision_cache import DEFAULT_CACHE_PATH
+from model_manager import DEFAULT_HOST
+from metrics import METRICS, configure_logging
+from twitter_cleaner import CREDENTIAL_KEYS, build_classifier, delete_tweets_with_keywords, load_environment
+
+DEFAULT_WORKERS = 4
+# Set once for the whole batch, so every account shares the classification backend and the cache
+BATCH_SETTINGS = ("model_name", "ollama_host", "cache_path", "dry_run", "service_url")
+# Manifest keys that are not settings of delete_tweets_with_keywords
+ACCOUNT_KEYS = ("name", "credentials", "env_prefix")
+# Account names become part of the per-account file names
+ACCOUNT_NAME = re.compile(r"[\w.-]+")
+
+def account_settings():
+    """Names an account (or the manifest defaults) may set: the options of delete_tweets_with_keywords"""
+    names = set(inspect.signature(delete_tweets_with_keywords).parameters)
+    names |= set(inspect.signature(build_classifier).parameters)
+    return names - {"agent", "manager", "instrument", "credentials", "classifier_options"} - set(BATCH_SETTINGS)
+
+def account_credentials(account):
+    """The account's credentials, given inline or read from <env_prefix><NAME> environment variables"""
+    if "credentials" in account:
+        unknown = set(account["credentials"]) - set(CREDENTIAL_KEYS)
+        if unknown:
+            raise ValueError(f"Account {account['name']}: unknown credentials {sorted(unknown)}")
+        return dict(account["credentials"])
+    if "env_prefix" in account:
+        prefix = account["env_prefix"]
+        return {key: os.getenv(f"{prefix}{key.upper()}") for key in CREDENTIAL_KEYS}
+    raise ValueError(f"Account {account['name']} needs either credentials or env_prefix")
+
+def load_manifest(path, batch_settings):
+    """Return [(name, settings)] for every account in the manifest
+
+    Each account's settings are the manifest defaults overridden by the account's own entries, plus
+    batch_settings (model, host, cache, dry run) and a journal and sync state file of its own.
+    """
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    allowed = account_settings()
+    defaults = manifest.get("defaults", {})
+    load_environment()
+
+    accounts = []
+    for index, account in enumerate(manifest.get("accounts", [])):
+        account.setdefault("name", f"account-{index + 1}")
+        name = account["name"]
+        if not isinstance(name, str) or not ACCOUNT_NAME.fullmatch(name) or name.strip(".") == "":
+            raise ValueError(f"Account name {name!r} may only use letters, digits, '_', '-' and '.'")
+        # Names that differ only in case would share files on case-insensitive file systems
+        if any(name.lower() == other.lower() for other, _ in accounts):
+            raise ValueError(f"Account name {name} is used twice")
+        settings = {**defaults, **{key: value for key, value in account.items() if key not in ACCOUNT_KEYS}}
+        shared = set(settings) & set(BATCH_SETTINGS)
+        if shared:
+            raise ValueError(f"Account {name}: {sorted(shared)} apply to the whole batch; set them on the command line")
+        unknown = set(settings) - allowed
+        if unknown:
+            raise ValueError(f"Account {name}: unknown settings {sorted(unknown)}")
+        if not settings.get("keywords"):
+            raise ValueError(f"Account {name} has no keywords")
+        if not all(isinstance(keyword, str) and keyword.strip() for keyword in settings["keywords"]):
+            raise ValueError(f"Account {name} has a blank keyword")
+        settings.setdefault("journal_path", f".tweet_cleaner_journal.{name}.jsonl")
+        settings.setdefault("sync_state_path", f".tweet_cleaner_sync.{name}.json")
+        settings.update(batch_settings, credentials=account_credentials(account))
+        accounts.append((name, settings))
+    if not accounts:
+        raise ValueError(f"{path} lists no accounts")
+    return accounts
+
+class _PrefixedStream:
+    """Starts every line with a prefix, so the output of parallel accounts stays readable"""
+
+    def __init__(self, stream, prefix):
+        self.stream = stream
+        self.prefix = prefix
+        self._line_start = True
+
+    def write(self, text):
+        for piece in text.splitlines(keepends=True):
+            if self._line_start:
+                self.stream.write(self.prefix)
+            self.stream.write(piece)
+            self._line_start = piece.endswith("\n")
+        return len(text)
+
+    def flush(self):
+        self.stream.flush()
+
+def run_account(name, settings, log_level=logging.INFO):
+    """Clean one account; runs in a worker process and returns the run summary
+
+    Worker processes are reused for later accounts, so the prefix wraps the original stdout and
+    the metrics start empty, keeping each account's output and stage summary its own.
+    """
+    sys.stdout = _PrefixedStream(sys.__stdout__, f"[{name}] ")
+    METRICS.reset()
+    configure_logging(log_level, force=True)
+    return delete_tweets_with_keywords(**settings)
+
+def run_batch(accounts, workers=DEFAULT_WORKERS, log_level=logging.INFO):
+    """Run every account in a process pool; returns the summaries in manifest order"""
+    with ProcessPoolExecutor(max_workers=max(1, min(workers, len(accounts)))) as pool:
+        futures = [pool.submit(run_account, name, settings, log_level) for name, settings in accounts]
+        summaries = []
+        for (name, settings), future in zip(accounts, futures):
+            try:
+                summary = future.result()
+            except Exception as e:
+                # The worker itself died; the account's run summary is lost
+                summary = {"keywords": settings["keywords"], "dry_run": settings["dry_run"], "analyzed": 0,
+                           "deleted": 0, "errors": 0, "stages": [], "error": f"worker failed: {str(e)}"}
+            summaries.append({"account": name, **summary})
+    return summaries
+
+def batch_report(summaries, dry_run):
+    """Aggregate the account summaries into one report"""
+    return {
+        "finished_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "dry_run": dry_run,
+        "accounts": summaries,
+        "totals": {
+            "accounts": len(summaries),
+            "failed": sum(1 for summary in summaries if summary["error"]),
+            "analyzed": sum(summary["analyzed"] for summary in summaries),
+            "deleted": sum(summary["deleted"] for summary in summaries),
+            "errors": sum(summary["errors"] for summary in summaries),
+        },
+    }
+
+def print_report(report):
+    action = "Would delete" if report["dry_run"] else "Deleted"
+    outcome = "to delete" if report["dry_run"] else "deleted"
+    print(f"\n==== Batch report ({len(report['accounts'])} accounts) ====")
+    for summary in report["accounts"]:
+        status = f"FAILED: {summary['error']}" if summary["error"] else "ok"
+        print(f"  {summary['account']}: {summary['analyzed']} analyzed, {summary['deleted']} {outcome}, "
+              f"{summary['errors']} errors, {summary.get('elapsed_s', 0)}s ({status})")
+    totals = report["totals"]
+    print(f"\nTotal: {action} {totals['deleted']} out of {totals['analyzed']} tweets across "
+          f"{totals['accounts']} accounts ({totals['errors']} classification errors, {totals['failed']} accounts failed)")
+
+def main():
+    parser = argparse.ArgumentParser(description='Clean many Twitter accounts in parallel from a manifest')
+    parser.add_argument('--manifest', required=True, help='JSON file listing the accounts, their credentials, keywords and limits')
+    parser.add_argument('--execute', action='store_true', help='Actually delete tweets. Without this flag, every account runs in dry-run mode.')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help=f'Number of accounts cleaned at the same time (default: {DEFAULT_WORKERS})')
+    parser.add_argument('--model', default=DEFAULT_MODEL, help=f'Ollama model every account classifies with (default: {DEFAULT_MODEL})')
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f'Ollama server URL shared by every account (default: {DEFAULT_HOST})')
+    parser.add_argument('--cache', default=DEFAULT_CACHE_PATH, help=f'SQLite verdict cache shared by every account (default: {DEFAULT_CACHE_PATH})')
+    parser.add_argument('--no-cache', action='store_true', help='Classify every tweet from scratch')
+    parser.add_argument('--service', help='URL of a running classification_service.py that every account classifies with instead of loading a model per process')
+    parser.add_argument('--report', help='Save the aggregated report to this JSON file')
+    parser.add_argument('--log-level', choices=['debug', 'info', 'warning'], default='info', help='Log level of every account (default: info)')
+    args = parser.parse_args()
+
+    batch_settings = {"model_name": args.model, "ollama_host": args.host, "dry_run": not args.execute,
+                      "cache_path": None if args.no_cache else args.cache, "service_url": args.service}
+    try:
+        accounts = load_manifest(args.manifest, batch_settings)
+    except (OSError, ValueError) as e:
+        parser.error(f"Invalid manifest: {str(e)}")
+
+    mode = "dry run" if not args.execute else "deleting"
+    print(f"Cleaning {len(accounts)} accounts with {min(args.workers, len(accounts))} workers ({mode})...")
+    summaries = run_batch(accounts, args.workers, getattr(logging, args.log_level.upper()))
+    report = batch_report(summaries, not args.execute)
+    print_report(report)
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\nReport saved to {args.report}")
+    if report["totals"]["failed"]:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Cleaner Pipeline Benchmark
+Runs the classification pipeline of twitter_cleaner over a synthetic corpus against a local
+Ollama stub (or a real Ollama host) and reports throughput, per-stage latency percentiles,
+model calls per tweet and peak memory, plus how long the cleaner takes to import in a fresh
+interpreter. Results can be saved as JSON and compared with an earlier run to catch regressions.
+"""
+
+import argparse
+import json
+import math
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from cascade import DEFAULT_CASCADE_MODEL
+from classifier import DEFAULT_MODEL
+from model_manager import get_model_manager
+from ollama_stub import OllamaStub
+from pipeline import Pipeline
+from prefilter import PREFILTER_MODES
+from corpus import DEFAULT_KEYWORDS, synthetic_corpus
+from twitter_cleaner import build_classifier, read_ahead
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(q / 100 * len(sorted_values)) - 1)]
+
+class StageTimer:
+    """Collects latency samples per stage name"""
+
+    def __init__(self):
+        self.samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        with self._lock:
+            self.samples.setdefault(name, []).append(seconds)
+
+    def timed(self, name, function):
+        """Wrap function so every call is recorded under name"""
+        def call(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.record(name, time.perf_counter() - started)
+        return call
+
+    def report(self):
+        """Return {stage: {count, p50_ms, p95_ms, p99_ms}}"""
+        report = {}
+        for name, samples in self.samples.items():
+            ordered = sorted(samples)
+            report[name] = {"count": len(ordered)}
+            for q in (50, 95, 99):
+                report[name][f"p{q}_ms"] = round(percentile(ordered, q) * 1000, 3)
+        return report
+
+def peak_rss_mb():
+    """Peak resident set size of this process"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def import_time_ms(module="twitter_cleaner", runs=3):
+    """Best-of-runs cumulative import time of module in a fresh interpreter, from python -X importtime"""
+    best = None
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                                capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+        for line in result.stderr.splitlines():
+            # "import time: <self us> | <cumulative us> | <module>"
+            parts = line.split("|")
+            if len(parts) == 3 and parts[2].strip() == module:
+                cumulative = int(parts[1]) / 1000
+                best = cumulative if best is None else min(best, cumulative)
+    return round(best, 1) if best is not None else None
+
+def run_benchmark(tweets, keywords, host, model_name=DEFAULT_MODEL, concurrency=4, batch_size=10,
+                  cache=False, **classifier_options):
+    """Classify `tweets` through the cleaner's stages and return the measurements as a dict"""
+    timer = StageTimer()
+    managers = [get_model_manager(model_name, host)]
+    if classifier_options.get("cascade_model"):
+        managers.append(get_model_manager(classifier_options["cascade_model"], host, activate=False))
+    for manager in managers:
+        manager.prepare()
+        # Count and time every request the stages send to Ollama
+        manager.client.generate = timer.timed("ollama.generate", manager.client.generate)
+        manager.embed = timer.timed("ollama.embed", manager.embed)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        cache_path = os.path.join(workdir, "cache.db") if cache else None
+        classify, stages = build_classifier(None, keywords, batch_size, manager=managers[0], cache_path=cache_path,
+                                            instrument=timer.timed, **classifier_options)
+        # The cleaners' pipeline without sinks: the corpus is read ahead while batches are classified
+        pipeline = Pipeline(read_ahead(tweets, stages), classify, (), concurrency, batch_size)
+        started = time.perf_counter()
+        analyzed = pipeline.run()
+        elapsed = time.perf_counter() - started
+        summaries = [stage.summary() for stage in stages]
+        for stage in stages:
+            if hasattr(stage, "close"):
+                stage.close()
+
+    stage_report = timer.report()
+    model_calls = sum(stage_report.get(name, {}).get("count", 0) for name in ("ollama.generate", "ollama.embed"))
+    return {
+        "tweets": analyzed,
+        "deleted": pipeline.to_delete,
+        "errors": pipeline.errors,
+        "elapsed_s": round(elapsed, 3),
+        "tweets_per_sec": round(analyzed / elapsed, 2) if elapsed else 0.0,
+        "llm_calls": model_calls,
+        "llm_calls_per_tweet": round(model_calls / analyzed, 4) if analyzed else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+        "import_ms": import_time_ms(),
+        "stages": stage_report,
+        "stage_summaries": summaries,
+    }
+
+def compare_results(current, baseline, tolerance):
+    """Print current against baseline and return the metrics that got worse by more than tolerance"""
+    checks = [("tweets_per_sec", current.get("tweets_per_sec"), baseline.get("tweets_per_sec"), True),
+              ("llm_calls_per_tweet", current.get("llm_calls_per_tweet"), baseline.get("llm_calls_per_tweet"), False),
+              ("peak_rss_mb", current.get("peak_rss_mb"), baseline.get("peak_rss_mb"), False),
+              ("import_ms", current.get("import_ms"), baseline.get("import_ms"), False)]
+    for name, stats in current.get("stages", {}).items():
+        if name in baseline.get("stages", {}):
+            checks.append((f"{name} p95_ms", stats["p95_ms"], baseline["stages"][name]["p95_ms"], False))
+
+    regressions = []
+    print("\nComparison with baseline:")
+    for name, now, before, higher_is_better in checks:
+        if now is None or before is None:
+            continue
+        change = (now - before) / before if before else 0.0
+        worse = change < -tolerance if higher_is_better else change > tolerance
+        if worse:
+            regressions.append(name)
+        print(f"  {name}: {before} -> {now} ({change:+.1%}){'  REGRESSION' if worse else ''}")
+    return regressions
+
+def print_results(results):
+    print(f"\nTweets: {results['tweets']} ({results['deleted']} would be deleted, {results['errors']} errors)")
+    print(f"Throughput: {results['tweets_per_sec']} tweets/sec over {results['elapsed_s']}s")
+    print(f"Model calls: {results['llm_calls']} ({results['llm_calls_per_tweet']} per tweet)")
+    print(f"Peak RSS: {results['peak_rss_mb']} MB")
+    print(f"Import time of twitter_cleaner: {results['import_ms']} ms")
+    print("Stage latency (ms, including the stages inside it):")
+    for name, stats in results["stages"].items():
+        print(f"  {name}: n={stats['count']} p50={stats['p50_ms']} p95={stats['p95_ms']} p99={stats['p99_ms']}")
+    for summary in results["stage_summaries"]:
+        print(summary)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the tweet cleaner pipeline on a synthetic corpus')
+    parser.add_argument('--tweets', type=int, default=10000, help='Number of synthetic tweets (default: 10000)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the corpus and the stub latency')
+    parser.add_argument('--keywords', nargs='+', default=DEFAULT_KEYWORDS, help='Keywords to classify against')
+    parser.add_argument('--concurrency', type=int, default=4, help='Number of batches classified in parallel')
+    parser.add_argument('--batch-size', type=int, default=10, help='Number of tweets per model call')
+    parser.add_argument('--prefilter', choices=PREFILTER_MODES, default='hits', help='Keyword prefilter mode')
+    parser.add_argument('--triage', action='store_true', help='Enable embedding triage')
+    parser.add_argument('--cascade-model', nargs='?', const=DEFAULT_CASCADE_MODEL, help=f'Enable the model cascade with this small model (default: {DEFAULT_CASCADE_MODEL})')
+    parser.add_argument('--cache', action='store_true', help='Enable the verdict cache (fresh for every run)')
+    parser.add_argument('--dedup', action='store_true', help='Enable near-duplicate collapsing')
+    parser.add_argument('--model', default=DEFAULT_MODEL, help=f'Model name (default: {DEFAULT_MODEL})')
+    parser.add_argument('--host', help='Benchmark a real Ollama host instead of the local stub')
+    parser.add_argument('--latency-ms', type=float, default=50.0, help='Stub latency per model call')
+    parser.add_argument('--jitter-ms', type=float, default=10.0, help='Standard deviation of the stub latency')
+    parser.add_argument('--per-tweet-ms', type=float, default=5.0, help='Extra stub latency per additional tweet in a batch')
+    parser.add_argument('--output', help='Save the results to this JSON file')
+    parser.add_argument('--compare', help='Compare with the results JSON of an earlier run')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='Relative change counted as a regression (default: 0.1)')
+    args = parser.parse_args()
+
+    config = {key: value for key, value in vars(args).items() if key not in ("output", "compare", "tolerance")}
+    stub = None
+    host = args.host
+    if host is None:
+        models = [args.model] + ([args.cascade_model] if args.cascade_model else [])
+        if args.triage:
+            models.append("nomic-embed-text:latest")
+        stub = OllamaStub(models, args.latency_ms, args.jitter_ms, args.per_tweet_ms, args.seed)
+        host = stub.start()
+        print(f"Using Ollama stub at {host} ({args.latency_ms} ms ± {args.jitter_ms} ms per call)")
+
+    try:
+        results = run_benchmark(synthetic_corpus(args.tweets, args.keywords, args.seed), args.keywords, host,
+                                args.model, args.concurrency, args.batch_size, args.cache,
+                                prefilter_mode=args.prefilter, triage=args.triage, cascade_model=args.cascade_model,
+                                dedup=args.dedup)
+    finally:
+        if stub is not None:
+            stub.stop()
+    results = {"config": config, **results}
+    print_results(results)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"\nResults saved to {args.output}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_results(results, baseline, args.tolerance)
+        if regressions:
+            print(f"Regressions beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
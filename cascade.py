@@ -0,0 +1,122 @@
+"""
+Model Cascade
+A small, fast model classifies every tweet first and reports how confident it is. Only the tweets
+it is unsure about are escalated to the main model, so the obvious majority never pays the
+large model's latency. The confidence comes from the small model's JSON verdicts (the ollama
+client doesn't expose token log-probabilities).
+"""
+
+import json
+import threading
+import time
+
+from classifier import fill_undecided, parse_verdict_entries
+from metrics import get_logger
+from prompt_profile import ClassificationProfile
+
+log = get_logger("cascade")
+
+DEFAULT_CASCADE_MODEL = "llama3.2:1b"
+DEFAULT_CONFIDENCE_THRESHOLD = 0.8
+# Bump whenever CASCADE_PROMPT changes so cached verdicts from the old wording are not reused
+CASCADE_PROMPT_VERSION = 2
+# A verdict with "confidence" takes about 20 tokens; a budget cut short ends the JSON mid-verdict
+TOKENS_PER_CASCADE_VERDICT = 28
+
+CASCADE_PROMPT = """Please analyze each of the tweets listed at the end of this message and determine if it contains or relates to any of these keywords: {keywords}.
+Respond with a JSON object of the form {{"verdicts": [{{"id": <id>, "delete": true, "confidence": 0.9}}, ...]}} containing exactly one verdict for every tweet id.
+Use "delete": true if the tweet should be deleted (contains or strongly relates to any keyword), or "delete": false if it should be kept.
+Set "confidence" between 0 and 1 to how sure you are of that verdict; use a low value whenever the tweet is ambiguous.
+
+Tweets (one per line, as "<id>: <tweet text>"):
+{tweets}
+"""
+
+def build_cascade_prompt(tweet_texts, keywords):
+    """Build the small model's prompt, numbering tweets 1..N like the batch prompt"""
+    lines = "\n".join(f"{i}: {json.dumps(text, ensure_ascii=False)}" for i, text in enumerate(tweet_texts, 1))
+    return CASCADE_PROMPT.format(keywords=", ".join(keywords), tweets=lines)
+
+def parse_confident_verdicts(raw_response, count, threshold):
+    """Return one verdict per tweet: the small model's answer if confident enough, otherwise None"""
+    verdicts = [None] * count
+    for index, entry in parse_verdict_entries(raw_response, count).items():
+        confidence = entry.get("confidence")
+        if isinstance(confidence, (int, float)) and not isinstance(confidence, bool) and confidence >= threshold:
+            verdicts[index] = entry["delete"]
+    return verdicts
+
+class ModelCascade:
+    """Answers confident tweets with a small model and escalates the rest to the main model"""
+
+    def __init__(self, keywords, manager, threshold=DEFAULT_CONFIDENCE_THRESHOLD, profile=None):
+        self.keywords = keywords
+        self.manager = manager
+        self.threshold = threshold
+        # The small tier's own options and statistics, so the main model's prompt profile describes only its calls
+        self.profile = profile or ClassificationProfile(keywords)
+        self._lock = threading.Lock()
+        # Per tier: model calls, tweets sent and seconds spent
+        self.small_calls = self.small_tweets = 0
+        self.small_seconds = 0.0
+        self.large_calls = self.large_tweets = 0
+        self.large_seconds = 0.0
+        self.settled_delete = 0
+        self.settled_keep = 0
+        self.failed = 0
+
+    def first_pass(self, tweet_texts):
+        """Return True (delete), False (keep) or None (escalate) for each tweet"""
+        started = time.perf_counter()
+        try:
+            prompt = build_cascade_prompt(tweet_texts, self.keywords)
+            response = self.profile.generate(self.manager, len(tweet_texts), TOKENS_PER_CASCADE_VERDICT,
+                                             prompt=prompt, format="json")
+        finally:
+            with self._lock:
+                self.small_calls += 1
+                self.small_tweets += len(tweet_texts)
+                self.small_seconds += time.perf_counter() - started
+        return parse_confident_verdicts(response["response"], len(tweet_texts), self.threshold)
+
+    def wrap(self, classify_batch):
+        """Return a batch classifier that only hands low-confidence tweets to classify_batch"""
+        def escalate(batch):
+            started = time.perf_counter()
+            try:
+                return classify_batch(batch)
+            finally:
+                with self._lock:
+                    self.large_calls += 1
+                    self.large_tweets += len(batch)
+                    self.large_seconds += time.perf_counter() - started
+
+        def classify(batch):
+            try:
+                verdicts = self.first_pass([tweet.text for tweet in batch])
+            except Exception as e:
+                # The small model is an optimization; the main model can still decide everything
+                log.warning(f"Cascade small model failed: {str(e)}, escalating batch")
+                with self._lock:
+                    self.failed += len(batch)
+                return escalate(batch)
+            with self._lock:
+                self.settled_delete += verdicts.count(True)
+                self.settled_keep += verdicts.count(False)
+            return fill_undecided(batch, verdicts, escalate)
+        return classify
+
+    def summary(self):
+        """Describe how the work split between the two tiers"""
+        def tier(calls, tweets, seconds):
+            average = f", avg {seconds / calls * 1000:.0f} ms/call" if calls else ""
+            return f"{tweets} tweets in {calls} calls{average}"
+
+        settled = self.settled_delete + self.settled_keep
+        text = (f"Cascade settled {settled} tweets on {self.manager.model_name} "
+                f"({self.settled_delete} delete, {self.settled_keep} keep); "
+                f"small tier: {tier(self.small_calls, self.small_tweets, self.small_seconds)}; "
+                f"escalated tier: {tier(self.large_calls, self.large_tweets, self.large_seconds)}")
+        if self.failed:
+            text += f"; small model failed for {self.failed}"
+        return f"{text}; small tier prompts: {self.profile.statistics()}"
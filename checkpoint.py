@@ -0,0 +1,145 @@
+"""
+Checkpoint Journal
+An append-only JSON-lines log of a cleanup run: every fetched timeline page (with the pagination
+token that fetched it), every verdict and every completed deletion. Records are fsynced in batches,
+so after a crash, Ctrl-C or rate-limit wall a --resume run can pick up from the first page that
+still had undecided tweets, reusing the journaled verdicts instead of classifying them again.
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from classifier import fill_undecided
+from decision_cache import content_hash
+
+DEFAULT_JOURNAL_PATH = ".tweet_cleaner_journal.jsonl"
+DEFAULT_SYNC_EVERY = 50
+DEFAULT_SYNC_SECONDS = 5.0
+
+def _ends_with_newline(path):
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+class CheckpointJournal:
+    """Appends run records and fsyncs them every few records or seconds"""
+
+    def __init__(self, path=DEFAULT_JOURNAL_PATH, append=False,
+                 sync_every=DEFAULT_SYNC_EVERY, sync_seconds=DEFAULT_SYNC_SECONDS):
+        self.path = path
+        self.sync_every = sync_every
+        self.sync_seconds = sync_seconds
+        self._file = open(path, "a" if append else "w", encoding="utf-8")
+        if append and self._file.tell() and not _ends_with_newline(path):
+            # A crash cut the last record short; start the resumed run's records on a line of their own
+            self._file.write("\n")
+        self._lock = threading.Lock()
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def _append(self, record, sync=False):
+        with self._lock:
+            self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+            self._unsynced += 1
+            if sync or self._unsynced >= self.sync_every or time.monotonic() - self._last_sync >= self.sync_seconds:
+                self._sync()
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def start(self, keywords, dry_run, max_tweets):
+        """Record the settings of a new run"""
+        self._append({
+            "type": "run",
+            "keywords": list(keywords),
+            "dry_run": dry_run,
+            "max_tweets": max_tweets,
+            "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }, sync=True)
+
+    def page(self, token, next_token, tweets):
+        """Record a fetched page; used as the on_page callback of iter_user_tweets"""
+        self._append({"type": "page", "token": token, "next": next_token, "ids": [str(t.id) for t in tweets]})
+
+    def verdict(self, tweet, should_delete):
+        """Record the decision for one tweet"""
+        self._append({"type": "verdict", "id": str(tweet.id), "sha": content_hash(tweet.text), "delete": should_delete})
+
+    def deleted(self, tweet_id):
+        """Record a completed deletion; used as the on_deleted callback of DeletionScheduler"""
+        self._append({"type": "deleted", "id": str(tweet_id)})
+
+    def finish(self):
+        """Mark the run as complete so it is not resumed"""
+        self._append({"type": "done"}, sync=True)
+
+    def close(self):
+        """Flush and fsync outstanding records"""
+        with self._lock:
+            if not self._file.closed:
+                self._sync()
+                self._file.close()
+
+class JournalState:
+    """What an interrupted run had already done, read back from its journal"""
+
+    def __init__(self, path=DEFAULT_JOURNAL_PATH):
+        self.run = None
+        self.pages = []
+        self.verdicts = {}
+        self.hashes = {}
+        self.deleted = set()
+        self.done = False
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A crash may cut a record short; a resumed run's records follow it
+                    continue
+                kind = record.get("type")
+                if kind == "run" and self.run is None:
+                    self.run = record
+                elif kind == "page":
+                    self.pages.append(record)
+                elif kind == "verdict":
+                    self.verdicts[record["id"]] = record["delete"]
+                    self.hashes[record["id"]] = record["sha"]
+                elif kind == "deleted":
+                    self.deleted.add(record["id"])
+                elif kind == "done":
+                    self.done = True
+
+    def resume_point(self):
+        """Return (pagination_token, finished_ids) for the resumed fetch
+
+        pagination_token re-fetches the first page that still had undecided tweets (None means the
+        start of the timeline) and finished_ids are the tweets of the fully decided pages before it.
+        Check timeline_exhausted() first; an exhausted timeline has nothing left to fetch.
+        """
+        # A resumed run re-fetches its first page, so the same ids can appear in several page records
+        finished_ids = {}
+        for page in self.pages:
+            if any(tweet_id not in self.verdicts for tweet_id in page["ids"]):
+                return page["token"], list(finished_ids)
+            finished_ids.update(dict.fromkeys(page["ids"]))
+        return (self.pages[-1]["next"] if self.pages else None), list(finished_ids)
+
+    def timeline_exhausted(self):
+        """True when the journaled run fetched and decided every page of the timeline"""
+        return bool(self.pages) and self.pages[-1]["next"] is None and all(
+            tweet_id in self.verdicts for page in self.pages for tweet_id in page["ids"]
+        )
+
+    def known_verdicts(self, classify_batch):
+        """Return a batch classifier that reuses journaled verdicts and only classifies new tweets"""
+        def classify(batch):
+            verdicts = [self.verdicts.get(str(tweet.id)) for tweet in batch]
+            return fill_undecided(batch, verdicts, classify_batch)
+        return classify
@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""
+Classification Service
+Keeps one warm classifier in a long-running local HTTP service, so the interactive cleaner, batch
+accounts and other tools share the model, the decision cache and batched throughput instead of
+each paying for its own setup. Requests that arrive within a short batching window are coalesced
+into one batched model call; every response reports its latency and how many of its tweets were
+answered from the cache.
+
+Endpoints (JSON bodies):
+  POST /classify       {"keywords": [...], "text": "..."}    -> {"delete": true}
+  POST /classify/bulk  {"keywords": [...], "texts": [...]}   -> {"verdicts": [true, false, ...]}
+  GET  /health                                              -> service settings and counters
+  GET  /metrics                                             -> run metrics in the Prometheus text format
+"""
+
+import argparse
+import json
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib import request as urlrequest
+from urllib.error import HTTPError, URLError
+
+from classifier import DEFAULT_MODEL
+from decision_cache import DEFAULT_CACHE_PATH
+from metrics import METRICS, configure_logging, get_logger
+from model_manager import DEFAULT_HOST, get_model_manager
+from prefilter import PREFILTER_MODES
+
+log = get_logger("service")
+
+DEFAULT_PORT = 8765
+# Environment variable the cleaners read the service URL from
+SERVICE_URL_ENV = "TWEET_CLASSIFIER_URL"
+# How long the first request of a batch waits for others to join it
+DEFAULT_WINDOW_MS = 20.0
+DEFAULT_MAX_BATCH = 16
+DEFAULT_TIMEOUT = 300.0
+# Connections the server's listen backlog holds before new ones are refused (the stdlib default is 5)
+REQUEST_QUEUE_SIZE = 128
+# Attempts of a client request whose connection is refused or reset
+CONNECT_ATTEMPTS = 3
+
+def _keyword_key(keywords):
+    return tuple(sorted({keyword.strip().lower() for keyword in keywords if keyword.strip()}))
+
+class ServiceTweet:
+    """A tweet of a request, with the classifier layers it reached and the size of the batch it was decided in"""
+    __slots__ = ("id", "text", "reached", "batch_size")
+
+    def __init__(self, id, text):
+        self.id = id
+        self.text = text
+        self.reached = set()
+        self.batch_size = 0
+
+class RequestBatcher:
+    """Coalesces tweets submitted by concurrent requests into batches for one batch classifier
+
+    A worker takes the first waiting tweet, then collects more until max_batch tweets are waiting or
+    window seconds have passed, and classifies them with one classify_batch call. Several workers
+    let a new batch form while the previous one is still with the model.
+    """
+
+    def __init__(self, classify_batch, max_batch=DEFAULT_MAX_BATCH, window=DEFAULT_WINDOW_MS / 1000, workers=1):
+        self.classify_batch = classify_batch
+        self.max_batch = max_batch
+        self.window = window
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.tweets = 0
+        self.largest = 0
+        self._workers = [threading.Thread(target=self._run, name="batcher", daemon=True) for _ in range(max(1, workers))]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, tweets):
+        """Queue tweets for classification; returns one Future per tweet"""
+        futures = []
+        for tweet in tweets:
+            future = Future()
+            self._queue.put((tweet, future))
+            futures.append(future)
+        return futures
+
+    def _collect(self):
+        """Wait for a first tweet and gather a batch around it; returns (batch, stop)"""
+        item = self._queue.get()
+        if item is None:
+            return [], True
+        batch = [item]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        stop = False
+        while not stop:
+            batch, stop = self._collect()
+            if not batch:
+                continue
+            tweets = [tweet for tweet, _ in batch]
+            for tweet in tweets:
+                tweet.batch_size = len(tweets)
+            with self._lock:
+                self.batches += 1
+                self.tweets += len(tweets)
+                self.largest = max(self.largest, len(tweets))
+            METRICS.inc("service_batches_total")
+            METRICS.inc("service_tweets_total", len(tweets))
+            try:
+                verdicts = self.classify_batch(tweets)
+                if len(verdicts) != len(tweets):
+                    raise ValueError(f"Expected {len(tweets)} verdicts but got {len(verdicts)}")
+            except Exception as e:
+                log.warning(f"Error classifying a batch of {len(tweets)} tweets: {str(e)}")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), verdict in zip(batch, verdicts):
+                future.set_result(verdict)
+
+    def close(self):
+        """Finish the waiting tweets and stop the workers"""
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join()
+
+class ClassificationService:
+    """One batcher and classifier per keyword set, all sharing the model, the host and the cache file"""
+
+    def __init__(self, model_name=DEFAULT_MODEL, host=DEFAULT_HOST, max_batch=DEFAULT_MAX_BATCH,
+                 window_ms=DEFAULT_WINDOW_MS, workers=1, **classifier_options):
+        self.model_name = model_name
+        self.host = host
+        self.max_batch = max_batch
+        self.window_ms = window_ms
+        self.workers = workers
+        self.classifier_options = classifier_options
+        self.manager = get_model_manager(model_name, host)
+        self._lock = threading.Lock()
+        # keyword key -> (batcher, stages, name of the layer just inside the cache)
+        self._classifiers = {}
+        self.requests = 0
+
+    def _classifier(self, keywords):
+        key = _keyword_key(keywords)
+        if not key:
+            raise ValueError("keywords must name at least one keyword")
+        with self._lock:
+            if key not in self._classifiers:
+                from twitter_cleaner import FallbackAgent, build_classifier
+                layers = []
+
+                def instrument(name, classify):
+                    # Record which layers each tweet reached, so a response can tell cache hits apart
+                    layers.append(name)
+                    timed = METRICS.instrument(name, classify)
+                    def tracked(batch):
+                        for tweet in batch:
+                            tweet.reached.add(name)
+                        return timed(batch)
+                    return tracked
+
+                classify, stages = build_classifier(FallbackAgent(self.model_name, self.host), list(key), self.max_batch,
+                                                    manager=self.manager, instrument=instrument,
+                                                    **self.classifier_options)
+                below_cache = layers[layers.index("cache") - 1] if "cache" in layers else None
+                batcher = RequestBatcher(classify, self.max_batch, self.window_ms / 1000, self.workers)
+                self._classifiers[key] = (batcher, stages, below_cache)
+                log.info(f"Serving keywords {list(key)}")
+            return self._classifiers[key]
+
+    def classify(self, texts, keywords):
+        """Classify texts together with whatever other requests are waiting
+
+        Returns (verdicts, errors, info): verdicts has None where classification failed, errors maps
+        those positions to the error message, and info holds the cache hits and largest batch size.
+        """
+        batcher, _, below_cache = self._classifier(keywords)
+        with self._lock:
+            self.requests += 1
+        tweets = [ServiceTweet(index, text) for index, text in enumerate(texts)]
+        verdicts = []
+        errors = {}
+        for tweet, future in zip(tweets, batcher.submit(tweets)):
+            try:
+                verdicts.append(future.result())
+            except Exception as e:
+                verdicts.append(None)
+                errors[tweet.id] = str(e)
+        cache_hits = sum(1 for tweet in tweets if "cache" in tweet.reached and below_cache not in tweet.reached)
+        METRICS.inc("service_cache_hits_total", cache_hits)
+        return verdicts, errors, {"cache_hits": cache_hits, "batch_size": max((t.batch_size for t in tweets), default=0)}
+
+    def health(self):
+        with self._lock:
+            classifiers = list(self._classifiers.items())
+            requests = self.requests
+        return {
+            "status": "ok",
+            "model": self.model_name,
+            "host": self.host,
+            "max_batch": self.max_batch,
+            "window_ms": self.window_ms,
+            "requests": requests,
+            "keyword_sets": [
+                {"keywords": list(key), "batches": batcher.batches, "tweets": batcher.tweets,
+                 "largest_batch": batcher.largest, "stages": [stage.summary() for stage in stages]}
+                for key, (batcher, stages, _) in classifiers
+            ],
+        }
+
+    def close(self):
+        """Stop the batchers and close the stages (e.g. the cache)"""
+        with self._lock:
+            classifiers = list(self._classifiers.values())
+            self._classifiers.clear()
+        for batcher, stages, _ in classifiers:
+            batcher.close()
+            for stage in stages:
+                if hasattr(stage, "close"):
+                    stage.close()
+
+class ServiceHTTPServer(ThreadingHTTPServer):
+    """A threading HTTP server with a listen backlog large enough for many concurrent clients"""
+    request_queue_size = REQUEST_QUEUE_SIZE
+    daemon_threads = True
+
+def make_server(service, host="127.0.0.1", port=DEFAULT_PORT):
+    """Create the HTTP server for a ClassificationService; call serve_forever() on it"""
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, payload, status=200, headers=()):
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in headers:
+                self.send_header(name, str(value))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._reply(service.health())
+            elif self.path == "/metrics":
+                data = METRICS.prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            else:
+                self._reply({"error": "not found"}, 404)
+
+        def do_POST(self):
+            started = time.perf_counter()
+            if self.path not in ("/classify", "/classify/bulk"):
+                self._reply({"error": "not found"}, 404)
+                return
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+                keywords = body["keywords"]
+                texts = [body["text"]] if self.path == "/classify" else body["texts"]
+                if not isinstance(keywords, list) or not all(isinstance(keyword, str) for keyword in keywords):
+                    raise ValueError("keywords must be a list of strings")
+                if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+                    raise ValueError("texts must be a list of strings and text a string")
+                verdicts, errors, info = service.classify(texts, keywords)
+            except (KeyError, TypeError, ValueError) as e:
+                self._reply({"error": f"bad request: {str(e)}"}, 400)
+                return
+
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            METRICS.observe("service_request_seconds", elapsed_ms / 1000, endpoint=self.path)
+            cache = "hit" if info["cache_hits"] == len(texts) else "miss" if not info["cache_hits"] else "partial"
+            headers = [("X-Latency-Ms", f"{elapsed_ms:.1f}"), ("X-Cache", cache),
+                       ("X-Cache-Hits", info["cache_hits"]), ("X-Batch-Size", info["batch_size"])]
+            if self.path == "/classify":
+                if errors:
+                    self._reply({"error": errors[0]}, 502, headers)
+                else:
+                    self._reply({"delete": verdicts[0]}, 200, headers)
+            else:
+                payload = {"verdicts": verdicts}
+                if errors:
+                    payload["errors"] = {str(index): message for index, message in errors.items()}
+                self._reply(payload, 200, headers)
+
+        def log_message(self, format, *args):
+            pass
+
+    return ServiceHTTPServer((host, port), Handler)
+
+class ClassificationClient:
+    """Batch classifier that asks a running classification service instead of a local model
+
+    Usable wherever build_classifier's classify_batch is, and as a stage whose summary reports the
+    requests made, their latency and the service's cache hits.
+    """
+
+    def __init__(self, url, keywords, timeout=DEFAULT_TIMEOUT):
+        self.url = url.rstrip("/")
+        self.keywords = list(keywords)
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.tweets = 0
+        self.cache_hits = 0
+        self.seconds = 0.0
+
+    def _post(self, path, payload):
+        data = json.dumps(payload).encode()
+        request = urlrequest.Request(self.url + path, data=data, headers={"Content-Type": "application/json"})
+        started = time.perf_counter()
+        for attempt in range(1, CONNECT_ATTEMPTS + 1):
+            try:
+                with urlrequest.urlopen(request, timeout=self.timeout) as response:
+                    body = json.loads(response.read())
+                    cache_hits = int(response.headers.get("X-Cache-Hits") or 0)
+                break
+            except HTTPError as e:
+                raise RuntimeError(f"Classification service error {e.code}: {e.read().decode(errors='replace')}") from None
+            except (URLError, ConnectionError) as e:
+                # Classifying is idempotent, so a refused or reset connection is simply tried again
+                reason = getattr(e, "reason", e)
+                if attempt == CONNECT_ATTEMPTS or not isinstance(reason, ConnectionError):
+                    raise
+                log.debug(f"Classification service connection failed ({str(reason)}), retrying")
+                time.sleep(0.1 * attempt)
+        with self._lock:
+            self.requests += 1
+            self.cache_hits += cache_hits
+            self.seconds += time.perf_counter() - started
+        return body
+
+    def classify(self, batch):
+        """Return one verdict per tweet, raising if the service could not decide any of them"""
+        body = self._post("/classify/bulk", {"keywords": self.keywords, "texts": [tweet.text for tweet in batch]})
+        if body.get("errors"):
+            raise RuntimeError(f"Classification service failed on {len(body['errors'])} tweets: "
+                               f"{next(iter(body['errors'].values()))}")
+        with self._lock:
+            self.tweets += len(batch)
+        return body["verdicts"]
+
+    def should_delete(self, tweet_text):
+        """Classify a single text"""
+        verdict = self._post("/classify", {"keywords": self.keywords, "text": tweet_text})["delete"]
+        with self._lock:
+            self.tweets += 1
+        return verdict
+
+    def summary(self):
+        average = f"{self.seconds / self.requests * 1000:.1f} ms avg" if self.requests else "n/a"
+        return (f"Classification service ({self.url}): {self.requests} requests for {self.tweets} tweets, "
+                f"{average}, {self.cache_hits} cache hits")
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve tweet classification over HTTP with dynamic request batching')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'Port to listen on (default: {DEFAULT_PORT})')
+    parser.add_argument('--bind', default="127.0.0.1", help='Address to listen on (default: 127.0.0.1)')
+    parser.add_argument('--model', default=DEFAULT_MODEL, help=f'Ollama model that classifies tweets (default: {DEFAULT_MODEL})')
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f'Ollama server URL (default: {DEFAULT_HOST})')
+    parser.add_argument('--max-batch', type=int, default=DEFAULT_MAX_BATCH, help=f'Most tweets decided by one model call (default: {DEFAULT_MAX_BATCH})')
+    parser.add_argument('--window-ms', type=float, default=DEFAULT_WINDOW_MS, help=f'How long a request waits for others to share its model call (default: {DEFAULT_WINDOW_MS:g})')
+    parser.add_argument('--workers', type=int, default=2, help='Batches sent to the model at the same time, per keyword set (default: 2)')
+    parser.add_argument('--prefilter', choices=PREFILTER_MODES, default='hits', help='How much the keyword prefilter decides without the model (default: hits)')
+    parser.add_argument('--dedup', action='store_true', help='Classify one tweet per group of near-duplicates and give its verdict to the rest')
+    parser.add_argument('--cache', default=DEFAULT_CACHE_PATH, help=f'SQLite file for remembered verdicts (default: {DEFAULT_CACHE_PATH})')
+    parser.add_argument('--no-cache', action='store_true', help='Classify every tweet from scratch')
+    parser.add_argument('--log-level', choices=['debug', 'info', 'warning'], default='info', help='Log level (default: info)')
+    args = parser.parse_args()
+
+    configure_logging(getattr(logging, args.log_level.upper()), force=True)
+    service = ClassificationService(args.model, args.host, args.max_batch, args.window_ms, args.workers,
+                                    prefilter_mode=args.prefilter, dedup=args.dedup,
+                                    cache_path=None if args.no_cache else args.cache)
+    server = make_server(service, args.bind, args.port)
+    print(f"Loading {args.model}...")
+    service.manager.prepare()
+    print(f"Classification service listening on http://{args.bind}:{server.server_address[1]} "
+          f"(set {SERVICE_URL_ENV} to use it from the cleaners)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopping the classification service...")
+    finally:
+        server.server_close()
+        service.close()
+
+if __name__ == "__main__":
+    main()
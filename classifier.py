@@ -0,0 +1,156 @@
+"""
+Concurrent Tweet Classification
+Runs tweet classification on a bounded thread pool while yielding the results in input order,
+so the cleaners can overlap model round trips without changing what they print or delete.
+Tweets can also be packed several to a prompt and decided from one structured JSON response.
+"""
+
+import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+DEFAULT_MODEL = "llama3.2:latest"
+# Bump whenever BATCH_PROMPT changes so cached verdicts from the old wording are not reused
+BATCH_PROMPT_VERSION = 2
+
+# The tweets come last so every batch shares the instruction prefix (see prompt_profile)
+BATCH_PROMPT = """Please analyze each of the tweets listed at the end of this message and determine if it contains or relates to any of these keywords: {keywords}.
+Respond with a JSON object of the form {{"verdicts": [{{"id": <id>, "delete": true}}, ...]}} containing exactly one verdict for every tweet id.
+Use "delete": true if the tweet should be deleted (contains or strongly relates to any keyword), or "delete": false if it should be kept.
+
+Tweets (one per line, as "<id>: <tweet text>"):
+{tweets}
+"""
+
+def build_batch_prompt(tweet_texts, keywords):
+    """Build one prompt covering every tweet, numbering them 1..N so the model can reference them cheaply"""
+    lines = "\n".join(f"{i}: {json.dumps(text, ensure_ascii=False)}" for i, text in enumerate(tweet_texts, 1))
+    return BATCH_PROMPT.format(keywords=", ".join(keywords), tweets=lines)
+
+def parse_verdict_entries(raw_response, count):
+    """Return {index: verdict_entry} for every well-formed verdict object in a batch response
+
+    Raises ValueError when the response is not the expected JSON shape at all.
+    Verdicts with unknown ids, duplicate ids or non-boolean "delete" values are dropped.
+    """
+    payload = json.loads(raw_response)
+    verdicts = payload.get("verdicts") if isinstance(payload, dict) else payload
+    if not isinstance(verdicts, list):
+        raise ValueError("Batch response has no verdict list")
+
+    found = {}
+    duplicates = set()
+    for entry in verdicts:
+        if not isinstance(entry, dict) or not isinstance(entry.get("delete"), bool):
+            continue
+        try:
+            index = int(entry.get("id")) - 1
+        except (TypeError, ValueError):
+            continue
+        if not 0 <= index < count:
+            continue
+        if index in found:
+            duplicates.add(index)
+        found[index] = entry
+
+    # A tweet judged twice is ambiguous, so it gets asked about again
+    for index in duplicates:
+        del found[index]
+    return found
+
+def parse_batch_verdicts(raw_response, count):
+    """Return {index: should_delete} for every well-formed verdict in a batch response"""
+    return {index: entry["delete"] for index, entry in parse_verdict_entries(raw_response, count).items()}
+
+def classify_batch(tweet_texts, keywords, model_name=DEFAULT_MODEL, generate=None, retries=1):
+    """Decide a batch of tweets with one JSON-mode model call, splitting and retrying only malformed sub-batches"""
+    if generate is None:
+        import ollama
+        generate = ollama.generate
+    tweet_texts = list(tweet_texts)
+    if not tweet_texts:
+        return []
+
+    response = generate(model=model_name, prompt=build_batch_prompt(tweet_texts, keywords), format="json")
+    try:
+        found = parse_batch_verdicts(response['response'], len(tweet_texts))
+    except ValueError:
+        found = {}
+
+    missing = [i for i in range(len(tweet_texts)) if i not in found]
+    if missing:
+        if len(tweet_texts) == 1:
+            if retries <= 0:
+                raise ValueError("Model did not return a valid verdict for the tweet")
+            return classify_batch(tweet_texts, keywords, model_name, generate, retries - 1)
+
+        if len(missing) == len(tweet_texts):
+            # Nothing usable came back, so halve the batch and try each part on its own
+            middle = len(tweet_texts) // 2
+            return (classify_batch(tweet_texts[:middle], keywords, model_name, generate, retries)
+                    + classify_batch(tweet_texts[middle:], keywords, model_name, generate, retries))
+
+        # Only re-ask about the tweets the model skipped or mangled
+        retried = classify_batch([tweet_texts[i] for i in missing], keywords, model_name, generate, retries)
+        found.update(zip(missing, retried))
+
+    return [found[i] for i in range(len(tweet_texts))]
+
+def fill_undecided(batch, verdicts, classify_batch):
+    """Complete a partial list of verdicts (None = undecided) by classifying only the undecided tweets"""
+    undecided = [tweet for tweet, verdict in zip(batch, verdicts) if verdict is None]
+    if not undecided:
+        return verdicts
+    decided = iter(classify_batch(undecided))
+    return [next(decided) if verdict is None else verdict for verdict in verdicts]
+
+def _batches(items, batch_size):
+    """Split an iterable into lists of at most batch_size items without materializing it"""
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+def _outcomes(batch, result):
+    """Turn a batch's verdicts, fetched by calling result(), into (tweet, should_delete, error) tuples"""
+    try:
+        verdicts = result()
+        if len(verdicts) != len(batch):
+            raise ValueError(f"Expected {len(batch)} verdicts but got {len(verdicts)}")
+    except Exception as e:
+        return [(tweet, None, e) for tweet in batch]
+    return [(tweet, verdict, None) for tweet, verdict in zip(batch, verdicts)]
+
+def classify_in_order(tweets, classify_batch, concurrency=1, batch_size=1):
+    """Yield (tweet, should_delete, error) for every tweet in input order
+
+    Tweets are grouped into lists of batch_size and classify_batch(batch) must return one verdict
+    per tweet. Up to `concurrency` batches are classified at once.
+    """
+    if concurrency <= 1:
+        for batch in _batches(tweets, batch_size):
+            yield from _outcomes(batch, lambda: classify_batch(batch))
+        return
+
+    # Keep the in-flight window bounded so a long timeline is never queued all at once
+    window = 2 * concurrency
+    pending = deque()
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="classify")
+    try:
+        for batch in _batches(tweets, batch_size):
+            pending.append((batch, executor.submit(classify_batch, batch)))
+            if len(pending) >= window:
+                done, future = pending.popleft()
+                yield from _outcomes(done, future.result)
+
+        while pending:
+            done, future = pending.popleft()
+            yield from _outcomes(done, future.result)
+    finally:
+        # The consumer may stop early (e.g. missing write permissions), so drop queued work
+        for _, future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
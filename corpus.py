@@ -0,0 +1,51 @@
+"""
+Synthetic Tweet Corpus
+Reproducible fake timelines for the benchmark and the Twitter API simulator, extending the idea
+of MOCK_TWEETS to any size. Tweets are generated lazily, so even a million of them stream in
+constant memory.
+"""
+
+import random
+from collections import deque
+from datetime import datetime, timedelta, timezone
+
+from twitter_archive import ArchiveTweet
+
+DEFAULT_KEYWORDS = ["politics", "sports", "complaint"]
+# The newest synthetic tweet; older ones follow every 37 minutes
+NEWEST_TWEET_AT = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+# Phrases that mention a keyword literally, as a hashtag, or only by topic
+RELATED = [
+    "Can't believe the {kw} news today", "So much {kw} on my feed lately", "Another day, another #{kw} thread",
+    "Hot take on {kw}: nobody asked", "Thoughts on the latest {kw} debate?",
+    "The election coverage is exhausting", "What a match last night, incredible finish",
+    "Terrible customer service again, still waiting for a refund",
+]
+UNRELATED = [
+    "Just had the best coffee at my local cafe", "Working on a new project, excited to share soon",
+    "Beautiful sunset at the beach today", "Happy birthday to my best friend", "Finished a great book this weekend",
+    "Trying out a new pasta recipe tonight", "Morning run done, feeling great", "New blog post is up, link in bio",
+    "Rainy days are for movies and tea", "Learning Rust one compiler error at a time",
+]
+EXTRAS = ["", " 🙂", " Anyway.", " What do you think?", " #weekend", " https://example.com/post", " (long story)",
+          " Honestly it has been one of those weeks where everything takes twice as long as it should."]
+
+def synthetic_corpus(count, keywords=DEFAULT_KEYWORDS, seed=0, related_share=0.3, duplicate_share=0.1):
+    """Yield `count` reproducible tweets, newest first, generated lazily so a million of them fit in memory
+
+    About related_share of them concern a keyword and duplicate_share repeat a recent tweet word for word.
+    """
+    rng = random.Random(seed)
+    recent = deque(maxlen=1000)
+    for i in range(count):
+        if recent and rng.random() < duplicate_share:
+            text = rng.choice(recent)
+        else:
+            if rng.random() < related_share:
+                text = rng.choice(RELATED).format(kw=rng.choice(keywords))
+            else:
+                text = rng.choice(UNRELATED)
+            text += rng.choice(EXTRAS) + f" #{i % 997}"
+            recent.append(text)
+        yield ArchiveTweet(10**18 - i, text, NEWEST_TWEET_AT - timedelta(minutes=37 * i))
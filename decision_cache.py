@@ -0,0 +1,151 @@
+"""
+Decision Cache
+Remembers keep/delete verdicts in a local SQLite database so reruns, and the execute pass that
+follows a dry run, don't classify the same tweets again. Entries are keyed by a hash of the
+tweet text plus a hash of everything else that shapes the verdict: the keyword set, the model
+and the prompt template version.
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+
+from classifier import fill_undecided
+
+DEFAULT_CACHE_PATH = ".tweet_cleaner_cache.db"
+DEFAULT_MAX_ENTRIES = 100_000
+DEFAULT_MAX_AGE_DAYS = 30
+
+def content_hash(tweet_text):
+    """Hash the tweet text with whitespace normalized"""
+    return hashlib.sha256(" ".join(tweet_text.split()).encode("utf-8")).hexdigest()
+
+def context_hash(keywords, model_name, prompt_version, *extra):
+    """Hash everything besides the text that a verdict depends on"""
+    keyword_set = sorted({k.strip().lower() for k in keywords if k.strip()})
+    parts = ["\x1f".join(keyword_set), model_name, str(prompt_version)] + [str(e) for e in extra]
+    return hashlib.sha256("\x1e".join(parts).encode("utf-8")).hexdigest()
+
+class DecisionCache:
+    """SQLite-backed verdict store with size/age eviction and hit/miss stats"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES, max_age_days=DEFAULT_MAX_AGE_DAYS):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age_days * 86400 if max_age_days else None
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        # WAL lets several cleaner processes share one cache file
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS decisions (
+                content_hash TEXT NOT NULL,
+                context_hash TEXT NOT NULL,
+                should_delete INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (content_hash, context_hash)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS decisions_last_used ON decisions (last_used)")
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evicted = 0
+        # The context of the classifier this cache wraps, for undecided()
+        self.context = None
+        self.evict()
+
+    def get_many(self, hashes, context, touch=True):
+        """Return {content_hash: should_delete} for the hashes already decided in this context
+
+        touch=False only looks, without marking the entries as recently used.
+        """
+        hashes = list(dict.fromkeys(hashes))
+        if not hashes:
+            return {}
+        now = time.time()
+        with self._lock:
+            placeholders = ",".join("?" * len(hashes))
+            rows = self._conn.execute(
+                f"SELECT content_hash, should_delete, created_at FROM decisions "
+                f"WHERE context_hash = ? AND content_hash IN ({placeholders})",
+                [context] + hashes
+            ).fetchall()
+            found = {h: bool(d) for h, d, created in rows if not self.max_age or now - created <= self.max_age}
+            if found and touch:
+                self._conn.executemany(
+                    "UPDATE decisions SET last_used = ? WHERE content_hash = ? AND context_hash = ?",
+                    [(now, h, context) for h in found]
+                )
+                self._conn.commit()
+        return found
+
+    def put_many(self, verdicts, context):
+        """Store {content_hash: should_delete} verdicts for this context"""
+        if not verdicts:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO decisions VALUES (?, ?, ?, ?, ?)",
+                [(h, context, int(d), now, now) for h, d in verdicts.items()]
+            )
+            self._conn.commit()
+            self.writes += len(verdicts)
+
+    def evict(self):
+        """Drop entries older than max_age and the least recently used ones beyond max_entries"""
+        with self._lock:
+            removed = 0
+            if self.max_age:
+                removed += self._conn.execute(
+                    "DELETE FROM decisions WHERE created_at < ?", (time.time() - self.max_age,)
+                ).rowcount
+            if self.max_entries:
+                removed += self._conn.execute(
+                    "DELETE FROM decisions WHERE rowid IN ("
+                    "SELECT rowid FROM decisions ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                ).rowcount
+            self._conn.commit()
+            self.evicted += removed
+        return removed
+
+    def wrap(self, classify_batch, context):
+        """Return a batch classifier that answers from the cache and only classifies misses"""
+        self.context = context
+
+        def classify(batch):
+            hashes = [content_hash(tweet.text) for tweet in batch]
+            found = self.get_many(hashes, context)
+            verdicts = [found.get(h) for h in hashes]
+            with self._lock:
+                self.hits += len(batch) - verdicts.count(None)
+                self.misses += verdicts.count(None)
+            verdicts = fill_undecided(batch, verdicts, classify_batch)
+            self.put_many({h: v for h, v in zip(hashes, verdicts) if h not in found}, context)
+            return verdicts
+        return classify
+
+    def undecided(self, tweets):
+        """The tweets this cache has no verdict for, without counting hits or misses (see SemanticTriage.lookahead)"""
+        if self.context is None:
+            return list(tweets)
+        found = self.get_many([content_hash(tweet.text) for tweet in tweets], self.context, touch=False)
+        return [tweet for tweet in tweets if content_hash(tweet.text) not in found]
+
+    def summary(self):
+        """Describe how much classification the cache saved"""
+        lookups = self.hits + self.misses
+        rate = f"{100 * self.hits / lookups:.0f}%" if lookups else "n/a"
+        return (f"Decision cache ({self.path}): {self.hits} hits, {self.misses} misses ({rate} hit rate), "
+                f"{self.writes} stored, {self.evicted} evicted")
+
+    def close(self):
+        """Apply eviction limits and close the database"""
+        self.evict()
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,231 @@
+"""
+Near-Duplicate Collapsing
+Timelines repeat themselves: retweet boilerplate, templated promos and the same link with different
+tracking parameters. Tweets are normalized (links, tracking parameters, "RT @user:" prefixes,
+numbers and whitespace) and grouped with SimHash fingerprints, so each group of near-duplicates is
+classified once and its verdict is given to every member. Fingerprints are split into bands and
+indexed by band, so finding a tweet's group costs a few dictionary lookups instead of comparing it
+with every group seen so far. Only the most recently seen groups are kept, so a long-running
+classification service holds a bounded number of groups and verdicts.
+"""
+
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from classifier import fill_undecided
+
+FINGERPRINT_BITS = 64
+# Fingerprints this many bits apart (or fewer) are near-duplicates; at most BANDS - 1 so they share a band
+DEFAULT_MAX_DISTANCE = 3
+BANDS = 4
+# Shorter texts only group with exact (normalized) copies, since a few words give unstable fingerprints
+MIN_SHINGLES = 4
+SHINGLE_WORDS = 3
+# Largest groups listed in the summary
+REPORT_GROUPS = 5
+# Groups kept before the least recently seen one is forgotten
+DEFAULT_MAX_GROUPS = 50_000
+
+_RETWEET = re.compile(r"^rt\s+@\w+:?\s*", re.IGNORECASE)
+_URL = re.compile(r"https?://\S+", re.IGNORECASE)
+_NUMBER = re.compile(r"\d+")
+_WORD = re.compile(r"[#@]?\w+")
+# Query parameters that only track where a click came from
+_TRACKING = re.compile(r"^(utm_\w+|fbclid|gclid|dclid|mc_\w+|igshid|si|s|t|ref|ref_src|ref_url|cmpid)$", re.IGNORECASE)
+
+def _normalize_url(match):
+    parts = urlsplit(match.group(0).rstrip(".,!?)"))
+    host = parts.netloc.lower().removeprefix("www.")
+    # t.co wraps every link in a different short URL, so they say nothing about the target
+    if host == "t.co":
+        return "<link>"
+    query = urlencode([(key, value) for key, value in parse_qsl(parts.query) if not _TRACKING.match(key)])
+    return host + parts.path.rstrip("/") + (f"?{query}" if query else "")
+
+def normalize(tweet_text):
+    """Lowercase text without retweet prefixes, tracking parameters, distinct numbers or extra whitespace"""
+    text = _RETWEET.sub("", tweet_text.strip())
+    text = _URL.sub(_normalize_url, text)
+    text = _NUMBER.sub("0", text.lower())
+    return " ".join(text.split())
+
+def _hash64(token):
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "big")
+
+def simhash(words):
+    """64-bit SimHash over word shingles; similar texts get fingerprints a few bits apart"""
+    shingles = [" ".join(words[i:i + SHINGLE_WORDS]) for i in range(max(1, len(words) - SHINGLE_WORDS + 1))]
+    weights = [0] * FINGERPRINT_BITS
+    for shingle in shingles:
+        value = _hash64(shingle)
+        for bit in range(FINGERPRINT_BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+def _bands(fingerprint):
+    width = FINGERPRINT_BITS // BANDS
+    mask = (1 << width) - 1
+    return [(band, fingerprint >> (band * width) & mask) for band in range(BANDS)]
+
+class DuplicateGroup:
+    """Tweets that normalize to the same or nearly the same text, and the verdict of their representative
+
+    pending is a Future for the verdict while a batch is classifying the representative.
+    """
+    __slots__ = ("fingerprint", "text", "keys", "size", "verdict", "decided_at", "pending")
+
+    def __init__(self, fingerprint, text):
+        self.fingerprint = fingerprint
+        self.text = text
+        # Normalized texts that map to this group
+        self.keys = []
+        self.size = 0
+        self.verdict = None
+        self.decided_at = None
+        self.pending = None
+
+class NearDuplicateFilter:
+    """Classifies one representative per group of near-duplicate tweets and fans its verdict out
+
+    At most max_groups groups are kept, least recently seen first out, and a group's verdict is
+    reused for at most max_age seconds (default: for the filter's lifetime), like a cached verdict.
+    """
+
+    def __init__(self, max_distance=DEFAULT_MAX_DISTANCE, max_groups=DEFAULT_MAX_GROUPS, max_age=None):
+        if not 0 <= max_distance < BANDS:
+            raise ValueError(f"max_distance must be between 0 and {BANDS - 1}")
+        self.max_distance = max_distance
+        self.max_groups = max_groups
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._exact = {}
+        self._bands = {}
+        # Groups in the order they were last seen, oldest first
+        self.groups = OrderedDict()
+        self.evicted = 0
+        self.tweets = 0
+        self.fanned_out = 0
+        self.classified = 0
+        self.waited = 0
+
+    def _forget(self, group):
+        """Drop a group from the indexes; call with _lock held"""
+        del self.groups[id(group)]
+        for key in group.keys:
+            del self._exact[key]
+        if group.fingerprint is not None:
+            for key in _bands(group.fingerprint):
+                members = self._bands[key]
+                members.remove(group)
+                if not members:
+                    del self._bands[key]
+
+    def group(self, tweet_text):
+        """The group a tweet belongs to, created if it is the first of its kind; call with _lock held"""
+        text = normalize(tweet_text)
+        if text in self._exact:
+            group = self._exact[text]
+            self.groups.move_to_end(id(group))
+            return group
+        words = _WORD.findall(text)
+        group = None
+        fingerprint = None
+        if len(words) - SHINGLE_WORDS + 1 >= MIN_SHINGLES:
+            fingerprint = simhash(words)
+            # Two fingerprints at most BANDS - 1 bits apart agree on at least one whole band
+            for key in _bands(fingerprint):
+                for candidate in self._bands.get(key, ()):
+                    if bin(candidate.fingerprint ^ fingerprint).count("1") <= self.max_distance:
+                        group = candidate
+                        break
+                if group is not None:
+                    break
+        if group is None:
+            group = DuplicateGroup(fingerprint, tweet_text)
+            self.groups[id(group)] = group
+            if fingerprint is not None:
+                for key in _bands(fingerprint):
+                    self._bands.setdefault(key, []).append(group)
+            while len(self.groups) > self.max_groups:
+                self._forget(next(iter(self.groups.values())))
+                self.evicted += 1
+        else:
+            self.groups.move_to_end(id(group))
+        group.keys.append(text)
+        self._exact[text] = group
+        return group
+
+    def wrap(self, classify_batch):
+        """Return a batch classifier that sends one tweet per undecided group to classify_batch"""
+        def classify(batch):
+            # Per group: its known verdict, the tweet this batch classifies for it, or the verdict it waits for
+            known = {}
+            representatives = {}
+            waiting = {}
+            with self._lock:
+                groups = [self.group(tweet.text) for tweet in batch]
+                now = time.monotonic()
+                for tweet, group in zip(batch, groups):
+                    group.size += 1
+                    if group.verdict is not None and self.max_age is not None and now - group.decided_at > self.max_age:
+                        group.verdict = None
+                    if group.verdict is not None:
+                        known[id(group)] = group.verdict
+                        continue
+                    if id(group) in representatives or id(group) in waiting:
+                        continue
+                    if group.pending is None:
+                        # Only the first member of each undecided group is classified
+                        group.pending = Future()
+                        representatives[id(group)] = (group, tweet, group.pending)
+                    else:
+                        # Another batch is classifying this group's representative right now
+                        waiting[id(group)] = group.pending
+                self.tweets += len(batch)
+
+            tweets = [tweet for _, tweet, _ in representatives.values()]
+            try:
+                verdicts = fill_undecided(tweets, [None] * len(tweets), classify_batch)
+            except Exception as e:
+                with self._lock:
+                    for group, _, pending in representatives.values():
+                        group.pending = None
+                        pending.set_exception(e)
+                raise
+            with self._lock:
+                now = time.monotonic()
+                for (group, _, pending), verdict in zip(representatives.values(), verdicts):
+                    group.verdict = verdict
+                    group.decided_at = now
+                    group.pending = None
+                    pending.set_result(verdict)
+                self.classified += len(tweets)
+                self.fanned_out += len(batch) - len(tweets)
+                self.waited += len(waiting)
+
+            # A representative that failed elsewhere fails its waiting members too, as if they had been in that batch
+            known.update((key, pending.result()) for key, pending in waiting.items())
+            known.update(zip(representatives, verdicts))
+            return [known[id(group)] for group in groups]
+        return classify
+
+    def summary(self):
+        """Describe how many tweets the groups saved and list the largest groups"""
+        with self._lock:
+            largest = sorted((group for group in self.groups.values() if group.size > 1),
+                             key=lambda g: -g.size)[:REPORT_GROUPS]
+            lines = [f"Near-duplicates: {self.tweets} tweets in {len(self.groups) + self.evicted} groups; "
+                     f"{self.classified} classified, {self.fanned_out} took the verdict of their group"]
+            if self.waited:
+                lines[0] += f" ({self.waited} waited for a verdict still being decided)"
+            if self.evicted:
+                lines[0] += f"; {self.evicted} least recently seen groups forgotten"
+            for group in largest:
+                action = "delete" if group.verdict else "keep"
+                lines.append(f"  {group.size} x ({action}) {group.text[:60]!r}")
+        return "\n".join(lines)
@@ -0,0 +1,73 @@
+"""
+Deletion Plan
+A dry run can save the tweets it would delete to a small JSON file. Execute mode then deletes
+straight from that file, with no timeline fetch and no classification. Each entry keeps a hash of
+the tweet text, so the plan can optionally be checked for tweets that changed since the dry run.
+"""
+
+import json
+import os
+from datetime import datetime, timezone
+
+from decision_cache import content_hash
+
+PLAN_VERSION = 1
+# get_tweets accepts up to 100 ids per request
+LOOKUP_CHUNK = 100
+
+class DeletionPlan:
+    """Tweets a dry run chose for deletion, plus the settings that chose them"""
+
+    def __init__(self, keywords, model_name, created_at=None, analyzed=0, tweets=None):
+        self.keywords = list(keywords)
+        self.model_name = model_name
+        self.created_at = created_at or datetime.now(timezone.utc).isoformat(timespec="seconds")
+        self.analyzed = analyzed
+        self.tweets = tweets or []
+
+    def add(self, tweet):
+        """Record a tweet the dry run decided to delete"""
+        self.add_hashed(tweet.id, content_hash(tweet.text))
+
+    def add_hashed(self, tweet_id, text_sha256):
+        """Record a tweet to delete whose text is only known by its hash (e.g. from a checkpoint journal)"""
+        self.tweets.append({"id": str(tweet_id), "text_sha256": text_sha256})
+
+    def save(self, path):
+        """Write the plan atomically so an interrupted dry run never leaves half a plan behind"""
+        payload = {
+            "plan_version": PLAN_VERSION,
+            "created_at": self.created_at,
+            "model": self.model_name,
+            "keywords": self.keywords,
+            "analyzed": self.analyzed,
+            "tweets": self.tweets,
+        }
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Read a plan written by save()"""
+        with open(path, encoding="utf-8") as f:
+            payload = json.load(f)
+        if payload.get("plan_version") != PLAN_VERSION:
+            raise ValueError(f"Unsupported deletion plan version: {payload.get('plan_version')}")
+        return cls(payload["keywords"], payload["model"], payload["created_at"],
+                   payload.get("analyzed", 0), payload["tweets"])
+
+    def find_stale(self, client):
+        """Return {tweet_id: reason} for planned tweets that are gone or whose text changed"""
+        stale = {}
+        for start in range(0, len(self.tweets), LOOKUP_CHUNK):
+            chunk = self.tweets[start:start + LOOKUP_CHUNK]
+            response = client.get_tweets(ids=[entry["id"] for entry in chunk], tweet_fields=["text"])
+            current = {str(tweet.id): tweet.text for tweet in response.data or []}
+            for entry in chunk:
+                if entry["id"] not in current:
+                    stale[entry["id"]] = "no longer exists"
+                elif content_hash(current[entry["id"]]) != entry["text_sha256"]:
+                    stale[entry["id"]] = "text changed since the dry run"
+        return stale
@@ -0,0 +1,246 @@
+"""
+Deletion Scheduler
+Issues tweet deletions from a small pool of worker threads, pacing them with a token bucket per
+API endpoint that is kept in sync with the x-rate-limit-* response headers. Deletions are queued
+without blocking, so classification keeps running while deletes wait for rate-limit budget.
+"""
+
+import math
+import queue
+import threading
+import time
+from datetime import datetime
+
+from metrics import AUDIT, METRICS, get_logger
+
+log = get_logger("deletion_scheduler")
+
+DEFAULT_DELETE_CONCURRENCY = 4
+# Twitter API v2 allows 50 deletions per user per 15 minutes until headers say otherwise
+DEFAULT_DELETE_LIMIT = 50
+DEFAULT_WINDOW_SECONDS = 15 * 60
+
+_STOP = object()
+
+class RateLimitBucket:
+    """Token bucket for one endpoint, refilled when its rate-limit window resets"""
+
+    def __init__(self, limit=DEFAULT_DELETE_LIMIT, window_seconds=DEFAULT_WINDOW_SECONDS):
+        self.limit = limit
+        self.window_seconds = window_seconds
+        # Unknown until the first response; until then only one request is let through as a probe
+        self.remaining = None
+        self.reset_at = None
+        self.in_flight = 0
+        self._condition = threading.Condition()
+
+    def _refill(self, now):
+        if self.reset_at is not None and now >= self.reset_at:
+            self.remaining = self.limit
+            self.reset_at = None
+
+    def acquire(self, stop=None):
+        """Block until a request may be sent; returns False if stop was set while waiting"""
+        with self._condition:
+            while not (stop is not None and stop.is_set()):
+                now = time.time()
+                self._refill(now)
+                if self.remaining is None:
+                    if self.in_flight == 0:
+                        break
+                    wait = None
+                elif self.remaining > 0:
+                    self.remaining -= 1
+                    break
+                else:
+                    wait = max(0.0, (self.reset_at or now + self.window_seconds) - now)
+                self._condition.wait(timeout=min(wait, 1.0) if wait is not None else 1.0)
+            else:
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self, headers=None, limited=False):
+        """Return an in-flight slot and sync the budget with the response's rate-limit headers"""
+        with self._condition:
+            self.in_flight -= 1
+            headers = headers or {}
+            if "x-rate-limit-limit" in headers:
+                self.limit = int(headers["x-rate-limit-limit"])
+            if "x-rate-limit-reset" in headers:
+                self.reset_at = float(headers["x-rate-limit-reset"])
+            if limited:
+                self.remaining = 0
+                if self.reset_at is None:
+                    self.reset_at = time.time() + self.window_seconds
+            elif "x-rate-limit-remaining" in headers:
+                # The server hasn't counted requests that are still in flight yet
+                self.remaining = max(0, int(headers["x-rate-limit-remaining"]) - self.in_flight)
+            elif self.remaining is None:
+                self.remaining = max(0, self.limit - 1 - self.in_flight)
+            self._condition.notify_all()
+
+    def exhausted_until(self):
+        """Return the reset time if the budget is used up, otherwise None"""
+        with self._condition:
+            return self.reset_at if self.remaining == 0 else None
+
+    def projected_completion(self, pending):
+        """Estimate when `pending` more requests will have been sent under the current budget"""
+        with self._condition:
+            now = time.time()
+            available = self.limit if self.remaining is None else self.remaining
+            if pending <= available:
+                return now
+            windows = math.ceil((pending - available) / max(1, self.limit))
+            first_reset = self.reset_at or now + self.window_seconds
+            return first_reset + (windows - 1) * self.window_seconds
+
+class DeletionScheduler:
+    """Deletes tweets concurrently within the rate-limit budget reported by the API"""
+
+    def __init__(self, client, concurrency=DEFAULT_DELETE_CONCURRENCY, on_deleted=None):
+        self.client = client
+        self.on_deleted = on_deleted
+        self.buckets = {}
+        self._buckets_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._stop = threading.Event()
+        self._progress = threading.Condition()
+        self.pending = 0
+        self.deleted = 0
+        self.failed = 0
+        # Set to the error message when the app lacks write access; nothing else can succeed then
+        self.fatal = None
+        self._waiting_reported = False
+        self._workers = [
+            threading.Thread(target=self._work, name=f"delete-{i}", daemon=True)
+            for i in range(max(1, concurrency))
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def bucket(self, endpoint):
+        """Return the token bucket for an endpoint, creating it on first use"""
+        with self._buckets_lock:
+            if endpoint not in self.buckets:
+                self.buckets[endpoint] = RateLimitBucket()
+            return self.buckets[endpoint]
+
+    def submit(self, tweet_id, tweet_text=None):
+        """Queue a tweet for deletion without waiting for it"""
+        with self._progress:
+            self.pending += 1
+        self._queue.put((tweet_id, tweet_text))
+
+    def _work(self):
+        bucket = self.bucket("DELETE /2/tweets/:id")
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            outcome = "failed"
+            try:
+                outcome = self._delete(bucket, *item)
+            except Exception as e:
+                log.warning(f"Error deleting tweet {item[0]}: {str(e)}")
+            finally:
+                # Every item that is not queued again is finished, or close() would wait for it forever
+                if outcome is not None:
+                    self._finish(failed=outcome != "deleted")
+
+    def _delete(self, bucket, tweet_id, tweet_text):
+        """Send one deletion; returns "deleted", "failed" or None when it was queued again"""
+        import tweepy
+        if self._stop.is_set():
+            return "failed"
+
+        self._report_wait(bucket)
+        if not bucket.acquire(self._stop):
+            return "failed"
+        try:
+            with METRICS.timer("stage_seconds", stage="delete"):
+                response = self.client.request("DELETE", f"/2/tweets/{tweet_id}", user_auth=True)
+        except tweepy.errors.TooManyRequests as e:
+            bucket.release(e.response.headers, limited=True)
+            METRICS.inc("deletions_total", result="rate_limited")
+            # Try again once the window resets
+            self._queue.put((tweet_id, tweet_text))
+            return None
+        except tweepy.errors.NotFound as e:
+            # Already gone, e.g. deleted by an interrupted run or by hand since the plan was made
+            bucket.release(e.response.headers)
+            log.info(f"Tweet already deleted (ID: {tweet_id})", extra=AUDIT)
+            self._deleted(tweet_id)
+            return "deleted"
+        except Exception as e:
+            bucket.release(getattr(getattr(e, "response", None), "headers", None))
+            error_msg = str(e)
+            if "oauth1 app permissions" in error_msg.lower():
+                self.fatal = error_msg
+                self._stop.set()
+            else:
+                log.warning(f"Error deleting tweet: {error_msg}")
+            return "failed"
+
+        bucket.release(response.headers)
+        log.info(f"Deleted tweet (ID: {tweet_id})" + (f": {tweet_text}" if tweet_text is not None else ""),
+                 extra=AUDIT)
+        self._deleted(tweet_id)
+        return "deleted"
+
+    def _deleted(self, tweet_id):
+        """Report a deletion to on_deleted; the tweet is gone either way, so a failing callback only warns"""
+        if not self.on_deleted:
+            return
+        try:
+            self.on_deleted(tweet_id)
+        except Exception as e:
+            log.warning(f"Could not record the deletion of tweet {tweet_id}: {str(e)}")
+
+    def _finish(self, failed):
+        METRICS.inc("deletions_total", result="failed" if failed else "deleted")
+        with self._progress:
+            self.pending -= 1
+            if failed:
+                self.failed += 1
+            else:
+                self.deleted += 1
+            self._progress.notify_all()
+
+    def _report_wait(self, bucket):
+        """Say once per window when deletions are paused for rate-limit budget"""
+        reset_at = bucket.exhausted_until()
+        if reset_at is not None and not self._waiting_reported:
+            self._waiting_reported = True
+            resume = datetime.fromtimestamp(reset_at).strftime("%H:%M:%S")
+            log.info(f"Delete rate limit reached; resuming at {resume}. {self.eta_message()}")
+        elif reset_at is None:
+            self._waiting_reported = False
+
+    def projected_completion(self):
+        """Estimated wall-clock time when every queued deletion will have been sent"""
+        return self.bucket("DELETE /2/tweets/:id").projected_completion(self.pending)
+
+    def eta_message(self):
+        """Human-readable progress and projected completion time"""
+        finish = datetime.fromtimestamp(self.projected_completion()).strftime("%Y-%m-%d %H:%M:%S")
+        return f"{self.pending} deletions queued, projected completion {finish}"
+
+    def close(self, cancel=False):
+        """Wait for queued deletions to finish and stop the workers
+
+        With cancel=True (e.g. on Ctrl-C) deletions that have not been sent yet are dropped.
+        """
+        if cancel:
+            self._stop.set()
+        elif self.pending:
+            print(f"Waiting for deletions to finish: {self.eta_message()}")
+        # Rate-limited deletions are re-queued, so wait for the work itself rather than the queue
+        with self._progress:
+            while self.pending:
+                self._progress.wait()
+        for _ in self._workers:
+            self._queue.put(_STOP)
+        for worker in self._workers:
+            worker.join()
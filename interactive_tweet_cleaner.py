@@ -5,10 +5,15 @@ This script provides an interactive interface to delete tweets based on keywords
 """
 
 import os
-from twitter_cleaner import authenticate_twitter, setup_ai_agent, delete_tweets_with_keywords
+from classification_service import SERVICE_URL_ENV
+from model_manager import get_model_manager
+from twitter_cleaner import authenticate_twitter, load_environment, delete_tweets_with_keywords, execute_deletion_plan
+
+PLAN_PATH = "deletion_plan.json"
 
 def check_twitter_credentials():
     """Check if Twitter API credentials are configured"""
+    load_environment()
     required_vars = [
         "TWITTER_CONSUMER_KEY", 
         "TWITTER_CONSUMER_SECRET",
@@ -68,10 +73,15 @@ def interactive_tweet_deletion():
         user = client.get_me().data
         print(f"Successfully authenticated as @{user.username}")
         
-        # Set up AI agent
-        print("\nSetting up AI agent...")
-        agent = setup_ai_agent()
-        print("AI agent ready")
+        # A running classification service already has its model loaded
+        service_url = os.getenv(SERVICE_URL_ENV)
+        if service_url:
+            print(f"\nClassifying with the service at {service_url}")
+        else:
+            # Make sure the model is installed and loaded; the Strands agent is only set up if direct calls fail
+            print("\nPreparing the model...")
+            get_model_manager().prepare()
+            print("Model ready")
         
         # Get keywords from user
         keywords = get_user_keywords()
@@ -86,7 +96,11 @@ def interactive_tweet_deletion():
         print(f"Searching for tweets containing or related to: {', '.join(keywords)}")
         print(f"Analyzing up to {max_tweets} recent tweets...")
         
-        delete_tweets_with_keywords(keywords, dry_run=True, max_tweets=max_tweets)
+        summary = delete_tweets_with_keywords(keywords, dry_run=True, max_tweets=max_tweets, plan_path=PLAN_PATH,
+                                              service_url=service_url)
+        if summary["error"]:
+            print("\nThe dry run did not finish, so there is no deletion plan to execute.")
+            return
         
         # Ask for confirmation
         print("\nReady to delete tweets?")
@@ -98,7 +112,8 @@ def interactive_tweet_deletion():
         
         if choice == "1":
             print("\n--- Executing tweet deletion ---")
-            delete_tweets_with_keywords(keywords, dry_run=False, max_tweets=max_tweets)
+            # Delete exactly what the dry run found, without fetching or analyzing again
+            execute_deletion_plan(PLAN_PATH)
             print("\nDeletion complete!")
         elif choice == "2":
             print("\nRestarting with new keywords...")
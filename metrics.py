@@ -0,0 +1,224 @@
+"""
+Run Metrics
+Counters and timers for every stage of a cleanup run (auth, fetch, prefilter, cache, triage,
+cascade, model and delete), plus token accounting for each Ollama call. Metrics can be exported
+as periodic JSON-lines snapshots and served in the Prometheus text format. Per-tweet messages go
+through leveled logging with a rate limit, so the hot loop no longer writes a terminal line per
+tweet.
+"""
+
+import json
+import logging
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PREFIX = "tweet_cleaner"
+LOGGER_NAME = "tweet_cleaner"
+DEFAULT_EXPORT_SECONDS = 10.0
+# Informational messages beyond this rate are dropped and counted; warnings always get through
+DEFAULT_LOG_RATE = 20.0
+DEFAULT_LOG_BURST = 50
+# Pass as extra= on records that are results of the run (verdicts, deletions); they are never throttled
+AUDIT = {"audit": True}
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+def _format(name, labels):
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+class Metrics:
+    """Thread-safe counters and timers, keyed by name and labels"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        # (name, labels) -> [count, total seconds, max seconds]
+        self.timers = {}
+
+    def inc(self, name, value=1, **labels):
+        """Add value to a counter"""
+        key = _key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        """Record one timed operation"""
+        key = _key(name, labels)
+        with self._lock:
+            timer = self.timers.setdefault(key, [0, 0.0, 0.0])
+            timer[0] += 1
+            timer[1] += seconds
+            timer[2] = max(timer[2], seconds)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Time the body of a with block"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def instrument(self, stage, function):
+        """Wrap a function so each call is timed as a stage; usable as build_classifier's instrument hook"""
+        def timed(*args, **kwargs):
+            with self.timer("stage_seconds", stage=stage):
+                return function(*args, **kwargs)
+        return timed
+
+    def record_ollama(self, response, model):
+        """Count the tokens and time Ollama reports for one generate call"""
+        self.inc("ollama_calls_total", model=model)
+        self.inc("ollama_prompt_eval_tokens_total", response.get("prompt_eval_count") or 0, model=model)
+        self.inc("ollama_eval_tokens_total", response.get("eval_count") or 0, model=model)
+        self.inc("ollama_duration_seconds_total", (response.get("total_duration") or 0) / 1e9, model=model)
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.timers.clear()
+
+    def snapshot(self):
+        """Return every metric as plain JSON-serializable values"""
+        with self._lock:
+            counters = {_format(name, labels): value for (name, labels), value in self.counters.items()}
+            timers = {
+                _format(name, labels): {"count": count, "sum": round(total, 6), "max": round(longest, 6)}
+                for (name, labels), (count, total, longest) in self.timers.items()
+            }
+        return {"time": time.time(), "counters": counters, "timers": timers}
+
+    def prometheus(self):
+        """Render every metric in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            counters = sorted(self.counters.items())
+            timers = sorted(self.timers.items())
+        for (name, labels), value in counters:
+            lines.append(f"{_format(f'{PREFIX}_{name}', labels)} {value}")
+        for (name, labels), (count, total, _) in timers:
+            lines.append(f"{_format(f'{PREFIX}_{name}_count', labels)} {count}")
+            lines.append(f"{_format(f'{PREFIX}_{name}_sum', labels)} {total}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """Describe where the run spent its time, one line per stage"""
+        with self._lock:
+            timers = sorted(self.timers.items(), key=lambda item: -item[1][1])
+        lines = ["Time by stage (stages include the ones nested inside them):"]
+        for (name, labels), (count, total, longest) in timers:
+            label = dict(labels).get("stage", name)
+            lines.append(f"  {label}: {count} calls, {total:.2f}s total, "
+                         f"{total / count * 1000:.1f} ms avg, {longest * 1000:.1f} ms max")
+        return "\n".join(lines)
+
+# The process-wide metrics every module records into
+METRICS = Metrics()
+
+class JSONLinesExporter:
+    """Appends a metrics snapshot to a file every few seconds and once more on close"""
+
+    def __init__(self, path, metrics=METRICS, interval=DEFAULT_EXPORT_SECONDS):
+        self.metrics = metrics
+        self.interval = interval
+        self._file = open(path, "a", encoding="utf-8")
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-export", daemon=True)
+        self._thread.start()
+
+    def _write(self):
+        self._file.write(json.dumps(self.metrics.snapshot(), separators=(",", ":")) + "\n")
+        self._file.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._write()
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        self._write()
+        self._file.close()
+
+def start_prometheus_server(port, metrics=METRICS, host="127.0.0.1"):
+    """Serve /metrics in the Prometheus text format from a background thread; returns the server"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            data = metrics.prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+class RateLimitFilter(logging.Filter):
+    """Token bucket over informational records; suppressed records are counted and reported later
+
+    Warnings and audit records (logged with extra=AUDIT) always pass, so only progress and
+    diagnostic messages are throttled.
+    """
+
+    def __init__(self, rate=DEFAULT_LOG_RATE, burst=DEFAULT_LOG_BURST):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._suppressed = 0
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or getattr(record, "audit", False):
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            if self._tokens < 1:
+                self._suppressed += 1
+                return False
+            self._tokens -= 1
+            if self._suppressed:
+                record.msg = f"{record.msg} ({self._suppressed} more messages suppressed)"
+                self._suppressed = 0
+        return True
+
+def configure_logging(level=logging.INFO, rate=DEFAULT_LOG_RATE, force=False):
+    """Send the cleaner's log messages to stdout, formatted like its other output
+
+    Does nothing if logging was already configured, unless force=True.
+    """
+    logger = logging.getLogger(LOGGER_NAME)
+    if logger.handlers and not force:
+        return logger
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    if rate:
+        handler.addFilter(RateLimitFilter(rate, max(1, int(rate * 2.5))))
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    logger.propagate = False
+    return logger
+
+def get_logger(name):
+    """Logger for one module, under the cleaner's logger"""
+    return logging.getLogger(f"{LOGGER_NAME}.{name}")
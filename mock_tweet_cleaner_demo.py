@@ -2,13 +2,16 @@
 """
 Mock Tweet Cleaner Demo
 This script demonstrates the tweet cleaner functionality using mock tweets,
-so we don't hit the Twitter API rate limits.
+so we don't hit the Twitter API rate limits. The mock tweets go through the same
+pipeline as the real cleaners, with a sink that only pretends to delete.
 """
 
 import os
 import ollama
 from datetime import datetime
 from dotenv import load_dotenv
+from metrics import configure_logging
+from pipeline import DryRunSink, Pipeline
 
 # Load environment variables from .env file
 load_dotenv()
@@ -54,8 +57,17 @@ def should_delete_tweet(tweet_text, keywords, model_name="llama3.2:latest"):
         print(f"Error analyzing tweet: {str(e)}")
         return False
 
-def demo_tweet_cleaner(keywords, dry_run=True):
+class SimulatedDeleteSink:
+    """Pipeline sink that reports deletions without deleting anything"""
+
+    def handle(self, tweet, should_delete):
+        if should_delete:
+            print(f"Deleted tweet (ID: {tweet.id}): {tweet.text}")
+            print("-" * 50)
+
+def demo_tweet_cleaner(keywords, dry_run=True, concurrency=1):
     """Demonstrate the tweet cleaner functionality with mock tweets"""
+    configure_logging()
     print("\n==== Twitter/X Tweet Cleaner Demo ====")
     print(f"Looking for tweets containing or related to: {', '.join(keywords)}")
     
@@ -72,16 +84,11 @@ def demo_tweet_cleaner(keywords, dry_run=True):
     # Process mock tweets
     print(f"\nAnalyzing {len(MOCK_TWEETS)} tweets...\n")
     
-    deleted_count = 0
-    for tweet in MOCK_TWEETS:
-        should_delete = should_delete_tweet(tweet.text, keywords)
-        if should_delete:
-            if dry_run:
-                print(f"Would delete tweet (ID: {tweet.id}): {tweet.text}")
-            else:
-                print(f"Deleted tweet (ID: {tweet.id}): {tweet.text}")
-            deleted_count += 1
-            print("-" * 50)
+    classify = lambda batch: [should_delete_tweet(tweet.text, keywords) for tweet in batch]
+    pipeline = Pipeline(MOCK_TWEETS, classify, [DryRunSink() if dry_run else SimulatedDeleteSink()], concurrency)
+    pipeline.run()
+    pipeline.close()
+    deleted_count = pipeline.to_delete
     
     # Summary
     action = "Would delete" if dry_run else "Deleted"
@@ -0,0 +1,157 @@
+"""
+Model Lifecycle Manager
+Owns the Ollama client for one host and model. The model list is fetched once per process, a
+missing model is pulled through the API, and a warm-up request loads the model into memory and
+pins it there with keep_alive. This happens on the manager's first generate call, so a run that
+never needs the model (e.g. one answered from the cache) never loads it, and ollama itself is only
+imported once a client is needed. Every caller shares the same client through get_model_manager(),
+which returns an ollama_pool.OllamaPool for a comma-separated list of hosts.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+from classifier import DEFAULT_MODEL
+from metrics import METRICS
+
+DEFAULT_HOST = "http://localhost:11434"
+# How long Ollama keeps the model loaded after the last request
+DEFAULT_KEEP_ALIVE = "30m"
+
+_managers = {}
+_managers_lock = threading.Lock()
+_active = None
+
+def normalize_model_name(model_name):
+    """Ollama lists untagged models under their :latest tag"""
+    return model_name if ":" in model_name else f"{model_name}:latest"
+
+class ModelManager:
+    """One reusable Ollama client plus the presence and warm-up state of its models"""
+
+    def __init__(self, model_name=DEFAULT_MODEL, host=DEFAULT_HOST, keep_alive=DEFAULT_KEEP_ALIVE):
+        self.model_name = model_name
+        self.host = host
+        self.keep_alive = keep_alive
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._prepare_lock = threading.Lock()
+        self._installed = None
+        self._ready = set()
+
+    @property
+    def client(self):
+        """The ollama.Client for this host, created on first use"""
+        with self._client_lock:
+            if self._client is None:
+                import ollama
+                self._client = ollama.Client(host=self.host)
+            return self._client
+
+    def installed_models(self, refresh=False):
+        """Names of the models on the Ollama host, fetched once unless refresh=True"""
+        with self._lock:
+            if self._installed is None or refresh:
+                self._installed = {normalize_model_name(m["name"]) for m in self.client.list()["models"]}
+            return self._installed
+
+    def ensure_model(self, model_name=None):
+        """Pull the model if the host doesn't have it yet"""
+        model_name = model_name or self.model_name
+        if normalize_model_name(model_name) in self.installed_models():
+            return
+        print(f"Model {model_name} not found on {self.host}, pulling it...")
+        self.client.pull(model_name)
+        with self._lock:
+            self._installed.add(normalize_model_name(model_name))
+        print(f"Successfully pulled {model_name}")
+
+    def warm_up(self, model_name=None):
+        """Load the model into memory and pin it with keep_alive; an empty prompt generates nothing"""
+        model_name = model_name or self.model_name
+        started = time.perf_counter()
+        self.client.generate(model=model_name, prompt="", keep_alive=self.keep_alive)
+        print(f"Model {model_name} loaded in {time.perf_counter() - started:.1f}s (kept alive for {self.keep_alive})")
+
+    def prepare(self, model_name=None):
+        """Make sure the model is installed and loaded; only the first call per model does any work"""
+        model_name = model_name or self.model_name
+        if model_name in self._ready:
+            return
+        with self._prepare_lock:
+            if model_name in self._ready:
+                return
+            self.ensure_model(model_name)
+            self.warm_up(model_name)
+            self._ready.add(model_name)
+
+    def pick(self):
+        """The manager of the host to use next; for a single host that is this manager (see ollama_pool)"""
+        return self
+
+    @contextmanager
+    def lease(self):
+        """Use this manager for the body of a with block; pools reserve a slot on a host instead"""
+        yield self
+
+    def generate(self, **kwargs):
+        """client.generate with this manager's model and keep_alive unless given, recording its token counts
+
+        The first call for a model prepares it (see prepare).
+        """
+        kwargs.setdefault("model", self.model_name)
+        kwargs.setdefault("keep_alive", self.keep_alive)
+        self.prepare(kwargs["model"])
+        response = self.client.generate(**kwargs)
+        if not kwargs.get("stream"):
+            METRICS.record_ollama(response, kwargs["model"])
+        return response
+
+    def embed(self, texts, model_name=None):
+        """Embed a list of texts with one request to Ollama's bulk /api/embed endpoint
+
+        The pinned ollama client predates Client.embed, so the request goes through the client's
+        own connection. Servers without /api/embed (before Ollama 0.3.4) get one request per text.
+        """
+        import ollama
+        payload = {"model": model_name or self.model_name, "input": list(texts), "keep_alive": self.keep_alive}
+        try:
+            if hasattr(self.client, "embed"):
+                return self.client.embed(**payload)["embeddings"]
+            return self.client._request("POST", "/api/embed", json=payload).json()["embeddings"]
+        except ollama.ResponseError as e:
+            if e.status_code != 404:
+                raise
+        return [self.client.embeddings(model=payload["model"], prompt=text, keep_alive=self.keep_alive)["embedding"]
+                for text in payload["input"]]
+
+def get_model_manager(model_name=None, host=None, activate=True, max_outstanding=None):
+    """Return the shared manager for a model and host
+
+    Arguments left out default to the most recently activated manager, so code that only has the
+    agent (e.g. should_delete_tweet) uses the model and host the agent was set up with. Pass
+    activate=False for helper models that must not become that default.
+    A comma-separated host list returns an ollama_pool.OllamaPool over the hosts' managers, with at
+    most max_outstanding requests per host (default: ollama_pool.DEFAULT_HOST_CONCURRENCY).
+    """
+    global _active
+    with _managers_lock:
+        model_name = model_name or (_active.model_name if _active else DEFAULT_MODEL)
+        host = host or (_active.host if _active else DEFAULT_HOST)
+        key = (host, model_name)
+        if key not in _managers:
+            if "," in host:
+                from ollama_pool import OllamaPool, parse_hosts
+                members = []
+                for member_host in parse_hosts(host):
+                    members.append(_managers.setdefault((member_host, model_name), ModelManager(model_name, member_host)))
+                _managers[key] = OllamaPool(members)
+            else:
+                _managers[key] = ModelManager(model_name, host)
+        if max_outstanding and hasattr(_managers[key], "set_limit"):
+            _managers[key].set_limit(max_outstanding)
+        if activate:
+            _active = _managers[key]
+        return _managers[key]
@@ -0,0 +1,238 @@
+"""
+Ollama Host Pool
+Spreads classification over several Ollama hosts. Each request goes to the healthy host with the
+fewest requests in flight, and no host gets more than its concurrency limit at once. A host that
+fails several requests in a row is drained: it gets no new requests until a background health
+check finds it answering again. A request whose host fails is retried on the other hosts.
+
+The pool has the interface of a model_manager.ModelManager, so get_model_manager returns one for a
+comma-separated host list and the cleaners use it unchanged.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from metrics import METRICS, get_logger
+
+log = get_logger("ollama_pool")
+
+# Requests a host gets at the same time
+DEFAULT_HOST_CONCURRENCY = 4
+# Consecutive failed requests that drain a host
+DEFAULT_FAILURE_THRESHOLD = 3
+# Seconds between health checks of drained hosts
+HEALTH_CHECK_SECONDS = 15.0
+# Environment variable with the comma-separated hosts for scripts without a --host flag
+HOSTS_ENV = "OLLAMA_HOSTS"
+
+def parse_hosts(host):
+    """Split a comma-separated host list, dropping blanks and duplicates"""
+    return list(dict.fromkeys(part.strip().rstrip("/") for part in host.split(",") if part.strip()))
+
+def _is_host_failure(error):
+    """Errors the host reports about the request itself (e.g. a 404 for an unknown model) don't count against it"""
+    status = getattr(error, "status_code", None)
+    return status is None or status >= 500
+
+class NoHealthyHost(ConnectionError):
+    """Raised when every host of the pool is drained"""
+
+class PoolMember:
+    """One host's manager plus its load and health"""
+
+    def __init__(self, manager, limit):
+        self.manager = manager
+        self.limit = limit
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.seconds = 0.0
+        self.draining = False
+
+    def summary(self):
+        average = f"{self.seconds / (self.requests - self.failures) * 1000:.1f} ms avg" if self.requests > self.failures else "n/a"
+        state = "draining" if self.draining else "healthy"
+        return f"{self.manager.host}: {self.requests} requests, {self.failures} failed, {average} ({state})"
+
+class _PoolClient:
+    """Stands in for ollama.Client: every method call runs on the pool's least busy healthy host"""
+
+    def __init__(self, pool):
+        self._pool = pool
+
+    def __getattr__(self, name):
+        # Raise AttributeError for methods the client doesn't have, so hasattr checks keep working
+        getattr(self._pool.pick().client, name)
+
+        def call(*args, **kwargs):
+            return self._pool.call(lambda manager: getattr(manager.client, name)(*args, **kwargs))
+        return call
+
+class OllamaPool:
+    """Least-outstanding-requests routing over the ModelManagers of several hosts"""
+
+    def __init__(self, managers, max_outstanding=DEFAULT_HOST_CONCURRENCY, failure_threshold=DEFAULT_FAILURE_THRESHOLD,
+                 health_check_seconds=HEALTH_CHECK_SECONDS):
+        self.members = [PoolMember(manager, max_outstanding) for manager in managers]
+        self.model_name = managers[0].model_name
+        self.host = ",".join(manager.host for manager in managers)
+        self.keep_alive = managers[0].keep_alive
+        self.failure_threshold = failure_threshold
+        self.health_check_seconds = health_check_seconds
+        self._cond = threading.Condition()
+        self._checker = None
+
+    def set_limit(self, max_outstanding):
+        """Change how many requests each host gets at the same time"""
+        with self._cond:
+            for member in self.members:
+                member.limit = max_outstanding
+            self._cond.notify_all()
+
+    def _acquire(self, exclude=()):
+        """Reserve a slot on the healthy host with the fewest requests in flight, waiting while all are busy"""
+        with self._cond:
+            while True:
+                candidates = [member for member in self.members if not member.draining and member not in exclude]
+                if not candidates:
+                    raise NoHealthyHost(f"No healthy Ollama host left in the pool ({self.host})")
+                free = [member for member in candidates if member.outstanding < member.limit]
+                if free:
+                    # Fewest requests in flight first, then fewest served, so idle hosts take turns
+                    member = min(free, key=lambda m: (m.outstanding, m.requests))
+                    member.outstanding += 1
+                    member.requests += 1
+                    return member
+                self._cond.wait()
+
+    def _release(self, member, seconds, error=None):
+        host = member.manager.host
+        with self._cond:
+            member.outstanding -= 1
+            if error is not None and _is_host_failure(error):
+                member.failures += 1
+                member.consecutive_failures += 1
+                if not member.draining and member.consecutive_failures >= self.failure_threshold:
+                    self._drain(member, f"failed {member.consecutive_failures} requests in a row ({str(error)})")
+            else:
+                member.consecutive_failures = 0
+                member.seconds += seconds
+            self._cond.notify_all()
+        METRICS.inc("ollama_host_requests_total", host=host, outcome="error" if error is not None else "ok")
+
+    def _drain(self, member, reason):
+        """Stop sending requests to a host until the health check finds it answering; call with _cond held"""
+        member.draining = True
+        log.warning(f"Ollama host {member.manager.host} {reason}; draining it until it answers again")
+        if self._checker is None:
+            self._checker = threading.Thread(target=self._check_drained, name="ollama-health", daemon=True)
+            self._checker.start()
+
+    def _check_drained(self):
+        """Bring drained hosts back once they list their models again; stops when none is drained"""
+        while True:
+            time.sleep(self.health_check_seconds)
+            with self._cond:
+                drained = [member for member in self.members if member.draining]
+                if not drained:
+                    self._checker = None
+                    return
+            for member in drained:
+                try:
+                    member.manager.installed_models(refresh=True)
+                except Exception:
+                    continue
+                with self._cond:
+                    member.draining = False
+                    member.consecutive_failures = 0
+                    self._cond.notify_all()
+                log.info(f"Ollama host {member.manager.host} is healthy again; sending it requests")
+
+    @contextmanager
+    def lease(self):
+        """Hold a slot on the least busy healthy host for the body of a with block; yields its ModelManager"""
+        member = self._acquire()
+        started = time.perf_counter()
+        try:
+            yield member.manager
+        except Exception as e:
+            self._release(member, time.perf_counter() - started, e)
+            raise
+        self._release(member, time.perf_counter() - started)
+
+    def call(self, function):
+        """Return function(manager) run on the least busy healthy host, trying the other hosts if that one fails"""
+        tried = []
+        error = None
+        while True:
+            try:
+                member = self._acquire(tried)
+            except NoHealthyHost:
+                if error is None:
+                    raise
+                raise error
+            started = time.perf_counter()
+            try:
+                result = function(member.manager)
+            except Exception as e:
+                self._release(member, time.perf_counter() - started, e)
+                if not _is_host_failure(e):
+                    raise
+                log.debug(f"Ollama host {member.manager.host} failed: {str(e)}")
+                tried.append(member)
+                error = e
+                continue
+            self._release(member, time.perf_counter() - started)
+            return result
+
+    def pick(self):
+        """The ModelManager of the least busy healthy host, without reserving a slot on it"""
+        with self._cond:
+            candidates = [member for member in self.members if not member.draining]
+            if not candidates:
+                raise NoHealthyHost(f"No healthy Ollama host left in the pool ({self.host})")
+            return min(candidates, key=lambda m: (m.outstanding, m.requests)).manager
+
+    @property
+    def client(self):
+        """An ollama.Client stand-in whose calls are routed like generate"""
+        return _PoolClient(self)
+
+    def installed_models(self, refresh=False):
+        return self.pick().installed_models(refresh)
+
+    def ensure_model(self, model_name=None):
+        for member in self.members:
+            member.manager.ensure_model(model_name)
+
+    def prepare(self, model_name=None):
+        """Install and load the model on every host at once; hosts that fail are drained"""
+        with ThreadPoolExecutor(max_workers=len(self.members)) as executor:
+            futures = [(member, executor.submit(member.manager.prepare, model_name)) for member in self.members]
+        errors = []
+        for member, future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                errors.append(e)
+                with self._cond:
+                    member.failures += 1
+                    self._drain(member, f"could not load {model_name or self.model_name} ({str(e)})")
+        if len(errors) == len(self.members):
+            raise errors[0]
+
+    def generate(self, **kwargs):
+        """ModelManager.generate on the least busy healthy host"""
+        return self.call(lambda manager: manager.generate(**kwargs))
+
+    def embed(self, texts, model_name=None):
+        """ModelManager.embed on the least busy healthy host"""
+        return self.call(lambda manager: manager.embed(texts, model_name))
+
+    def summary(self):
+        """Describe the requests, failures and state of every host"""
+        with self._cond:
+            return "Ollama hosts: " + "; ".join(member.summary() for member in self.members)
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Ollama API Stub
+A local stand-in for the Ollama HTTP API (tags, pull, generate, embed and embeddings) with configurable,
+seeded latency. Answers are deterministic: a tweet "relates" to a keyword when it contains the
+keyword's first five letters, so benchmark runs are reproducible without a GPU or a real model.
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+EMBEDDING_SIZE = 64
+
+_KEYWORDS = re.compile(r"any of these keywords: (.*?)\.\n")
+_BATCH_LINE = re.compile(r"^(\d+): (\".*\")$", re.MULTILINE)
+_SINGLE_TWEET = re.compile(r"Tweet: (\".*\")\s*(?:Answer:)?\s*$", re.DOTALL)
+
+def _relates(text, keywords):
+    text = text.lower()
+    return any(keyword.lower()[:5] in text for keyword in keywords)
+
+def _embed(text):
+    """Hashed bag-of-words vector, so texts sharing words are similar"""
+    vector = [0.0] * EMBEDDING_SIZE
+    for word in re.findall(r"\w+", text.lower()):
+        digest = hashlib.blake2b(word[:5].encode(), digest_size=2).digest()
+        vector[int.from_bytes(digest, "big") % EMBEDDING_SIZE] += 1.0
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+class OllamaStub:
+    """Serves the Ollama API on a local port until stopped"""
+
+    def __init__(self, models=("llama3.2:latest",), latency_ms=50.0, jitter_ms=10.0, per_tweet_ms=5.0,
+                 seed=0, host="127.0.0.1", port=0):
+        self.models = set(models)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.per_tweet_ms = per_tweet_ms
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = {}
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def start(self):
+        """Start serving in a background thread and return the base URL"""
+        self._thread = threading.Thread(target=self.serve_forever, name="ollama-stub", daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _delay(self, items=1):
+        with self._lock:
+            jitter = self._random.gauss(0.0, self.jitter_ms) if self.jitter_ms else 0.0
+        time.sleep(max(0.0, self.latency_ms + self.per_tweet_ms * max(0, items - 1) + jitter) / 1000)
+
+    def _count(self, path):
+        with self._lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+
+    def generate(self, body):
+        prompt = body.get("prompt", "")
+        match = _KEYWORDS.search(prompt)
+        keywords = [k.strip() for k in match.group(1).split(",")] if match else []
+        lines = _BATCH_LINE.findall(prompt)
+
+        if not prompt:
+            # Warm-up request: loads the model, generates nothing
+            self._delay()
+            text = ""
+        elif body.get("format") == "json":
+            self._delay(len(lines))
+            verdicts = []
+            for tweet_id, tweet in lines:
+                verdict = {"id": int(tweet_id), "delete": _relates(json.loads(tweet), keywords)}
+                if '"confidence"' in prompt:
+                    # Long tweets are "ambiguous" so the cascade has something to escalate
+                    verdict["confidence"] = 0.95 if len(tweet) < 80 else 0.5
+                verdicts.append(verdict)
+            text = json.dumps({"verdicts": verdicts})
+        else:
+            self._delay()
+            tweet = _SINGLE_TWEET.search(prompt)
+            text = "YES" if tweet and _relates(json.loads(tweet.group(1)), keywords) else "NO"
+
+        prompt_tokens = len(prompt.split())
+        return {
+            "model": body.get("model"), "response": text, "done": True,
+            "prompt_eval_count": prompt_tokens, "prompt_eval_duration": prompt_tokens * 20_000,
+            "eval_count": max(1, len(text) // 4), "eval_duration": len(text) * 50_000,
+            "total_duration": int(self.latency_ms * 1e6),
+        }
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, payload, status=200):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                stub._count(self.path)
+                if self.path == "/api/tags":
+                    self._reply({"models": [{"name": name} for name in sorted(stub.models)]})
+                else:
+                    self._reply({"error": "not found"}, 404)
+
+            def do_POST(self):
+                stub._count(self.path)
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+                if self.path == "/api/generate":
+                    self._reply(stub.generate(body))
+                elif self.path == "/api/embeddings":
+                    stub._delay()
+                    self._reply({"embedding": _embed(body.get("prompt", ""))})
+                elif self.path == "/api/embed":
+                    texts = body.get("input", "")
+                    texts = [texts] if isinstance(texts, str) else texts
+                    stub._delay(len(texts))
+                    self._reply({"model": body.get("model"), "embeddings": [_embed(text) for text in texts]})
+                elif self.path == "/api/pull":
+                    stub.models.add(body.get("name") or body.get("model"))
+                    self._reply({"status": "success"})
+                else:
+                    self._reply({"error": "not found"}, 404)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve a deterministic stand-in for the Ollama API')
+    parser.add_argument('--port', type=int, default=11435, help='Port to listen on (default: 11435)')
+    parser.add_argument('--latency-ms', type=float, default=50.0, help='Base latency of every model call')
+    parser.add_argument('--jitter-ms', type=float, default=10.0, help='Standard deviation of the latency')
+    parser.add_argument('--per-tweet-ms', type=float, default=5.0, help='Extra latency per additional tweet in a batch')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the latency jitter')
+    args = parser.parse_args()
+
+    stub = OllamaStub(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, per_tweet_ms=args.per_tweet_ms,
+                      seed=args.seed, port=args.port)
+    print(f"Ollama stub listening on {stub.url}")
+    try:
+        stub.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
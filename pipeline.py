@@ -0,0 +1,158 @@
+"""
+Cleanup Pipeline
+The engine behind every cleaner: a source yields tweets, a batch classifier decides them and
+sinks act on the verdicts. The stages are connected by bounded queues and run in their own
+threads, so the next timeline page downloads while the current batches are classified and
+deletions go out in the background. A slow stage holds back the one before it rather than
+letting fetched tweets pile up in memory.
+
+Sources are plain iterables of tweets: api_source for the live timeline,
+twitter_archive.iter_archive_tweets for a data export, or a list of mock tweets.
+Sinks have a handle(tweet, should_delete) method and optionally close(cancel).
+"""
+
+import time
+
+from classifier import classify_in_order
+from metrics import AUDIT, METRICS, get_logger
+from timeline import PAGE_SIZE, iter_user_tweets, prefetch
+
+log = get_logger("pipeline")
+
+# Tweets the source may read ahead of the classifier
+DEFAULT_QUEUE_SIZE = 2 * PAGE_SIZE
+# Seconds between progress lines while tweets are being classified
+PROGRESS_SECONDS = 5.0
+
+class StopPipeline(Exception):
+    """Raised by a sink or the classifier when no further tweet can be handled (e.g. the app lacks write access)"""
+
+def api_source(client, max_tweets=None, pagination_token=None, on_page=None, since_id=None, user_id=None):
+    """Yield the authenticated user's tweets; a failed fetch ends the stream with a message instead of the run"""
+    import tweepy
+    try:
+        yield from iter_user_tweets(client, max_tweets=max_tweets or None, pagination_token=pagination_token,
+                                    on_page=on_page, since_id=since_id, user_id=user_id)
+    except tweepy.errors.TooManyRequests:
+        log.warning("Twitter API rate limit reached. Please wait a few minutes and try again.")
+    except Exception as e:
+        log.warning(f"Error fetching tweets: {str(e)}")
+
+class DryRunSink:
+    """Reports the tweets a dry run would delete"""
+
+    def handle(self, tweet, should_delete):
+        if should_delete:
+            log.info(f"Would delete tweet (ID: {tweet.id}): {tweet.text}", extra=AUDIT)
+
+class PlanSink:
+    """Adds the tweets to delete to a DeletionPlan"""
+
+    def __init__(self, plan):
+        self.plan = plan
+
+    def handle(self, tweet, should_delete):
+        if should_delete:
+            self.plan.add(tweet)
+
+class JournalSink:
+    """Journals every verdict, except for tweets whose verdict an earlier run already journaled"""
+
+    def __init__(self, journal, known_ids=()):
+        self.journal = journal
+        self.known_ids = known_ids
+
+    def handle(self, tweet, should_delete):
+        if str(tweet.id) not in self.known_ids:
+            self.journal.verdict(tweet, should_delete)
+
+class DeleteSink:
+    """Hands the tweets to delete to a DeletionScheduler, which sends them within the rate limit
+
+    The scheduler's queue only holds ids, so it is left unbounded: a rate-limit window can pause
+    deletions for many minutes, and classification should keep going in the meantime.
+    """
+
+    def __init__(self, scheduler, already_deleted_ids=()):
+        self.scheduler = scheduler
+        self.already_deleted_ids = already_deleted_ids
+        self.already_deleted = 0
+
+    def handle(self, tweet, should_delete):
+        if not should_delete:
+            return
+        if str(tweet.id) in self.already_deleted_ids:
+            self.already_deleted += 1
+            return
+        if self.scheduler.fatal:
+            raise StopPipeline(self.scheduler.fatal)
+        self.scheduler.submit(tweet.id, tweet.text)
+
+    def progress(self):
+        return f"{self.scheduler.deleted} deleted, {self.scheduler.pending} queued"
+
+    def close(self, cancel=False):
+        self.scheduler.close(cancel=cancel)
+
+class Pipeline:
+    """Streams tweets from a source through a batch classifier into sinks"""
+
+    def __init__(self, source, classify_batch, sinks=(), concurrency=1, batch_size=1, queue_size=DEFAULT_QUEUE_SIZE):
+        self.source = source
+        self.classify_batch = classify_batch
+        self.sinks = list(sinks)
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.analyzed = 0
+        self.to_delete = 0
+        self.errors = 0
+        # Set when a sink or the classifier stopped the run early
+        self.stopped = None
+
+    def _progress(self, rate):
+        details = [sink.progress() for sink in self.sinks if hasattr(sink, "progress")]
+        details = ", ".join(details or [f"{self.to_delete} to delete"])
+        log.info(f"Progress: {self.analyzed} tweets analyzed ({rate:.1f}/s), {details}")
+
+    def run(self):
+        """Process every tweet of the source, in source order; returns the number of tweets analyzed"""
+        tweets = prefetch(self.source, self.queue_size) if self.queue_size else self.source
+        results = classify_in_order(tweets, self.classify_batch, self.concurrency, self.batch_size)
+        started = last_progress = time.monotonic()
+        try:
+            for tweet, should_delete, error in results:
+                self.analyzed += 1
+                log.debug(f"Analyzing tweet: {tweet.text[:50]}...")
+                if time.monotonic() - last_progress >= PROGRESS_SECONDS:
+                    last_progress = time.monotonic()
+                    self._progress(self.analyzed / (last_progress - started))
+                if error is not None:
+                    self.errors += 1
+                    METRICS.inc("tweets_total", outcome="error")
+                    # The classifier can stop the run too, e.g. when no backend has answered for minutes
+                    if isinstance(error, StopPipeline):
+                        raise error
+                    log.warning(f"Error analyzing tweet: {str(error)}")
+                    continue
+                METRICS.inc("tweets_total", outcome="delete" if should_delete else "keep")
+                if should_delete:
+                    self.to_delete += 1
+                else:
+                    log.debug(f"Keeping tweet: {tweet.text[:50]}...")
+                for sink in self.sinks:
+                    sink.handle(tweet, should_delete)
+        except StopPipeline as e:
+            self.stopped = str(e)
+        finally:
+            # Stop the classifier workers and the reader thread if the run ended early
+            results.close()
+            if hasattr(tweets, "close"):
+                tweets.close()
+        return self.analyzed
+
+    def close(self, cancel=False):
+        """Close the sinks in order; cancel=True drops work they have not started (e.g. on Ctrl-C)"""
+        for sink in self.sinks:
+            if hasattr(sink, "close"):
+                sink.close(cancel=cancel)
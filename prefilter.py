@@ -0,0 +1,92 @@
+"""
+Keyword Prefilter
+Settles tweets that can be decided from their words alone before any model call.
+All keywords are compiled into a single case-insensitive regex that also understands
+hashtags (#politics, #ClimateChange) and simple word stems (political -> politics).
+"""
+
+import re
+import threading
+
+from classifier import fill_undecided
+
+# How much the prefilter is allowed to decide on its own:
+#   off        - every tweet goes to the model
+#   hits       - tweets that literally contain a keyword are deleted right away
+#   aggressive - like hits, and tweets with no lexical or stemmed link to any keyword are kept
+PREFILTER_MODES = ("off", "hits", "aggressive")
+
+_SUFFIXES = ("ations", "ation", "ically", "ical", "ings", "ing", "ness", "ment",
+             "ics", "ers", "ies", "ed", "es", "er", "ic", "al", "ly", "s", "y")
+_MIN_STEM = 4
+
+def stem(word):
+    """Strip one common English suffix, keeping at least a few letters of the word"""
+    word = word.lower()
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= _MIN_STEM:
+            return word[:-len(suffix)]
+    return word
+
+def _exact_pattern(keyword):
+    """Match the keyword as whole words, or as a hashtag with the spaces removed"""
+    words = keyword.split()
+    phrase = r"\s+".join(re.escape(word) for word in words)
+    hashtag = "#" + re.escape("".join(words))
+    return rf"(?:{hashtag}|#?{phrase})"
+
+def _stem_pattern(keyword):
+    """Match any word sharing the keyword's stems, e.g. politic* for politics"""
+    return r"\w*\s+".join(re.escape(stem(word)) for word in keyword.split()) + r"\w*"
+
+class KeywordPrefilter:
+    """Decides tweets lexically, leaving only ambiguous ones for the model"""
+
+    def __init__(self, keywords, mode="hits"):
+        if mode not in PREFILTER_MODES:
+            raise ValueError(f"Unknown prefilter mode: {mode}")
+        self.mode = mode
+        keywords = [k.strip() for k in keywords if k.strip()]
+        if not keywords:
+            # An empty alternation would match at nearly every word boundary
+            raise ValueError("the prefilter needs at least one non-blank keyword")
+        # Longest alternatives first so "climate change" wins over "climate"
+        keywords.sort(key=len, reverse=True)
+        boundary = r"(?<![\w#])({})(?!\w)"
+        self._exact = re.compile(boundary.format("|".join(_exact_pattern(k) for k in keywords)), re.IGNORECASE)
+        self._stemmed = re.compile(boundary.format("|".join(_stem_pattern(k) for k in keywords)), re.IGNORECASE)
+        self._lock = threading.Lock()
+        self.settled_delete = 0
+        self.settled_keep = 0
+        self.passed = 0
+
+    def check(self, tweet_text):
+        """Return True (delete), False (keep) or None when the model has to decide"""
+        if self.mode == "off":
+            return None
+        if self._exact.search(tweet_text):
+            return True
+        if self.mode == "aggressive" and not self._stemmed.search(tweet_text):
+            return False
+        return None
+
+    def undecided(self, tweets):
+        """The tweets the prefilter leaves to the model, without counting them (see SemanticTriage.lookahead)"""
+        return [tweet for tweet in tweets if self.check(tweet.text) is None]
+
+    def wrap(self, classify_batch):
+        """Return a batch classifier that settles what it can and hands the rest to classify_batch"""
+        def classify(batch):
+            verdicts = [self.check(tweet.text) for tweet in batch]
+            with self._lock:
+                self.settled_delete += verdicts.count(True)
+                self.settled_keep += verdicts.count(False)
+                self.passed += verdicts.count(None)
+            return fill_undecided(batch, verdicts, classify_batch)
+        return classify
+
+    def summary(self):
+        """Describe how much work the prefilter saved"""
+        settled = self.settled_delete + self.settled_keep
+        return (f"Prefilter ({self.mode}) settled {settled} tweets without the model "
+                f"({self.settled_delete} delete, {self.settled_keep} keep); {self.passed} sent to the model")
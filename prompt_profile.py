@@ -0,0 +1,98 @@
+"""
+Classification Prompt Profile
+Keeps every classification prompt identical up to the tweet text: instructions and keywords form
+a fixed prefix and the tweet comes last. Ollama reuses the evaluated tokens of the longest prompt
+prefix it has already seen, so the instructions are evaluated once per run instead of once per
+tweet. Generation is pinned to deterministic, token-budgeted options, and the prompt evaluation
+statistics Ollama reports are collected so the saving can be measured.
+"""
+
+import json
+import re
+import threading
+
+# Bump whenever SINGLE_PROMPT_PREFIX changes so cached verdicts from the old wording are not reused
+SINGLE_PROMPT_VERSION = 3
+
+SINGLE_PROMPT_PREFIX = """Please analyze the tweet at the end of this message and determine if it contains or relates to any of these keywords: {keywords}.
+Respond with only "YES" if the tweet should be deleted (contains or strongly relates to any keyword), or "NO" if it should be kept.
+
+Tweet: """
+# Ends the prompt on the answer's label, so the model starts with the answer rather than a newline
+# that the stop sequence would cut down to an empty response
+SINGLE_PROMPT_SUFFIX = "\nAnswer:"
+
+# YES/NO fits in a couple of tokens; a batch needs roughly this many per JSON verdict
+DEFAULT_NUM_PREDICT = 4
+TOKENS_PER_VERDICT = 16
+DEFAULT_STOP = ["\n"]
+
+_YES = re.compile(r"\bYES\b", re.IGNORECASE)
+_NO = re.compile(r"\bNO\b", re.IGNORECASE)
+
+def parse_answer(answer):
+    """True for a YES answer, False for a NO answer
+
+    Raises ValueError for anything else (an empty answer, e.g. one cut off by the stop sequence, or
+    one that says both), so a non-answer is never taken as "keep".
+    """
+    yes, no = bool(_YES.search(answer)), bool(_NO.search(answer))
+    if yes == no:
+        raise ValueError(f"Expected YES or NO but the model answered {answer.strip()[:40]!r}")
+    return yes
+
+class ClassificationProfile:
+    """Prompt layout, generation options and prompt-evaluation statistics for one run"""
+
+    def __init__(self, keywords, num_predict=DEFAULT_NUM_PREDICT, temperature=0.0, stop=DEFAULT_STOP):
+        self.prefix = SINGLE_PROMPT_PREFIX.format(keywords=", ".join(keywords))
+        self.num_predict = num_predict
+        self.temperature = temperature
+        self.stop = list(stop)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.prompt_eval_count = 0
+        self.prompt_eval_ns = 0
+        self.eval_count = 0
+
+    def prompt(self, tweet_text):
+        """The fixed prefix followed by the tweet, quoted so it can't run into the instructions, and the answer label"""
+        return self.prefix + json.dumps(tweet_text, ensure_ascii=False) + SINGLE_PROMPT_SUFFIX
+
+    def options(self, verdicts=None, tokens_per_verdict=TOKENS_PER_VERDICT):
+        """Deterministic generation options, budgeted for a YES/NO answer or for `verdicts` JSON verdicts"""
+        if verdicts is None:
+            return {"temperature": self.temperature, "num_predict": self.num_predict, "stop": self.stop}
+        # JSON verdicts span several lines, so only the token budget bounds them
+        return {"temperature": self.temperature, "num_predict": tokens_per_verdict * (verdicts + 1)}
+
+    def generate(self, manager, verdicts=None, tokens_per_verdict=TOKENS_PER_VERDICT, **kwargs):
+        """Call manager.generate with this profile's options and record the response's statistics"""
+        kwargs.setdefault("options", self.options(verdicts, tokens_per_verdict))
+        response = manager.generate(**kwargs)
+        self.record(response)
+        return response
+
+    def batch_generate(self, manager, verdicts):
+        """A generate function for classify_batch, budgeted for batches of up to `verdicts` tweets"""
+        return lambda **kwargs: self.generate(manager, verdicts, **kwargs)
+
+    def record(self, response):
+        """Accumulate the prompt and generation token statistics of one response"""
+        with self._lock:
+            self.calls += 1
+            self.prompt_eval_count += response.get("prompt_eval_count") or 0
+            self.prompt_eval_ns += response.get("prompt_eval_duration") or 0
+            self.eval_count += response.get("eval_count") or 0
+
+    def statistics(self):
+        """Describe the calls recorded so far and their average prompt evaluation"""
+        if not self.calls:
+            return "no model calls"
+        return (f"{self.calls} model calls evaluated {self.prompt_eval_count / self.calls:.0f} "
+                f"prompt tokens in {self.prompt_eval_ns / self.calls / 1e6:.1f} ms and generated "
+                f"{self.eval_count / self.calls:.1f} tokens per call")
+
+    def summary(self):
+        """Describe how much prompt evaluation the model calls needed"""
+        return f"Prompt profile: {self.statistics()}"
@@ -0,0 +1,139 @@
+"""
+Semantic Triage
+Embeds tweets and keywords with an Ollama embedding model and scores every tweet against
+every keyword with one cosine-similarity matrix. Clearly related tweets are deleted and
+clearly unrelated ones are kept; only the uncertain middle band goes to the generative model.
+The source is embedded ahead of classification in windows of tweets (see lookahead), one bulk
+request per window whatever the generation batch size, skipping tweets that the stages in front
+of triage (prefilter, cache) will settle; tweets that arrive without a score are embedded per batch. numpy is imported on first use, so runs without --triage don't load it.
+"""
+
+import threading
+from collections import OrderedDict
+from itertools import islice
+
+from classifier import fill_undecided
+from metrics import get_logger
+
+log = get_logger("semantic_triage")
+
+DEFAULT_EMBEDDING_MODEL = "nomic-embed-text"
+# Similarity bands; calibrate for the embedding model in use
+DEFAULT_KEEP_BELOW = 0.35
+DEFAULT_DELETE_ABOVE = 0.75
+# Tweets embedded per bulk request by lookahead
+DEFAULT_EMBED_WINDOW = 128
+# Scores kept for tweets that lookahead embedded but triage has not seen yet
+MAX_PENDING_SCORES = 8 * DEFAULT_EMBED_WINDOW
+
+def _normalize(vectors):
+    """Scale each row to unit length so a dot product is a cosine similarity"""
+    import numpy as np
+    matrix = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+class SemanticTriage:
+    """Decides confident keeps and deletes from embedding similarity"""
+
+    def __init__(self, keywords, model_name=DEFAULT_EMBEDDING_MODEL,
+                 keep_below=DEFAULT_KEEP_BELOW, delete_above=DEFAULT_DELETE_ABOVE, manager=None):
+        if keep_below > delete_above:
+            raise ValueError("keep_below must not be greater than delete_above")
+        self.keywords = list(keywords)
+        self.model_name = model_name
+        self.keep_below = keep_below
+        self.delete_above = delete_above
+        if manager is None:
+            from model_manager import get_model_manager
+            manager = get_model_manager()
+        self.manager = manager
+        self._keyword_matrix = None
+        self._lock = threading.Lock()
+        # Scores by tweet text, filled ahead of classification by lookahead
+        self._pending = OrderedDict()
+        self.settled_delete = 0
+        self.settled_keep = 0
+        self.passed = 0
+        self.failed = 0
+
+    def embed(self, texts):
+        """Embed a list of texts with one bulk request"""
+        return self.manager.embed(texts, self.model_name)
+
+    def keyword_matrix(self):
+        """Unit-length keyword embeddings, computed once per run"""
+        with self._lock:
+            if self._keyword_matrix is None:
+                self._keyword_matrix = _normalize(self.embed(self.keywords))
+            return self._keyword_matrix
+
+    def scores(self, tweet_texts):
+        """Return each tweet's highest cosine similarity to any keyword"""
+        tweet_matrix = _normalize(self.embed(tweet_texts))
+        return (tweet_matrix @ self.keyword_matrix().T).max(axis=1)
+
+    def lookahead(self, tweets, window=DEFAULT_EMBED_WINDOW, undecided=None):
+        """Yield tweets unchanged, embedding them window tweets at a time before they reach the classifier
+
+        Wrap the pipeline source with this so triage needs no embedding request of its own; a
+        failed window is embedded again by triage when its tweets get there. undecided(tweets), if
+        given, drops the tweets that the stages in front of triage will settle, so they are not embedded.
+        """
+        tweets = iter(tweets)
+        while True:
+            chunk = list(islice(tweets, window))
+            if not chunk:
+                return
+            try:
+                texts = list(dict.fromkeys(tweet.text for tweet in (undecided(chunk) if undecided else chunk)))
+                scores = self.scores(texts) if texts else []
+            except Exception as e:
+                log.debug(f"Embedding {len(texts)} tweets ahead failed: {str(e)}")
+            else:
+                with self._lock:
+                    for text, score in zip(texts, list(scores)):
+                        self._pending[text] = score
+                        self._pending.move_to_end(text)
+                    while len(self._pending) > MAX_PENDING_SCORES:
+                        self._pending.popitem(last=False)
+            yield from chunk
+
+    def triage(self, tweet_texts):
+        """Return True (delete), False (keep) or None (ask the model) for each tweet"""
+        with self._lock:
+            scores = [self._pending.get(text) for text in tweet_texts]
+        missing = [index for index, score in enumerate(scores) if score is None]
+        if missing:
+            for index, score in zip(missing, self.scores([tweet_texts[index] for index in missing]).tolist()):
+                scores[index] = score
+        return [True if score >= self.delete_above else False if score <= self.keep_below else None
+                for score in scores]
+
+    def wrap(self, classify_batch):
+        """Return a batch classifier that settles confident tweets and hands the middle band to classify_batch"""
+        def classify(batch):
+            try:
+                verdicts = self.triage([tweet.text for tweet in batch])
+            except Exception as e:
+                # Embeddings are an optimization; the model can still decide everything
+                log.warning(f"Semantic triage failed: {str(e)}, sending batch to the model")
+                with self._lock:
+                    self.failed += len(batch)
+                return classify_batch(batch)
+            with self._lock:
+                self.settled_delete += verdicts.count(True)
+                self.settled_keep += verdicts.count(False)
+                self.passed += verdicts.count(None)
+            return fill_undecided(batch, verdicts, classify_batch)
+        return classify
+
+    def summary(self):
+        """Describe how many tweets were settled by similarity alone"""
+        settled = self.settled_delete + self.settled_keep
+        text = (f"Semantic triage ({self.model_name}) settled {settled} tweets "
+                f"({self.settled_delete} delete, {self.settled_keep} keep); {self.passed} sent to the model")
+        if self.failed:
+            text += f"; embedding failed for {self.failed}"
+        return text
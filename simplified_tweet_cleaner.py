@@ -2,14 +2,20 @@
 """
 Simplified Tweet Cleaner
 This script uses the Ollama API directly instead of going through the Strands library.
+It runs on the same pipeline as twitter_cleaner.py, so fetching, classification and deletion overlap.
 """
 
 import os
 import json
-import ollama
 import tweepy
 import argparse
 from dotenv import load_dotenv
+from classifier import DEFAULT_MODEL, classify_batch
+from pipeline import DeleteSink, DryRunSink, Pipeline, api_source
+from deletion_scheduler import DEFAULT_DELETE_CONCURRENCY, DeletionScheduler
+from metrics import configure_logging
+from prompt_profile import ClassificationProfile, parse_answer
+from model_manager import DEFAULT_HOST, get_model_manager
 
 # Load environment variables from .env file
 load_dotenv()
@@ -36,83 +42,70 @@ def authenticate_twitter():
     
     return client
 
-def should_delete_tweet(tweet_text, keywords, model_name="llama3.2:latest"):
+def should_delete_tweet(tweet_text, keywords, model_name=None, profile=None):
     """Use Ollama directly to decide if a tweet should be deleted based on keywords"""
-    prompt = f"""
-    Please analyze the following tweet and determine if it contains or relates to any of these keywords: {', '.join(keywords)}.
-    
-    Tweet: "{tweet_text}"
-    
-    Respond with only "YES" if the tweet should be deleted (contains or strongly relates to any keyword), or "NO" if it should be kept.
-    """
+    profile = profile or ClassificationProfile(keywords)
     
     try:
-        response = ollama.generate(model=model_name, prompt=prompt)
-        return "YES" in response['response'].upper()
+        response = profile.generate(get_model_manager(model_name), prompt=profile.prompt(tweet_text))
+        return parse_answer(response['response'])
     except Exception as e:
         print(f"Error analyzing tweet: {str(e)}")
         return False
 
-def fetch_user_tweets(client, max_results=100):
-    """Fetch recent tweets from the authenticated user"""
-    try:
-        user_id = client.get_me().data.id
-        tweets = client.get_users_tweets(
-            id=user_id,
-            max_results=max_results,
-            tweet_fields=["created_at", "text"]
-        )
-        return tweets.data if tweets.data else []
-    except tweepy.errors.TooManyRequests:
-        print("Twitter API rate limit reached. Please wait a few minutes and try again.")
-        return []
-    except Exception as e:
-        print(f"Error fetching tweets: {str(e)}")
-        return []
-
-def delete_tweets_with_keywords(keywords, dry_run=True, max_tweets=100):
+def delete_tweets_with_keywords(keywords, dry_run=True, max_tweets=100, concurrency=1, batch_size=1,
+                                model_name=DEFAULT_MODEL, ollama_host=DEFAULT_HOST,
+                                delete_concurrency=DEFAULT_DELETE_CONCURRENCY):
     """Delete tweets containing specified keywords"""
+    configure_logging()
     try:
         # Authenticate with Twitter
         print("Authenticating with Twitter API...")
         client = authenticate_twitter()
         print("Authentication successful!")
         
-        # Check Ollama
+        # Check Ollama and load the model before the first tweet needs it
         print("Checking Ollama availability...")
-        models = ollama.list()
-        print(f"Ollama is available with models: {[m['name'] for m in models['models']]}")
+        manager = get_model_manager(model_name, ollama_host)
+        manager.prepare()
+        print(f"Ollama is available with models: {sorted(manager.installed_models())}")
         
         # Fetch user tweets
-        print(f"Fetching up to {max_tweets} recent tweets...")
-        tweets = fetch_user_tweets(client, max_results=max_tweets)
+        if max_tweets:
+            print(f"Fetching up to {max_tweets} recent tweets...")
+        else:
+            print("Fetching the whole timeline...")
+        tweets = api_source(client, max_tweets)
         
-        if not tweets:
-            print("No tweets were found or there was an error fetching tweets.")
+        # Fetching, classification and deletion overlap; results come back in timeline order
+        profile = ClassificationProfile(keywords)
+        if batch_size > 1:
+            classify = lambda batch: classify_batch([tweet.text for tweet in batch], keywords, manager.model_name,
+                                                    profile.batch_generate(manager, batch_size))
+        else:
+            classify = lambda batch: [should_delete_tweet(tweet.text, keywords, manager.model_name, profile) for tweet in batch]
+        scheduler = None if dry_run else DeletionScheduler(client, delete_concurrency)
+        pipeline = Pipeline(tweets, classify, [DryRunSink()] if dry_run else [DeleteSink(scheduler)],
+                            concurrency, batch_size)
+        completed = False
+        try:
+            analyzed_count = pipeline.run()
+            completed = True
+        finally:
+            pipeline.close(cancel=not completed)
+        if scheduler is not None and scheduler.fatal:
+            print(f"Error: {scheduler.fatal}")
             return
-            
-        print(f"Found {len(tweets)} tweets")
+        deleted_count = pipeline.to_delete if dry_run else scheduler.deleted
         
-        # Process tweets
-        deleted_count = 0
-        for tweet in tweets:
-            print(f"Analyzing tweet: {tweet.text[:50]}...")
-            try:
-                should_delete = should_delete_tweet(tweet.text, keywords)
-                if should_delete:
-                    if dry_run:
-                        print(f"Would delete tweet (ID: {tweet.id}): {tweet.text}")
-                    else:
-                        client.delete_tweet(tweet.id)
-                        print(f"Deleted tweet (ID: {tweet.id}): {tweet.text}")
-                    deleted_count += 1
-            except Exception as e:
-                print(f"Error analyzing tweet: {str(e)}")
-                continue
+        if not analyzed_count:
+            print("No tweets were found or there was an error fetching tweets.")
+            return
         
         # Summary
         action = "Would delete" if dry_run else "Deleted"
-        print(f"\nSummary: {action} {deleted_count} out of {len(tweets)} tweets based on keywords: {keywords}")
+        print(f"\nSummary: {action} {deleted_count} out of {analyzed_count} tweets based on keywords: {keywords}")
+        print(profile.summary())
         
     except tweepy.errors.Unauthorized:
         print("Error: Twitter API authentication failed. Please check your credentials in the .env file.")
@@ -125,11 +118,17 @@ def main():
     parser = argparse.ArgumentParser(description='Delete tweets containing specified keywords')
     parser.add_argument('--keywords', nargs='+', required=True, help='Keywords to search for in tweets')
     parser.add_argument('--execute', action='store_true', help='Actually delete tweets. Without this flag, runs in dry-run mode.')
-    parser.add_argument('--max', type=int, default=100, help='Maximum number of recent tweets to analyze')
+    parser.add_argument('--max', type=int, default=100, help='Maximum number of recent tweets to analyze (0 for the whole timeline)')
+    parser.add_argument('--model', default=DEFAULT_MODEL, help=f'Ollama model that classifies tweets (default: {DEFAULT_MODEL})')
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f'Ollama server URL (default: {DEFAULT_HOST})')
+    parser.add_argument('--concurrency', type=int, default=1, help='Number of tweets (or batches) to classify in parallel')
+    parser.add_argument('--batch-size', type=int, default=1, help='Number of tweets to classify per model call (JSON verdicts when above 1)')
+    parser.add_argument('--delete-concurrency', type=int, default=DEFAULT_DELETE_CONCURRENCY, help='Number of deletions sent in parallel, within the API rate limit')
     
     args = parser.parse_args()
     
-    delete_tweets_with_keywords(args.keywords, not args.execute, args.max)
+    delete_tweets_with_keywords(args.keywords, not args.execute, args.max, args.concurrency, args.batch_size,
+                                args.model, args.host, args.delete_concurrency)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,68 @@
+"""
+Incremental Sync State
+Remembers, per account, the newest tweet id that a completed run has covered (its since_id
+high-water mark). An --incremental run only fetches and classifies the tweets newer than that,
+so steady-state runs cost a few API calls and model calls instead of a full timeline scan.
+"""
+
+import json
+import os
+from datetime import datetime, timezone
+
+DEFAULT_SYNC_STATE_PATH = ".tweet_cleaner_sync.json"
+
+def _keyword_set(keywords):
+    return sorted({keyword.strip().lower() for keyword in keywords if keyword.strip()})
+
+def _mode(dry_run):
+    # A dry run must not move the mark that the next execute run starts from
+    return "dry_run" if dry_run else "execute"
+
+class SyncState:
+    """since_id high-water marks by account and mode, stored in a small JSON file"""
+
+    def __init__(self, path=DEFAULT_SYNC_STATE_PATH):
+        self.path = path
+        try:
+            with open(path, encoding="utf-8") as f:
+                self.accounts = json.load(f)
+        except FileNotFoundError:
+            self.accounts = {}
+
+    def since_id(self, account_id, keywords, dry_run):
+        """The mark of the last completed run with the same keywords and mode, or None"""
+        entry = self.accounts.get(str(account_id), {}).get(_mode(dry_run))
+        if entry is None or entry["keywords"] != _keyword_set(keywords):
+            return None
+        return entry["since_id"]
+
+    def advance(self, account_id, keywords, dry_run, since_id):
+        """Record a completed run's newest tweet id and save the file"""
+        self.accounts.setdefault(str(account_id), {})[_mode(dry_run)] = {
+            "since_id": str(since_id) if since_id is not None else None,
+            "keywords": _keyword_set(keywords),
+            "updated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }
+        # Write a new file and swap it in, so a crash never leaves a half-written state behind
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.accounts, f, indent=2)
+        os.replace(temp_path, self.path)
+
+class TimelineProgress:
+    """on_page callback that tracks the newest tweet fetched and whether the timeline was read to its end"""
+
+    def __init__(self, on_page=None):
+        self.on_page = on_page
+        self.newest_id = None
+        self.fetched = 0
+        self.exhausted = False
+
+    def __call__(self, token, next_token, tweets):
+        if tweets:
+            newest = max(int(tweet.id) for tweet in tweets)
+            self.newest_id = newest if self.newest_id is None else max(self.newest_id, newest)
+        self.fetched += len(tweets)
+        self.exhausted = not next_token
+        if self.on_page is not None:
+            self.on_page(token, next_token, tweets)
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Test Script for the Checkpoint Journal
+This script journals part of a run, cuts the journal off mid-record as a crash would, and checks
+that resuming starts from the first page with undecided tweets and reuses the journaled verdicts.
+"""
+
+import os
+import tempfile
+
+from checkpoint import CheckpointJournal, JournalState
+from twitter_archive import ArchiveTweet
+
+def journal_interrupted_run(path):
+    """Journal two fetched pages, decide the first fully and the second partly, then crash mid-record"""
+    first_page = [ArchiveTweet(i, f"tweet {i}") for i in (1, 2, 3)]
+    second_page = [ArchiveTweet(i, f"tweet {i}") for i in (4, 5, 6)]
+    journal = CheckpointJournal(path)
+    journal.start(["politics"], True, 0)
+    journal.page(None, "token-2", first_page)
+    for tweet in first_page:
+        journal.verdict(tweet, tweet.id == 2)
+    journal.page("token-2", "token-3", second_page)
+    journal.verdict(second_page[0], True)
+    journal.deleted(2)
+    journal.close()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"type":"verdict","id":"5","sha":"')
+    return first_page + second_page
+
+def test_resume_from_truncated_journal():
+    """The cut-off record is ignored and the run resumes from the page that still had undecided tweets"""
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "journal.jsonl")
+        tweets = journal_interrupted_run(path)
+        state = JournalState(path)
+
+    assert state.run["keywords"] == ["politics"]
+    assert not state.done
+    assert state.verdicts == {"1": False, "2": True, "3": False, "4": True}
+    assert state.deleted == {"2"}
+    assert not state.timeline_exhausted()
+    assert state.resume_point() == ("token-2", ["1", "2", "3"])
+
+    # Only the tweets without a journaled verdict reach the classifier
+    calls = []
+    def classify(batch):
+        calls.append([tweet.id for tweet in batch])
+        return [False] * len(batch)
+    assert state.known_verdicts(classify)(tweets[3:]) == [True, False, False]
+    assert calls == [[5, 6]]
+
+def test_resumed_run_repeats_its_first_page():
+    """The resumed run's records after the cut-off one are read back, and its re-fetched page counts once"""
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "journal.jsonl")
+        tweets = journal_interrupted_run(path)
+        journal = CheckpointJournal(path, append=True)
+        journal.page("token-2", None, tweets[3:])
+        for tweet in tweets[4:]:
+            journal.verdict(tweet, False)
+        journal.close()
+        state = JournalState(path)
+
+    assert state.resume_point() == (None, ["1", "2", "3", "4", "5", "6"])
+    assert state.timeline_exhausted()
+
+if __name__ == "__main__":
+    test_resume_from_truncated_journal()
+    test_resumed_run_repeats_its_first_page()
+    print("\nTest completed!")
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Test Script for the Classification Service
+This script runs a dry run over a small archive with --service pointed at a local classification
+service, which classifies with the Ollama stub, so it needs neither Twitter nor a real model.
+"""
+
+import json
+import os
+import tempfile
+import threading
+
+import pytest
+
+from ollama_stub import OllamaStub
+from classification_service import ClassificationService, make_server
+from twitter_cleaner import delete_tweets_with_keywords
+
+def write_archive(folder, texts):
+    """Write texts as a minimal data/tweets.js export"""
+    os.makedirs(os.path.join(folder, "data"))
+    entries = [{"tweet": {"id_str": str(1000 + i), "full_text": text}} for i, text in enumerate(texts)]
+    with open(os.path.join(folder, "data", "tweets.js"), "w") as f:
+        f.write("window.YTD.tweets.part0 = " + json.dumps(entries))
+
+def test_dry_run_through_service():
+    """A dry run with service_url is classified by the service, not by a local classifier"""
+    # The service talks to the stub through the ollama client
+    pytest.importorskip("ollama")
+    texts = [
+        "I love politics and discussing the latest political news!",
+        "Had a great day at the beach with my family. So relaxing!",
+        "Can't believe how this government is handling the situation. #politics",
+        "Just watching the sunset, beautiful evening!",
+    ]
+    stub = OllamaStub(latency_ms=1.0, jitter_ms=0.0, per_tweet_ms=0.0)
+    # A broken backend fails the test in seconds rather than after the two-minute give-up
+    service = ClassificationService(host=stub.start(), prefilter_mode="off", cache_path=None, give_up_seconds=5)
+    server = make_server(service, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        with tempfile.TemporaryDirectory() as folder:
+            write_archive(folder, texts)
+            summary = delete_tweets_with_keywords(
+                ["politics"], dry_run=True, max_tweets=0, archive_path=folder, journal_path=None,
+                service_url=f"http://127.0.0.1:{server.server_address[1]}")
+    finally:
+        server.shutdown()
+        server.server_close()
+        service.close()
+        stub.stop()
+
+    print(f"Summary: {summary}")
+    assert summary["error"] is None
+    assert summary["analyzed"] == len(texts)
+    assert summary["deleted"] == 2
+    assert summary["stages"][0].startswith("Classification service")
+    assert stub.requests.get("/api/generate")
+
+if __name__ == "__main__":
+    test_dry_run_through_service()
+    print("\nTest completed!")
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Test Script for Near-Duplicate Collapsing
+This script checks that each group of near-duplicate tweets is classified once, that old groups
+are forgotten beyond max_groups and that concurrent batches share a group's verdict, using a stub
+batch classifier instead of a model.
+"""
+
+import threading
+import time
+
+from dedup import NearDuplicateFilter
+from twitter_archive import ArchiveTweet
+
+PROMO = "Huge summer sale on every pair of running shoes this weekend only https://shop.example.com/sale?utm_source=tw{}"
+
+def tweets(*texts):
+    return [ArchiveTweet(1000 + i, text) for i, text in enumerate(texts)]
+
+def recording_classifier(calls):
+    """A batch classifier that records the texts it is asked about and deletes every promo"""
+    def classify(batch):
+        calls.append([tweet.text for tweet in batch])
+        return ["sale" in tweet.text for tweet in batch]
+    return classify
+
+def test_group_verdict_reuse():
+    """Copies that differ in retweet prefix, tracking parameters or numbers take the verdict of the first"""
+    calls = []
+    near_duplicates = NearDuplicateFilter()
+    classify = near_duplicates.wrap(recording_classifier(calls))
+
+    verdicts = classify(tweets(PROMO.format(1), "RT @shop: " + PROMO.format(2), "Lovely walk by the river today"))
+    assert verdicts == [True, True, False]
+    assert calls == [[PROMO.format(1), "Lovely walk by the river today"]]
+
+    # A later batch is answered from the groups without another model call
+    assert classify(tweets(PROMO.format(3), "lovely walk by the river today")) == [True, False]
+    assert len(calls) == 1
+    assert near_duplicates.classified == 2
+    assert near_duplicates.fanned_out == 3
+
+def test_max_groups_eviction():
+    """Beyond max_groups the least recently seen group is forgotten and classified again when it returns"""
+    calls = []
+    near_duplicates = NearDuplicateFilter(max_groups=2)
+    classify = near_duplicates.wrap(recording_classifier(calls))
+    first, second, third = ("Morning coffee on the balcony watching the city wake up",
+                            "Finished reading a long novel about sailing across the Atlantic",
+                            "Our team shipped the new release after weeks of careful testing")
+
+    classify(tweets(first))
+    classify(tweets(second))
+    # Seeing the first again makes the second the least recently seen group
+    classify(tweets(first))
+    classify(tweets(third))
+    assert near_duplicates.evicted == 1
+    assert len(near_duplicates.groups) == 2
+
+    classify(tweets(second))
+    assert calls == [[first], [second], [third], [second]]
+    # The indexes hold exactly the groups that are kept
+    assert set(map(id, near_duplicates._exact.values())) == set(near_duplicates.groups)
+    for members in near_duplicates._bands.values():
+        assert all(id(group) in near_duplicates.groups for group in members)
+
+def test_in_flight_verdict_is_shared():
+    """A batch that meets a group another batch is classifying waits for that verdict instead of asking again"""
+    calls = []
+    started, release = threading.Event(), threading.Event()
+
+    def slow_classifier(batch):
+        calls.append([tweet.text for tweet in batch])
+        started.set()
+        release.wait(5)
+        return [True] * len(batch)
+
+    near_duplicates = NearDuplicateFilter()
+    classify = near_duplicates.wrap(slow_classifier)
+    results = {}
+    first = threading.Thread(target=lambda: results.update(first=classify(tweets(PROMO.format(1)))))
+    first.start()
+    assert started.wait(5)
+    second = threading.Thread(target=lambda: results.update(second=classify(tweets(PROMO.format(2)))))
+    second.start()
+    # Let the first batch finish only once the second has found the group still undecided
+    deadline = time.monotonic() + 5
+    while near_duplicates.tweets < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    first.join(5)
+    second.join(5)
+
+    assert results == {"first": [True], "second": [True]}
+    assert calls == [[PROMO.format(1)]]
+    assert near_duplicates.waited == 1
+
+if __name__ == "__main__":
+    test_group_verdict_reuse()
+    test_max_groups_eviction()
+    test_in_flight_verdict_is_shared()
+    print("\nTest completed!")
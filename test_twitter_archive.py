@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Test Script for the Twitter Archive Reader
+This script writes a small data export with multi-byte UTF-8 text and checks that it parses to the
+same tweets whatever the chunk size, including chunks that split a character or an entry.
+"""
+
+import json
+import os
+import tempfile
+
+import twitter_archive
+from twitter_archive import iter_archive_tweets
+
+TEXTS = [
+    "Plain ASCII tweet about politics",
+    "Café crème brûlée — très bien",
+    "東京で会議があります 🗼",
+    "Emoji run 😀😃😄 and a flag 🇯🇵",
+    "Escaped \"quotes\", a backslash \\ and ] brackets [",
+    "Entities: fish &amp; chips &lt;3",
+]
+
+def write_archive(folder, texts, parts=1):
+    """Write texts as a data/tweets.js export split over `parts` files"""
+    os.makedirs(os.path.join(folder, "data"))
+    per_part = -(-len(texts) // parts)
+    for part in range(parts):
+        entries = [{"tweet": {"id_str": str(1000 + i), "full_text": text,
+                              "created_at": "Wed Oct 10 20:19:24 +0000 2018"}}
+                   for i, text in enumerate(texts) if i // per_part == part]
+        name = "tweets.js" if part == 0 else f"tweets-part{part}.js"
+        with open(os.path.join(folder, "data", name), "w", encoding="utf-8") as f:
+            f.write(f"window.YTD.tweets.part{part} = " + json.dumps(entries, ensure_ascii=False, indent=2))
+
+def read_all(folder, chunk_size, max_tweets=None):
+    original = twitter_archive.CHUNK_SIZE
+    twitter_archive.CHUNK_SIZE = chunk_size
+    try:
+        return [(tweet.id, tweet.text) for tweet in iter_archive_tweets(folder, max_tweets)]
+    finally:
+        twitter_archive.CHUNK_SIZE = original
+
+def test_chunk_sizes():
+    """Every chunk size yields the same tweets, decoded and unescaped, in file order"""
+    expected = [(1000 + i, text.replace("&amp;", "&").replace("&lt;", "<")) for i, text in enumerate(TEXTS)]
+    with tempfile.TemporaryDirectory() as folder:
+        write_archive(folder, TEXTS, parts=2)
+        for chunk_size in (1, 2, 3, 5, 64, 1 << 20):
+            assert read_all(folder, chunk_size) == expected, f"chunk size {chunk_size}"
+        assert read_all(folder, 3, max_tweets=4) == expected[:4]
+
+def test_truncated_file():
+    """An archive file cut off inside an entry is reported instead of silently ending early"""
+    with tempfile.TemporaryDirectory() as folder:
+        write_archive(folder, TEXTS)
+        path = os.path.join(folder, "data", "tweets.js")
+        with open(path, "rb") as f:
+            data = f.read()
+        with open(path, "wb") as f:
+            f.write(data[:len(data) // 2])
+        try:
+            read_all(folder, 7)
+        except ValueError as e:
+            assert "Truncated" in str(e)
+        else:
+            raise AssertionError("a truncated archive was read without an error")
+
+if __name__ == "__main__":
+    test_chunk_sizes()
+    test_truncated_file()
+    print("\nTest completed!")
@@ -0,0 +1,91 @@
+"""
+Timeline Fetching Helpers
+Streams a user's tweets page by page by following Twitter API v2 pagination tokens,
+so the cleaners can start analyzing the first page while later pages download.
+"""
+
+import queue
+import threading
+
+from metrics import METRICS
+
+# get_users_tweets accepts between 5 and 100 results per page
+PAGE_SIZE = 100
+MIN_PAGE_SIZE = 5
+
+_DONE = object()
+
+def iter_user_tweets(client, max_tweets=None, page_size=PAGE_SIZE, pagination_token=None, on_page=None,
+                     since_id=None, user_id=None):
+    """Yield the authenticated user's tweets, following pagination_token until max_tweets or the end of the timeline
+
+    Starts at pagination_token when given (to resume a run). on_page(token, next_token, tweets) is
+    called with every page before its tweets are yielded, where token is the one that fetched it.
+    With since_id, the timeline ends at the tweets newer than since_id. user_id saves the get_me call.
+    """
+    if user_id is None:
+        user_id = client.get_me().data.id
+    remaining = max_tweets
+
+    while remaining is None or remaining > 0:
+        per_page = page_size if remaining is None else max(MIN_PAGE_SIZE, min(page_size, remaining))
+        with METRICS.timer("stage_seconds", stage="fetch"):
+            response = client.get_users_tweets(
+                id=user_id,
+                max_results=per_page,
+                pagination_token=pagination_token,
+                since_id=since_id,
+                tweet_fields=["created_at", "text"]
+            )
+
+        page = list(response.data or [])
+        if remaining is not None:
+            page = page[:remaining]
+            remaining -= len(page)
+        next_token = (response.meta or {}).get("next_token")
+        METRICS.inc("fetched_tweets_total", len(page))
+        if on_page is not None:
+            on_page(pagination_token, next_token, page)
+        yield from page
+
+        pagination_token = next_token
+        if not pagination_token:
+            return
+
+def prefetch(iterable, buffer_size=2 * PAGE_SIZE):
+    """Iterate over iterable in a background thread, buffering at most buffer_size items ahead of the consumer"""
+    buffer = queue.Queue(maxsize=buffer_size)
+    stop = threading.Event()
+
+    def put(entry):
+        # Give up once the consumer has gone away so the thread never blocks forever
+        while not stop.is_set():
+            try:
+                buffer.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+        except Exception as e:
+            put((_DONE, e))
+            return
+        put((_DONE, None))
+
+    threading.Thread(target=produce, name="timeline-prefetch", daemon=True).start()
+
+    try:
+        while True:
+            item, error = buffer.get()
+            if item is _DONE:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
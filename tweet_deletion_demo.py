@@ -4,7 +4,9 @@ Tweet Deletion Demo Script
 This script demonstrates how to use the twitter_cleaner.py script to delete tweets based on keywords.
 """
 
-from twitter_cleaner import delete_tweets_with_keywords
+from twitter_cleaner import delete_tweets_with_keywords, execute_deletion_plan
+
+PLAN_PATH = "deletion_plan.json"
 
 def main():
     """
@@ -19,14 +21,18 @@ def main():
     
     # First run in dry-run mode (doesn't actually delete)
     print("\n--- Dry Run (no tweets will be deleted) ---")
-    delete_tweets_with_keywords(keywords=keywords, dry_run=True, max_tweets=50)
+    summary = delete_tweets_with_keywords(keywords=keywords, dry_run=True, max_tweets=50, plan_path=PLAN_PATH)
+    if summary["error"]:
+        print("\nThe dry run did not finish, so there is no deletion plan to execute.")
+        return
     
     # Ask user if they want to proceed with deletion
     response = input("\nDo you want to proceed with tweet deletion? (yes/no): ").lower().strip()
     
     if response == "yes":
         print("\n--- Executing Tweet Deletion ---")
-        delete_tweets_with_keywords(keywords=keywords, dry_run=False, max_tweets=50)
+        # Delete exactly what the dry run found, without fetching or analyzing again
+        execute_deletion_plan(PLAN_PATH)
         print("\nDeletion complete!")
     else:
         print("\nDeletion canceled. No tweets were deleted.")
@@ -0,0 +1,106 @@
+"""
+Twitter Archive Reader
+Reads tweets from the official data export (data/tweets.js and its tweets-partN.js siblings)
+instead of the API, so full-history cleanups spend no read quota and aren't capped at 3200 tweets.
+Files are memory-mapped and decoded one tweet object at a time, so even very large archives
+are never loaded into memory whole.
+"""
+
+import codecs
+import glob
+import html
+import json
+import mmap
+import os
+from datetime import datetime
+
+CHUNK_SIZE = 1 << 20
+_WHITESPACE = " \t\r\n,"
+
+class ArchiveTweet:
+    """A tweet from the archive with the same id/text/created_at fields as API tweets and MockTweet"""
+    __slots__ = ("id", "text", "created_at")
+
+    def __init__(self, id, text, created_at=None):
+        self.id = id
+        self.text = text
+        self.created_at = created_at
+
+def archive_files(path):
+    """Return the tweet files of an archive, given its root folder, its data folder or a single .js file"""
+    if os.path.isfile(path):
+        return [path]
+    data_dir = os.path.join(path, "data") if os.path.isdir(os.path.join(path, "data")) else path
+    # Newer exports use tweets.js, older ones tweet.js; large accounts get extra -partN files
+    for name in ("tweets", "tweet"):
+        first = os.path.join(data_dir, f"{name}.js")
+        if os.path.exists(first):
+            parts = glob.glob(os.path.join(data_dir, f"{name}-part*.js"))
+            parts.sort(key=lambda p: int("".join(filter(str.isdigit, os.path.basename(p))) or 0))
+            return [first] + parts
+    raise FileNotFoundError(f"No tweets.js found in Twitter archive at {path}")
+
+def _parse_created_at(value):
+    try:
+        return datetime.strptime(value, "%a %b %d %H:%M:%S %z %Y")
+    except (TypeError, ValueError):
+        return None
+
+def _to_tweet(entry):
+    """Convert one archive entry ({"tweet": {...}}) into an ArchiveTweet"""
+    tweet = entry.get("tweet", entry)
+    text = tweet.get("full_text", tweet.get("text", ""))
+    # The export keeps the HTML entities the web client shows (&amp;, &lt;, ...)
+    return ArchiveTweet(int(tweet["id_str"]), html.unescape(text), _parse_created_at(tweet.get("created_at")))
+
+def iter_archive_file(file_path):
+    """Yield the tweets of one archive file, decoding one array element at a time from a memory map"""
+    with open(file_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            # Skip the "window.YTD.tweets.part0 = " assignment in front of the JSON array
+            position = data.find(b"[")
+            if position < 0:
+                return
+            position += 1
+            decoder = json.JSONDecoder()
+            utf8 = codecs.getincrementaldecoder("utf-8")()
+            buffer = ""
+            index = 0
+            exhausted = False
+
+            while True:
+                while index < len(buffer) and buffer[index] in _WHITESPACE:
+                    index += 1
+                if index < len(buffer) and buffer[index] == "]":
+                    return
+
+                try:
+                    if index >= len(buffer):
+                        raise json.JSONDecodeError("Need more data", buffer, index)
+                    entry, index = decoder.raw_decode(buffer, index)
+                except json.JSONDecodeError:
+                    if exhausted:
+                        if buffer[index:].strip():
+                            raise ValueError(f"Truncated or malformed archive file: {file_path}")
+                        return
+                    # The element continues past the decoded window; pull in the next chunk
+                    chunk = data[position:position + CHUNK_SIZE]
+                    position += len(chunk)
+                    exhausted = position >= len(data)
+                    buffer = buffer[index:] + utf8.decode(chunk, final=exhausted)
+                    index = 0
+                    continue
+
+                yield _to_tweet(entry)
+
+def iter_archive_tweets(path, max_tweets=None):
+    """Yield tweets from a Twitter archive in file order, stopping after max_tweets"""
+    count = 0
+    for file_path in archive_files(path):
+        for tweet in iter_archive_file(file_path):
+            if max_tweets is not None and count >= max_tweets:
+                return
+            count += 1
+            yield tweet
@@ -1,24 +1,84 @@
 import os
+import sys
 import json
-import tweepy
+import time
+import logging
 import argparse
-from dotenv import load_dotenv
-from strands import Agent
-from strands.models.ollama import OllamaModel
+import threading
+from datetime import datetime, timedelta
+from pipeline import DeleteSink, DryRunSink, JournalSink, Pipeline, PlanSink, api_source
+from twitter_archive import iter_archive_tweets
+from classifier import BATCH_PROMPT_VERSION, DEFAULT_MODEL, classify_batch
+from prefilter import PREFILTER_MODES, KeywordPrefilter
+from dedup import DEFAULT_MAX_DISTANCE, NearDuplicateFilter
+from prompt_profile import SINGLE_PROMPT_VERSION, ClassificationProfile, parse_answer
+from cascade import CASCADE_PROMPT_VERSION, DEFAULT_CASCADE_MODEL, DEFAULT_CONFIDENCE_THRESHOLD, ModelCascade
+from semantic_triage import DEFAULT_DELETE_ABOVE, DEFAULT_EMBEDDING_MODEL, DEFAULT_KEEP_BELOW, SemanticTriage
+from deletion_plan import DeletionPlan
+from agent_classifier import ClassificationAgent
+from backend_selector import DEFAULT_GIVE_UP_SECONDS, BackendSelector, get_backend_selector
+from sync_state import DEFAULT_SYNC_STATE_PATH, SyncState, TimelineProgress
+from checkpoint import DEFAULT_JOURNAL_PATH, CheckpointJournal, JournalState
+from deletion_scheduler import DEFAULT_DELETE_CONCURRENCY, DeletionScheduler
+from model_manager import DEFAULT_HOST, get_model_manager
+from ollama_pool import DEFAULT_HOST_CONCURRENCY, OllamaPool
+from metrics import METRICS, JSONLinesExporter, configure_logging, get_logger, start_prometheus_server
+from decision_cache import DEFAULT_CACHE_PATH, DEFAULT_MAX_AGE_DAYS, DEFAULT_MAX_ENTRIES, DecisionCache, context_hash
 
-# Load environment variables from .env file
-load_dotenv()
+# tweepy, strands, ollama and dotenv are imported by the code paths that use them, so --help,
+# plan execution and fully cached runs don't pay for loading them
 
-def authenticate_twitter():
-    """Authenticate with Twitter API using credentials from environment variables"""
-    consumer_key = os.getenv("TWITTER_CONSUMER_KEY")
-    consumer_secret = os.getenv("TWITTER_CONSUMER_SECRET")
-    access_token = os.getenv("TWITTER_ACCESS_TOKEN")
-    access_token_secret = os.getenv("TWITTER_ACCESS_TOKEN_SECRET")
-    bearer_token = os.getenv("TWITTER_BEARER_TOKEN")
+log = get_logger("twitter_cleaner")
+
+TWITTER_API_URL = "https://api.twitter.com"
+# Names of one account's credentials; by default each is read from TWITTER_<NAME>
+CREDENTIAL_KEYS = ("consumer_key", "consumer_secret", "access_token", "access_token_secret", "bearer_token")
+
+def _base_url_adapter(base_url):
+    """A requests adapter that sends requests meant for api.twitter.com to base_url (e.g. twitter_simulator.py)"""
+    import requests
+    base_url = base_url.rstrip("/")
+
+    class BaseURLAdapter(requests.adapters.HTTPAdapter):
+        def send(self, request, **kwargs):
+            request.url = base_url + request.url[len(TWITTER_API_URL):]
+            return super().send(request, **kwargs)
+
+    return BaseURLAdapter()
+
+def _is_twitter_error(error, name):
+    """Whether error is the tweepy error class `name`, without importing tweepy just to check"""
+    tweepy = sys.modules.get("tweepy")
+    return tweepy is not None and isinstance(error, getattr(tweepy.errors, name))
+
+def load_environment():
+    """Load environment variables from the .env file"""
+    from dotenv import load_dotenv
+    load_dotenv()
+
+def authenticate_twitter(wait_on_rate_limit=True, base_url=None, credentials=None):
+    """Authenticate with Twitter API using credentials from environment variables
+
+    Pass wait_on_rate_limit=False for clients whose caller paces requests itself (the deletion scheduler).
+    base_url (default: the TWITTER_API_BASE_URL environment variable) redirects every API request,
+    e.g. to a local twitter_simulator.py.
+    credentials maps the names in CREDENTIAL_KEYS to one account's values (e.g. from a batch_runner.py
+    manifest) and replaces the TWITTER_* environment variables.
+    """
+    import tweepy
+    load_environment()
+    
+    source = "the account's credentials" if credentials is not None else "environment variables"
+    if credentials is None:
+        credentials = {key: os.getenv(f"TWITTER_{key.upper()}") for key in CREDENTIAL_KEYS}
+    consumer_key = credentials.get("consumer_key")
+    consumer_secret = credentials.get("consumer_secret")
+    access_token = credentials.get("access_token")
+    access_token_secret = credentials.get("access_token_secret")
+    bearer_token = credentials.get("bearer_token")
     
     if not all([consumer_key, consumer_secret, access_token, access_token_secret]):
-        raise ValueError("Twitter API OAuth 1.0a credentials are missing from environment variables")
+        raise ValueError(f"Twitter API OAuth 1.0a credentials are missing from {source}")
     
     # For tweet deletion, OAuth 1.0a authentication is required
     # OAuth 1.0a requires consumer_key, consumer_secret, access_token, access_token_secret
@@ -34,103 +94,329 @@ def authenticate_twitter():
         # OAuth 2.0 credentials (for higher rate limits on read operations)
         bearer_token=bearer_token if bearer_token else None,
         # Make sure we wait for API responses (important for write operations)
-        wait_on_rate_limit=True
+        wait_on_rate_limit=wait_on_rate_limit
     )
     
+    base_url = base_url or os.getenv("TWITTER_API_BASE_URL")
+    if base_url:
+        print(f"Sending Twitter API requests to {base_url}")
+        # tweepy always builds api.twitter.com URLs, so rewrite them on the session
+        client.session.mount(TWITTER_API_URL, _base_url_adapter(base_url))
+    
     return client
 
-def setup_ai_agent(model_name="llama3.2:latest"):
-    """Setup the Strands AI agent"""
-    import importlib
-    
-    print(f"Setting up AI agent with model: {model_name}")
-    
-    # Get strands version
-    strands_version = importlib.import_module('strands').__version__ if hasattr(importlib.import_module('strands'), '__version__') else "unknown"
-    print(f"Using strands version: {strands_version}")
-    
-    # Get ollama package version
-    try:
-        ollama_pkg = importlib.import_module('ollama')
-        ollama_version = ollama_pkg.__version__ if hasattr(ollama_pkg, '__version__') else "unknown"
-        print(f"Using ollama package version: {ollama_version}")
-    except ImportError:
-        print("Ollama package not found")
+def print_write_permissions_help():
+    """Explain how to give the Twitter Developer App write access"""
+    print("\nHow to fix this:")
+    print("1. Go to https://developer.twitter.com/en/portal/dashboard")
+    print("2. Select your project and app")
+    print("3. Go to 'Settings' -> 'User authentication settings'")
+    print("4. Change App permissions to include 'Read and Write'")
+    print("5. Regenerate your Access Token and Secret")
+    print("6. Update your .env file with the new tokens")
+
+def _strands_agent(manager, quiet=False):
+    """A Strands agent on the model and host of a single-host manager"""
+    from strands import Agent
+    from strands.models.ollama import OllamaModel
     
     # Create a configured Ollama model with simplified options
     try:
         # Create an Ollama model with compatibility settings
         ollama_model = OllamaModel(
-            host="http://localhost:11434",
-            model_id=model_name,
+            host=manager.host,
+            model_id=manager.model_name,
+            keep_alive=manager.keep_alive,
             # Pass minimal parameters to avoid incompatibilities
             options={}  # Empty options to avoid potential compatibility issues
         )
         
         # Create an agent with the configured model
+        if quiet:
+            return Agent(model=ollama_model, callback_handler=None)
         return Agent(model=ollama_model)
     except Exception as e:
         print(f"Error initializing agent: {str(e)}")
         raise
 
-def should_delete_tweet(agent, tweet_text, keywords):
-    """Use the AI agent to decide if a tweet should be deleted based on keywords"""
-    prompt = f"""
-    Please analyze the following tweet and determine if it contains or relates to any of these keywords: {', '.join(keywords)}.
+def setup_ai_agent(model_name=DEFAULT_MODEL, host=DEFAULT_HOST, quiet=False):
+    """Setup the Strands AI agent, making sure its model is installed and loaded first
+
+    With a comma-separated host list the agent talks to the least busy healthy host.
+    quiet=True stops the agent from printing its answers as they stream in.
+    """
+    print(f"Setting up AI agent with model: {model_name}")
+    manager = get_model_manager(model_name, host)
+    manager.prepare()
+    return _strands_agent(manager.pick(), quiet)
+
+class FallbackAgent:
+    """Stands in for the Strands agent, building it (and importing strands) only when a call needs it
+
+    The agent is a stateless ClassificationAgent: every prompt is sent with at most history_turns
+    earlier turns, so fallback calls cost the same at the end of a long run as at its start.
+    With several hosts, each call takes a slot on the least busy healthy host, which gets an agent
+    of its own.
+    """
+
+    def __init__(self, model_name=DEFAULT_MODEL, host=DEFAULT_HOST, history_turns=0):
+        self.model_name = model_name
+        self.host = host
+        self.history_turns = history_turns
+        self._agents = {}
+        self._lock = threading.Lock()
+        self._announced = False
+
+    def _classification_agent(self, manager):
+        with self._lock:
+            if manager.host not in self._agents:
+                try:
+                    manager.prepare()
+                    agent = ClassificationAgent(_strands_agent(manager, quiet=True), self.history_turns)
+                except Exception as e:
+                    raise RuntimeError(f"Could not set up the Strands agent on {manager.host}: {str(e)}") from e
+                self._agents[manager.host] = agent
+                if not self._announced:
+                    self._announced = True
+                    log.warning("Direct Ollama calls are failing; classifying with the Strands agent as a fallback")
+            return self._agents[manager.host]
+
+    def _run(self, call):
+        with get_model_manager(self.model_name, self.host, activate=False).lease() as manager:
+            return call(self._classification_agent(manager))
+
+    def __call__(self, prompt):
+        return self._run(lambda agent: agent(prompt))
+
+    def classify_many(self, tweet_texts, keywords):
+        """Decide a batch of tweets through the agent with one JSON prompt"""
+        return self._run(lambda agent: agent.classify_many(tweet_texts, keywords, self.model_name))
+
+def should_delete_tweet(agent, tweet_text, keywords, keep_on_error=True, manager=None, profile=None, selector=None):
+    """Use the AI agent to decide if a tweet should be deleted based on keywords
+
+    Ollama is called through manager, by default the one the agent was set up with, using the
+    prompt layout and generation options of profile (pass one profile per run to reuse it).
+    selector (default: the process-wide one) picks between direct Ollama calls and the agent, and
+    skips a backend whose circuit is open after repeated failures.
+    An answer that is neither YES nor NO (e.g. empty) counts as a failed analysis, not as "keep".
+    With keep_on_error=False a failed analysis raises instead of answering "keep",
+    so callers that remember verdicts never store a guess. When every backend is failing it
+    raises either way, rather than keeping every tweet.
+    """
+    profile = profile or ClassificationProfile(keywords)
+    prompt = profile.prompt(tweet_text)
+    selector = selector or get_backend_selector()
     
-    Tweet: "{tweet_text}"
+    def direct():
+        log.debug("Using direct Ollama API for tweet analysis...")
+        response = profile.generate(manager or get_model_manager(), prompt=prompt)
+        log.debug(f"Ollama direct API response: {response['response'][:20]}...")
+        return parse_answer(response['response'])
     
-    Respond with only "YES" if the tweet should be deleted (contains or strongly relates to any keyword), or "NO" if it should be kept.
-    """
+    def via_agent():
+        # Strands returns an AgentResult, whose text is its string form
+        return parse_answer(str(agent(prompt)))
     
-    # Try direct Ollama access first as a backup approach
     try:
-        import ollama
-        print(f"Using direct Ollama API for tweet analysis...")
-        model_name = "llama3.2:latest"  # Use the same model that the agent was configured with
-        response = ollama.generate(model=model_name, prompt=prompt)
-        result = response['response']
-        print(f"Ollama direct API response: {result[:20]}...")
-        return "YES" in result.upper()
+        return selector.call([("ollama", direct), ("agent", via_agent)])
     except Exception as e:
-        print(f"Direct Ollama API failed: {str(e)}, falling back to agent")
-        
-        # Fall back to using the agent (which might fail depending on compatibility)
-        try:
-            response = agent(prompt)
-            return "YES" in response.upper()
-        except Exception as e:
-            print(f"Agent-based analysis failed: {str(e)}")
-            # If everything fails, be conservative and don't delete
-            return False
-
-def fetch_user_tweets(client, max_results=100):
-    """Fetch recent tweets from the authenticated user"""
+        if not keep_on_error or selector.all_open():
+            raise
+        # An isolated failure: be conservative and don't delete
+        log.warning(f"Tweet analysis failed: {str(e)}, keeping the tweet")
+        return False
+
+def should_delete_tweets(agent, tweet_texts, keywords, manager=None, profile=None, selector=None):
+    """Decide a batch of tweets with one structured call to the first healthy backend, falling back to tweet-by-tweet analysis"""
+    manager = manager or get_model_manager()
+    profile = profile or ClassificationProfile(keywords)
+    selector = selector or get_backend_selector()
+    attempts = [("ollama", lambda: classify_batch(tweet_texts, keywords, manager.model_name,
+                                                  profile.batch_generate(manager, len(tweet_texts))))]
+    # A stateless agent decides the batch with one prompt as well
+    if hasattr(agent, "classify_many"):
+        attempts.append(("agent", lambda: agent.classify_many(tweet_texts, keywords)))
     try:
-        user_id = client.get_me().data.id
-        tweets = client.get_users_tweets(
-            id=user_id,
-            max_results=max_results,
-            tweet_fields=["created_at", "text"]
-        )
-        return tweets.data if tweets.data else []
-    except tweepy.errors.TooManyRequests:
-        print("Twitter API rate limit reached. Please wait a few minutes and try again.")
-        return []
+        return selector.call(attempts)
     except Exception as e:
-        print(f"Error fetching tweets: {str(e)}")
-        return []
+        if selector.all_open():
+            raise
+        log.warning(f"Batched analysis failed: {str(e)}, analyzing tweets one by one")
+    return [should_delete_tweet(agent, tweet_text, keywords, keep_on_error=False, manager=manager, profile=profile,
+                                selector=selector)
+            for tweet_text in tweet_texts]
+
+def build_classifier(agent, keywords, batch_size=1, prefilter_mode="hits", manager=None,
+                     cascade_model=None, cascade_threshold=DEFAULT_CONFIDENCE_THRESHOLD,
+                     triage=False, triage_model=DEFAULT_EMBEDDING_MODEL,
+                     keep_below=DEFAULT_KEEP_BELOW, delete_above=DEFAULT_DELETE_ABOVE,
+                     cache_path=DEFAULT_CACHE_PATH, cache_max_entries=DEFAULT_MAX_ENTRIES,
+                     cache_max_age_days=DEFAULT_MAX_AGE_DAYS, dedup=False, dedup_distance=DEFAULT_MAX_DISTANCE,
+                     give_up_seconds=DEFAULT_GIVE_UP_SECONDS, instrument=None):
+    """Compose the classification stages into one batch classifier, cheapest stage first
+
+    Returns (classify_batch, stages) where stages are the enabled stage objects, outermost first,
+    followed by the prompt profile whose statistics cover the model calls and the backend selector.
+    instrument(name, classify_batch), if given, may wrap each layer as it is added (e.g. to time it).
+    give_up_seconds is how long every backend may fail before the run is stopped.
+    """
+    instrument = instrument or (lambda name, classify: classify)
+    manager = manager or get_model_manager()
+    # One profile per run, so its prompt prefix stays identical and its statistics cover every main-model call
+    profile = ClassificationProfile(keywords)
+    # Per-run circuit breakers for direct Ollama calls and the agent
+    selector = BackendSelector(give_up_seconds=give_up_seconds)
+    stages = []
+    if batch_size > 1:
+        classify = lambda batch: should_delete_tweets(agent, [tweet.text for tweet in batch], keywords, manager, profile,
+                                                      selector)
+    else:
+        classify = lambda batch: [should_delete_tweet(agent, tweet.text, keywords, keep_on_error=False,
+                                                      manager=manager, profile=profile, selector=selector)
+                                  for tweet in batch]
+    classify = instrument("model", classify)
+
+    # Let a small model answer the tweets it is confident about
+    if cascade_model:
+        # Prepared by its first request; if that fails, the cascade escalates to the main model
+        small_manager = get_model_manager(cascade_model, manager.host, activate=False)
+        cascade = ModelCascade(keywords, small_manager, cascade_threshold)
+        classify = instrument("cascade", cascade.wrap(classify))
+        stages.insert(0, cascade)
+
+    # Decide clearly related and clearly unrelated tweets from embeddings
+    if triage:
+        semantic_triage = SemanticTriage(keywords, triage_model, keep_below, delete_above, manager)
+        classify = instrument("triage", semantic_triage.wrap(classify))
+        stages.insert(0, semantic_triage)
+
+    # Reuse verdicts from earlier runs (including the dry run before an execute)
+    if cache_path:
+        prompt_version = f"batch-{BATCH_PROMPT_VERSION}" if batch_size > 1 else f"single-{SINGLE_PROMPT_VERSION}"
+        triage_settings = (triage_model, keep_below, delete_above) if triage else ()
+        cascade_settings = (cascade_model, cascade_threshold, CASCADE_PROMPT_VERSION) if cascade_model else ()
+        context = context_hash(keywords, manager.model_name, prompt_version, *triage_settings, *cascade_settings)
+        cache = DecisionCache(cache_path, cache_max_entries, cache_max_age_days)
+        classify = instrument("cache", cache.wrap(classify, context))
+        stages.insert(0, cache)
+
+    # Classify one tweet per group of near-duplicates and give its verdict to the rest
+    if dedup:
+        # Group verdicts expire like cached ones, which matters in the long-running classification service
+        near_duplicates = NearDuplicateFilter(dedup_distance, max_age=cache_max_age_days * 86400 if cache_path else None)
+        classify = instrument("dedup", near_duplicates.wrap(classify))
+        stages.insert(0, near_duplicates)
+
+    # Settle literal keyword hits (and, if aggressive, unrelated tweets) without the model
+    if prefilter_mode != "off":
+        prefilter = KeywordPrefilter(keywords, prefilter_mode)
+        classify = instrument("prefilter", prefilter.wrap(classify))
+        stages.insert(0, prefilter)
+
+    classify = instrument("classify", classify)
+    stages.extend([profile, selector])
+    # A pool of hosts reports how the requests spread over them
+    if hasattr(manager, "summary"):
+        stages.append(manager)
+    return classify, stages
+
+def read_ahead(tweets, stages):
+    """Let the stages that work ahead of the classifier (semantic triage embeds in windows) see the source first
+
+    Each such stage only works on the tweets that the stages in front of it (stages lists the
+    outermost first) leave undecided.
+    """
+    outer = []
+
+    def undecided(stages):
+        def remaining(batch):
+            for stage in stages:
+                batch = stage.undecided(batch)
+            return batch
+        return remaining
+
+    for stage in stages:
+        if hasattr(stage, "lookahead"):
+            tweets = stage.lookahead(tweets, undecided=undecided(list(outer)))
+        if hasattr(stage, "undecided"):
+            outer.append(stage)
+    return tweets
+
+def start_deletion_scheduler(concurrency=DEFAULT_DELETE_CONCURRENCY, on_deleted=None, credentials=None):
+    """Create a deletion scheduler on its own client, which reports 429s instead of sleeping on them"""
+    return DeletionScheduler(authenticate_twitter(wait_on_rate_limit=False, credentials=credentials),
+                             concurrency, on_deleted)
+
+# The error of a new run that would overwrite the journal of an unfinished one
+UNFINISHED_JOURNAL_ERROR = "the journal records an unfinished run"
+
+def delete_tweets_with_keywords(keywords, dry_run=True, max_tweets=100, concurrency=1, batch_size=1, plan_path=None,
+                                delete_concurrency=DEFAULT_DELETE_CONCURRENCY, journal_path=DEFAULT_JOURNAL_PATH,
+                                resume=False, fresh=False, archive_path=None, model_name=DEFAULT_MODEL, ollama_host=DEFAULT_HOST,
+                                credentials=None, incremental=False, sync_state_path=DEFAULT_SYNC_STATE_PATH,
+                                service_url=None, host_concurrency=DEFAULT_HOST_CONCURRENCY, verify_write=True,
+                                **classifier_options):
+    """Delete tweets containing specified keywords
 
-def delete_tweets_with_keywords(keywords, dry_run=True, max_tweets=100):
-    """Delete tweets containing specified keywords"""
+    With archive_path, tweets are read from a Twitter data export instead of the API, and a dry run
+    never touches the network. A dry run with plan_path saves the tweets it would delete for execute_deletion_plan;
+    it removes any earlier plan first and only writes the new one if the run finishes without an error.
+    Tweets flow through a pipeline.Pipeline, so fetching, classification and deletion (paced to the
+    API's rate limits) overlap instead of taking turns.
+    Progress is journaled to journal_path; resume=True continues an interrupted run from it. A new
+    run refuses to overwrite the journal of an unfinished run unless fresh=True.
+    classifier_options are passed to build_classifier (prefilter, triage and cache settings).
+    Per-tweet messages are logged; stage timings and Ollama token counts are recorded in metrics.METRICS.
+    credentials selects the account (see authenticate_twitter); by default it comes from the environment.
+    With incremental=True only tweets newer than the last completed run's newest tweet are fetched;
+    the mark is kept per account in sync_state_path and only advances after a run without failures.
+    A first incremental run that stops at max_tweets sets the mark from the tweets it fetched.
+    With service_url, a running classification_service.py decides the tweets instead of a local
+    classifier, and classifier_options are ignored.
+    ollama_host may list several comma-separated hosts; classification then spreads over them with
+    at most host_concurrency requests per host (see ollama_pool).
+    Before deleting, write permissions are verified by posting and deleting a test tweet; pass
+    verify_write=False when they were already verified (e.g. by the first run of a watch loop).
+    
+    Returns a summary dict: tweets analyzed, deleted (or that would be deleted in a dry run), errors,
+    the stage summaries, elapsed seconds and, if the run could not finish, the reason in "error".
+    "write_verified" is set once the test tweet was posted and deleted.
+    """
+    configure_logging()
+    started = time.monotonic()
+    summary = {"keywords": list(keywords), "dry_run": dry_run, "analyzed": 0, "deleted": 0, "errors": 0,
+               "stages": [], "error": None}
     try:
-        # Authenticate with Twitter
-        print("Authenticating with Twitter API...")
-        client = authenticate_twitter()
-        print("Authentication successful!")
+        # The journal of an interrupted run is the only record of what it already deleted
+        if journal_path and not resume and not fresh:
+            try:
+                unfinished = not JournalState(journal_path).done
+            except FileNotFoundError:
+                unfinished = False
+            if unfinished:
+                print(f"Error: {journal_path} records a run that did not finish. Continue it with --resume, "
+                      f"or pass --fresh to start a new run and discard it.")
+                summary["error"] = UNFINISHED_JOURNAL_ERROR
+                return summary
+        
+        # A plan left by an earlier dry run (maybe for other keywords) must never be executed in place of this one
+        if dry_run and plan_path:
+            try:
+                os.remove(plan_path)
+            except FileNotFoundError:
+                pass
+        
+        # Authenticate with Twitter (a dry run over an archive needs no API access at all)
+        client = None
+        if archive_path is None or not dry_run:
+            print("Authenticating with Twitter API...")
+            with METRICS.timer("stage_seconds", stage="auth"):
+                client = authenticate_twitter(credentials=credentials)
+            print("Authentication successful!")
         
         # Verify write permissions (only needed when actually deleting)
-        if not dry_run:
+        if not dry_run and verify_write:
             print("Verifying Twitter API write permissions...")
             try:
                 # Try to post a temporary test tweet to verify write permissions
@@ -138,97 +424,402 @@ def delete_tweets_with_keywords(keywords, dry_run=True, max_tweets=100):
                 test_tweet = client.create_tweet(text="Testing API permissions... (will be deleted immediately)")
                 client.delete_tweet(test_tweet.data['id'])
                 print("Write permissions verified successfully!")
+                summary["write_verified"] = True
             except Exception as e:
                 error_msg = str(e)
                 if "oauth1 app permissions" in error_msg.lower():
                     print("\n⚠️ ERROR: Your Twitter Developer App does not have Write permissions!")
-                    print("\nHow to fix this:")
-                    print("1. Go to https://developer.twitter.com/en/portal/dashboard")
-                    print("2. Select your project and app")
-                    print("3. Go to 'Settings' -> 'User authentication settings'")
-                    print("4. Change App permissions to include 'Read and Write'")
-                    print("5. Regenerate your Access Token and Secret")
-                    print("6. Update your .env file with the new tokens")
-                    return
+                    print_write_permissions_help()
+                    summary["error"] = "the app does not have write permissions"
+                    return summary
                 else:
                     print(f"Warning: Could not verify write permissions: {error_msg}")
                     print("Continuing anyway, but deletion may fail...")
         
-        # Setup AI agent
-        print("Setting up AI agent...")
-        agent = setup_ai_agent()
-        print("AI agent ready!")
+        # On a single host the model is checked and loaded by its first request, and the Strands agent is
+        # only set up if direct Ollama calls fail, so a run answered from the cache never touches either
+        agent = FallbackAgent(model_name, ollama_host)
+        
+        # Several hosts are loaded up front, so a missing model or dead host shows before the run starts
+        if service_url is None:
+            manager = get_model_manager(model_name, ollama_host, max_outstanding=host_concurrency)
+            if isinstance(manager, OllamaPool):
+                manager.prepare()
+        
+        # Pick up where an interrupted run stopped
+        state = None
+        pagination_token = None
+        finished_ids = []
+        if resume:
+            try:
+                state = JournalState(journal_path)
+            except FileNotFoundError:
+                print(f"Error: No journal found at {journal_path}; nothing to resume.")
+                summary["error"] = f"no journal found at {journal_path}"
+                return summary
+            if state.done:
+                print(f"The run journaled in {journal_path} already finished; nothing to resume.")
+                return summary
+            if state.run and sorted(state.run["keywords"]) != sorted(keywords):
+                print(f"Error: {journal_path} was recorded for keywords {state.run['keywords']}. "
+                      f"Resume with the same keywords or start a new run.")
+                summary["error"] = f"{journal_path} was recorded for other keywords"
+                return summary
+            if state.run and state.run["dry_run"] != dry_run:
+                recorded = "a dry run" if state.run["dry_run"] else "an --execute run"
+                print(f"Error: {journal_path} was recorded by {recorded}. Resume it in the same mode or start "
+                      f"a new run with --fresh.")
+                summary["error"] = f"{journal_path} was recorded in the other mode"
+                return summary
+            if state.timeline_exhausted():
+                finished_ids = list(state.verdicts)
+            else:
+                pagination_token, finished_ids = state.resume_point()
+            print(f"Resuming from {journal_path}: {len(state.verdicts)} tweets already decided, "
+                  f"{len(state.deleted)} already deleted")
+        
+        journal = CheckpointJournal(journal_path, append=resume) if journal_path else None
+        if journal is not None and not resume:
+            journal.start(keywords, dry_run, max_tweets)
+        
+        # Only fetch what the last completed run hasn't covered
+        sync = user_id = since_id = None
+        if incremental and archive_path is None:
+            sync = SyncState(sync_state_path)
+            user_id = client.get_me().data.id
+            since_id = sync.since_id(user_id, keywords, dry_run)
+            if since_id:
+                print(f"Incremental run: only fetching tweets newer than {since_id}")
+            else:
+                print(f"Incremental run: no completed {'dry run' if dry_run else 'run'} with these keywords "
+                      f"is recorded in {sync_state_path} yet")
+        progress = TimelineProgress(journal.page if journal is not None else None)
         
         # Fetch user tweets
-        print(f"Fetching up to {max_tweets} recent tweets...")
-        tweets = fetch_user_tweets(client, max_results=max_tweets)
+        fetch_limit = max(0, max_tweets - len(finished_ids)) if max_tweets else None
+        if (state is not None and state.timeline_exhausted()) or fetch_limit == 0:
+            tweets = iter(())
+        elif archive_path is not None:
+            print(f"Reading {'up to ' + str(fetch_limit) if fetch_limit else 'all'} tweets from archive {archive_path}...")
+            tweets = iter_archive_tweets(archive_path, fetch_limit)
+        else:
+            if fetch_limit:
+                print(f"Fetching up to {fetch_limit} recent tweets...")
+            else:
+                print("Fetching the whole timeline...")
+            tweets = api_source(client, fetch_limit, pagination_token, on_page=progress,
+                                since_id=since_id, user_id=user_id)
         
-        if not tweets:
-            print("No tweets were found or there was an error fetching tweets.")
-            return
+        # Fetching, classification and deletion overlap; results come back in timeline order
+        deleted_count = 0
+        analyzed_count = 0
+        already_deleted = 0
+        if service_url:
+            # The service's warm model and cache decide the tweets, batched with other clients' requests
+            from classification_service import ClassificationClient
+            service = ClassificationClient(service_url, keywords)
+            classify, stages = METRICS.instrument("classify", service.classify), [service]
+        else:
+            manager = get_model_manager(model_name, ollama_host, max_outstanding=host_concurrency)
+            classify, stages = build_classifier(agent, keywords, batch_size, manager=manager,
+                                                instrument=METRICS.instrument, **classifier_options)
+            tweets = read_ahead(tweets, stages)
+        if state is not None:
+            classify = state.known_verdicts(classify)
+        plan = DeletionPlan(keywords, model_name) if dry_run and plan_path else None
+        scheduler = None
+        sinks = []
+        if journal is not None:
+            sinks.append(JournalSink(journal, state.verdicts if state is not None else ()))
+        if dry_run:
+            sinks.append(DryRunSink())
+            if plan is not None:
+                sinks.append(PlanSink(plan))
+        else:
+            scheduler = start_deletion_scheduler(delete_concurrency, journal.deleted if journal is not None else None,
+                                                 credentials)
+            delete_sink = DeleteSink(scheduler, state.deleted if state is not None else ())
+            sinks.append(delete_sink)
+        pipeline = Pipeline(tweets, classify, sinks, concurrency, batch_size)
+        completed = False
+        try:
+            # Tweets the interrupted run fully decided are not fetched again
+            for tweet_id in finished_ids:
+                analyzed_count += 1
+                if not state.verdicts[tweet_id]:
+                    continue
+                if dry_run:
+                    deleted_count += 1
+                    if plan is not None:
+                        plan.add_hashed(tweet_id, state.hashes[tweet_id])
+                elif tweet_id in state.deleted:
+                    already_deleted += 1
+                else:
+                    scheduler.submit(tweet_id)
             
-        print(f"Found {len(tweets)} tweets")
+            analyzed_count += pipeline.run()
+            completed = True
+        finally:
+            pipeline.close(cancel=not completed)
+            if journal is not None:
+                if completed and pipeline.stopped is None and not (scheduler is not None and scheduler.fatal):
+                    journal.finish()
+                journal.close()
+            for stage in stages:
+                if hasattr(stage, "close"):
+                    stage.close()
         
-        # Process tweets
-        deleted_count = 0
-        for tweet in tweets:
-            print(f"Analyzing tweet: {tweet.text[:50]}...")
-            try:
-                should_delete = should_delete_tweet(agent, tweet.text, keywords)
-                if should_delete:
-                    if dry_run:
-                        print(f"Would delete tweet (ID: {tweet.id}): {tweet.text}")
-                    else:
-                        try:
-                            client.delete_tweet(tweet.id)
-                            print(f"Deleted tweet (ID: {tweet.id}): {tweet.text}")
-                            deleted_count += 1
-                        except Exception as e:
-                            error_msg = str(e)
-                            if "oauth1 app permissions" in error_msg.lower():
-                                print("\n⚠️ ERROR: Your Twitter Developer App does not have Write permissions!")
-                                print("Please update your app permissions as described above and try again.")
-                                return
-                            else:
-                                print(f"Error deleting tweet: {error_msg}")
-                elif not dry_run:
-                    print(f"Keeping tweet: {tweet.text[:50]}...")
-            except Exception as e:
-                print(f"Error analyzing tweet: {str(e)}")
-                continue
+        summary["errors"] = pipeline.errors
+        if scheduler is not None:
+            deleted_count = scheduler.deleted + already_deleted + delete_sink.already_deleted
+            summary.update(deleted=deleted_count, analyzed=analyzed_count)
+            if scheduler.fatal:
+                print("\n⚠️ ERROR: Your Twitter Developer App does not have Write permissions!")
+                print("Please update your app permissions as described above and try again.")
+                summary["error"] = "the app does not have write permissions"
+                return summary
+        else:
+            deleted_count += pipeline.to_delete
+            summary.update(deleted=deleted_count, analyzed=analyzed_count)
+        if pipeline.stopped:
+            print(f"\n⚠️ ERROR: The run stopped early: {pipeline.stopped}")
+            if journal is not None:
+                print("Progress is saved in the journal; fix the problem and run again with --resume to continue.")
+            summary["error"] = pipeline.stopped
+        
+        if sync is not None:
+            failed = pipeline.errors or pipeline.stopped or (scheduler is not None and scheduler.failed)
+            reached_limit = bool(fetch_limit) and progress.fetched >= fetch_limit
+            if failed:
+                print("Not advancing the incremental sync mark: some tweets could not be classified or deleted")
+            elif since_id is None and reached_limit and progress.newest_id:
+                # A first run covers the newest --max tweets; later runs continue from there
+                sync.advance(user_id, keywords, dry_run, progress.newest_id)
+                summary["since_id"] = sync.since_id(user_id, keywords, dry_run)
+                print(f"Incremental sync starts from the newest {progress.fetched} tweets; older tweets are "
+                      f"not revisited by incremental runs (use --max 0 once to cover the whole timeline)")
+            elif not progress.exhausted or reached_limit:
+                print("Not advancing the incremental sync mark: the run did not reach the tweets covered before "
+                      "(raise --max or check the fetch errors above)")
+            else:
+                sync.advance(user_id, keywords, dry_run, progress.newest_id or since_id)
+                summary["since_id"] = sync.since_id(user_id, keywords, dry_run)
+        
+        # Save the plan of every finished dry run, even an empty one, so it always matches the latest run
+        if plan is not None and summary["error"] is None:
+            plan.analyzed = analyzed_count
+            plan.save(plan_path)
+        
+        if not analyzed_count:
+            print("No new tweets since the last run." if since_id else
+                  "No tweets were found or there was an error fetching tweets.")
+            return summary
         
         # Summary
         action = "Would delete" if dry_run else "Deleted"
-        print(f"\nSummary: {action} {deleted_count} out of {len(tweets)} tweets based on keywords: {keywords}")
+        print(f"\nSummary: {action} {deleted_count} out of {analyzed_count} tweets based on keywords: {keywords}")
+        summary["stages"] = [stage.summary() for stage in stages]
+        for stage_summary in summary["stages"]:
+            print(stage_summary)
+        print(METRICS.summary())
+        
+        if plan is not None and summary["error"] is None:
+            print(f"Deletion plan saved to {plan_path}. Run with --execute --plan {plan_path} to delete these tweets.")
         
-    except tweepy.errors.Unauthorized:
-        print("Error: Twitter API authentication failed. Please check your credentials in the .env file.")
-    except tweepy.errors.TooManyRequests:
-        print("Error: Twitter API rate limit reached. Please wait a few minutes and try again.")
+    except KeyboardInterrupt:
+        print("\nInterrupted. Progress is saved in the journal; run again with --resume to continue.")
+        summary["error"] = "interrupted"
     except Exception as e:
         error_msg = str(e)
-        print(f"Error: {error_msg}")
-        
-        # Provide helpful guidance for common errors
-        if "oauth1 app permissions" in error_msg.lower():
-            print("\n⚠️ Your Twitter Developer App does not have the required permissions!")
-            print("\nHow to fix this:")
-            print("1. Go to https://developer.twitter.com/en/portal/dashboard")
-            print("2. Select your project and app")
-            print("3. Go to 'Settings' -> 'User authentication settings'")
-            print("4. Change App permissions to include 'Read and Write'")
-            print("5. Regenerate your Access Token and Secret")
-            print("6. Update your .env file with the new tokens")
+        summary["error"] = error_msg
+        if _is_twitter_error(e, "Unauthorized"):
+            print("Error: Twitter API authentication failed. Please check your credentials in the .env file.")
+        elif _is_twitter_error(e, "TooManyRequests"):
+            print("Error: Twitter API rate limit reached. Please wait a few minutes and try again.")
+        else:
+            print(f"Error: {error_msg}")
+            
+            # Provide helpful guidance for common errors
+            if "oauth1 app permissions" in error_msg.lower():
+                print("\n⚠️ Your Twitter Developer App does not have the required permissions!")
+                print_write_permissions_help()
+    finally:
+        summary["elapsed_s"] = round(time.monotonic() - started, 2)
+    return summary
+
+def execute_deletion_plan(plan_path, check_stale=False, delete_concurrency=DEFAULT_DELETE_CONCURRENCY):
+    """Delete the tweets chosen by an earlier dry run without fetching or classifying anything"""
+    configure_logging()
+    try:
+        plan = DeletionPlan.load(plan_path)
+        print(f"Loaded deletion plan from {plan.created_at}: {len(plan.tweets)} of {plan.analyzed} analyzed tweets "
+              f"matched keywords {plan.keywords} (model: {plan.model_name})")
+        
+        # Authenticate with Twitter
+        print("Authenticating with Twitter API...")
+        client = authenticate_twitter()
+        print("Authentication successful!")
+        
+        tweet_ids = [entry["id"] for entry in plan.tweets]
+        if check_stale:
+            print("Checking planned tweets for changes since the dry run...")
+            stale = plan.find_stale(client)
+            for tweet_id, reason in stale.items():
+                print(f"Skipping tweet (ID: {tweet_id}): {reason}")
+            tweet_ids = [tweet_id for tweet_id in tweet_ids if tweet_id not in stale]
+        
+        scheduler = start_deletion_scheduler(delete_concurrency)
+        try:
+            for tweet_id in tweet_ids:
+                scheduler.submit(tweet_id)
+        finally:
+            scheduler.close()
+        
+        if scheduler.fatal:
+            print("\n⚠️ ERROR: Your Twitter Developer App does not have Write permissions!")
+            print_write_permissions_help()
+            return
+        
+        deleted_count = scheduler.deleted
+        print(f"\nSummary: Deleted {deleted_count} out of {len(plan.tweets)} planned tweets based on keywords: {plan.keywords}")
+        
+    except FileNotFoundError:
+        print(f"Error: Deletion plan {plan_path} was not found. Run a dry run with --plan first.")
+    except Exception as e:
+        if _is_twitter_error(e, "Unauthorized"):
+            print("Error: Twitter API authentication failed. Please check your credentials in the .env file.")
+        elif _is_twitter_error(e, "TooManyRequests"):
+            print("Error: Twitter API rate limit reached. Please wait a few minutes and try again.")
+        else:
+            print(f"Error: {str(e)}")
+
+def run(args, verify_write=True, fresh=False):
+    """Run the cleanup the parsed command line asks for; returns the run summary of a cleanup run"""
+    if args.execute and args.plan:
+        execute_deletion_plan(args.plan, args.check_stale, args.delete_concurrency)
+        return None
+    
+    return delete_tweets_with_keywords(
+        args.keywords, not args.execute, args.max, args.concurrency, args.batch_size,
+        plan_path=args.plan,
+        delete_concurrency=args.delete_concurrency,
+        journal_path=None if args.no_journal else args.journal,
+        resume=args.resume,
+        fresh=args.fresh or fresh,
+        archive_path=args.archive,
+        model_name=args.model,
+        ollama_host=args.host,
+        prefilter_mode=args.prefilter,
+        cascade_model=args.cascade_model,
+        cascade_threshold=args.cascade_threshold,
+        triage=args.triage,
+        triage_model=args.triage_model,
+        keep_below=args.triage_keep_below,
+        delete_above=args.triage_delete_above,
+        cache_path=None if args.no_cache else args.cache,
+        cache_max_entries=args.cache_max_entries,
+        cache_max_age_days=args.cache_max_age_days,
+        dedup=args.dedup,
+        dedup_distance=args.dedup_distance,
+        incremental=args.incremental or args.watch is not None,
+        sync_state_path=args.sync_state,
+        service_url=args.service,
+        host_concurrency=args.host_concurrency,
+        verify_write=verify_write
+    )
+
+def watch(args):
+    """Repeat the incremental run every args.watch seconds until interrupted"""
+    # The check posts and deletes a public test tweet, so it runs until one run passes it, not every cycle
+    verify_write = True
+    fresh = False
+    while True:
+        summary = run(args, verify_write, fresh)
+        if summary is not None and (summary["error"] == "interrupted" or summary["error"] == UNFINISHED_JOURNAL_ERROR):
+            return
+        # From here on an unfinished journal is the last cycle's, whose tweets the next cycle covers again
+        fresh = True
+        if summary is not None and summary.get("write_verified"):
+            verify_write = False
+        next_run = datetime.now() + timedelta(seconds=args.watch)
+        print(f"\nNext run at {next_run.strftime('%H:%M:%S')} (Ctrl-C to stop)")
+        try:
+            time.sleep(args.watch)
+        except KeyboardInterrupt:
+            print("\nStopped watching.")
+            return
 
 def main():
     parser = argparse.ArgumentParser(description='Delete tweets containing specified keywords')
-    parser.add_argument('--keywords', nargs='+', required=True, help='Keywords to search for in tweets')
+    parser.add_argument('--keywords', nargs='+', help='Keywords to search for in tweets')
     parser.add_argument('--execute', action='store_true', help='Actually delete tweets. Without this flag, runs in dry-run mode.')
-    parser.add_argument('--max', type=int, default=100, help='Maximum number of recent tweets to analyze')
+    parser.add_argument('--max', type=int, default=100, help='Maximum number of recent tweets to analyze (0 for the whole timeline)')
+    parser.add_argument('--archive', help='Read tweets from a Twitter data export (its folder or data/tweets.js) instead of the API')
+    parser.add_argument('--model', default=DEFAULT_MODEL, help=f'Ollama model that classifies tweets (default: {DEFAULT_MODEL})')
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f'Ollama server URL, or several comma-separated URLs to spread classification over (default: {DEFAULT_HOST})')
+    parser.add_argument('--host-concurrency', type=int, default=DEFAULT_HOST_CONCURRENCY, help=f'With several --host URLs, the most requests each host gets at once (default: {DEFAULT_HOST_CONCURRENCY})')
+    parser.add_argument('--concurrency', type=int, default=1, help='Number of tweets (or batches) to classify in parallel')
+    parser.add_argument('--batch-size', type=int, default=1, help='Number of tweets to classify per model call (JSON verdicts when above 1)')
+    parser.add_argument('--prefilter', choices=PREFILTER_MODES, default='hits', help='How much the keyword prefilter decides without the model (default: hits)')
+    parser.add_argument('--cascade-model', nargs='?', const=DEFAULT_CASCADE_MODEL, help=f'Small Ollama model that answers confident tweets first; only the rest go to --model (default when given without a model: {DEFAULT_CASCADE_MODEL})')
+    parser.add_argument('--cascade-threshold', type=float, default=DEFAULT_CONFIDENCE_THRESHOLD, help=f'Confidence the small model needs to settle a tweet (default: {DEFAULT_CONFIDENCE_THRESHOLD})')
+    parser.add_argument('--triage', action='store_true', help='Settle confident keeps and deletes from embedding similarity before the model')
+    parser.add_argument('--triage-model', default=DEFAULT_EMBEDDING_MODEL, help=f'Ollama embedding model for --triage (default: {DEFAULT_EMBEDDING_MODEL})')
+    parser.add_argument('--triage-keep-below', type=float, default=DEFAULT_KEEP_BELOW, help='Keep tweets whose best keyword similarity is at or below this')
+    parser.add_argument('--triage-delete-above', type=float, default=DEFAULT_DELETE_ABOVE, help='Delete tweets whose best keyword similarity is at or above this')
+    parser.add_argument('--dedup', action='store_true', help='Classify one tweet per group of near-duplicates (retweets, templated posts, tracking links) and give its verdict to the rest')
+    parser.add_argument('--dedup-distance', type=int, default=DEFAULT_MAX_DISTANCE, help=f'How many of the 64 fingerprint bits near-duplicates may differ in, 0-3 (default: {DEFAULT_MAX_DISTANCE})')
+    parser.add_argument('--cache', default=DEFAULT_CACHE_PATH, help=f'SQLite file for remembered verdicts (default: {DEFAULT_CACHE_PATH})')
+    parser.add_argument('--no-cache', action='store_true', help='Classify every tweet from scratch without reading or writing the cache')
+    parser.add_argument('--cache-max-entries', type=int, default=DEFAULT_MAX_ENTRIES, help='Evict least recently used verdicts beyond this many')
+    parser.add_argument('--cache-max-age-days', type=float, default=DEFAULT_MAX_AGE_DAYS, help='Evict verdicts older than this many days')
+    
+    parser.add_argument('--service', help='URL of a running classification_service.py that classifies the tweets instead of a local model (e.g. http://127.0.0.1:8765)')
+    
+    parser.add_argument('--plan', help='Dry run: save the tweets to delete to this file. With --execute: delete exactly the tweets in this file.')
+    parser.add_argument('--journal', default=DEFAULT_JOURNAL_PATH, help=f'Checkpoint journal for crash-safe resume (default: {DEFAULT_JOURNAL_PATH})')
+    parser.add_argument('--no-journal', action='store_true', help='Do not record a checkpoint journal')
+    parser.add_argument('--resume', action='store_true', help='Continue the interrupted run recorded in --journal')
+    parser.add_argument('--fresh', action='store_true', help='Start a new run even if --journal records an unfinished one, discarding it')
+    parser.add_argument('--delete-concurrency', type=int, default=DEFAULT_DELETE_CONCURRENCY, help='Number of deletions sent in parallel, within the API rate limit')
+    parser.add_argument('--log-level', choices=['debug', 'info', 'warning'], default='info', help='debug also shows every kept tweet and model answer (default: info)')
+    parser.add_argument('--metrics-file', help='Append a JSON-lines snapshot of the run metrics to this file every few seconds')
+    parser.add_argument('--metrics-port', type=int, help='Serve the run metrics for Prometheus on http://127.0.0.1:<port>/metrics')
+    parser.add_argument('--check-stale', action='store_true', help='With --execute --plan, skip planned tweets that were deleted or edited since the dry run')
+    parser.add_argument('--incremental', action='store_true', help='Only fetch tweets newer than the newest tweet of the last completed run')
+    parser.add_argument('--sync-state', default=DEFAULT_SYNC_STATE_PATH, help=f'File with the per-account marks of --incremental (default: {DEFAULT_SYNC_STATE_PATH})')
+    parser.add_argument('--watch', type=float, metavar='SECONDS', help='Keep running incrementally, starting a new run this many seconds after the last one ended')
     
     args = parser.parse_args()
     
-    delete_tweets_with_keywords(args.keywords, not args.execute, args.max)
+    if not args.keywords and not (args.execute and args.plan):
+        parser.error("--keywords is required unless executing a saved --plan")
+    if args.keywords is not None and not all(keyword.strip() for keyword in args.keywords):
+        parser.error("--keywords must not be blank")
+    if args.resume and args.no_journal:
+        parser.error("--resume needs the journal; drop --no-journal")
+    if args.resume and args.fresh:
+        parser.error("--resume and --fresh are mutually exclusive")
+    if (args.incremental or args.watch is not None) and (args.archive or args.resume or (args.execute and args.plan)):
+        parser.error("--incremental and --watch read the live timeline; they can't be combined with --archive, --resume or --execute --plan")
+    if not 0 <= args.dedup_distance <= 3:
+        parser.error("--dedup-distance must be between 0 and 3")
+    if args.watch is not None and args.watch <= 0:
+        parser.error("--watch needs a positive number of seconds")
+    
+    configure_logging(getattr(logging, args.log_level.upper()), force=True)
+    exporter = JSONLinesExporter(args.metrics_file) if args.metrics_file else None
+    server = start_prometheus_server(args.metrics_port) if args.metrics_port else None
+    try:
+        if args.watch is not None:
+            watch(args)
+        else:
+            run(args)
+    finally:
+        if exporter is not None:
+            exporter.close()
+        if server is not None:
+            server.shutdown()
 
 if __name__ == "__main__":
     main()
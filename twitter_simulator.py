@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Twitter API v2 Simulator
+A local stand-in for the endpoints the cleaners use: get_me, the user timeline with pagination
+tokens and since_id, tweet lookup, create_tweet and delete_tweet. Every endpoint has its own
+fixed-window rate limit, reported through x-rate-limit-* headers and enforced with 429s, and
+latency and server errors can be injected. Point the cleaners at it with
+TWITTER_API_BASE_URL=http://127.0.0.1:<port>.
+"""
+
+import argparse
+import bisect
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from corpus import synthetic_corpus
+from twitter_archive import iter_archive_tweets
+
+USER_ID = "1000000000"
+USERNAME = "simulated_user"
+# The v2 timeline only reaches this far back
+DEFAULT_TIMELINE_CAP = 3200
+DEFAULT_WINDOW_SECONDS = 15 * 60
+# Per-user limits of the real API for each 15-minute window
+DEFAULT_LIMITS = {
+    "GET /2/users/me": 75,
+    "GET /2/users/:id/tweets": 900,
+    "GET /2/tweets": 900,
+    "POST /2/tweets": 200,
+    "DELETE /2/tweets/:id": 50,
+}
+
+# (method, path pattern, rate-limited endpoint, handler method)
+_ROUTES = [
+    ("GET", re.compile(r"^/2/users/me$"), "GET /2/users/me", "_get_me"),
+    ("GET", re.compile(r"^/2/users/(\w+)/tweets$"), "GET /2/users/:id/tweets", "_get_users_tweets"),
+    ("GET", re.compile(r"^/2/tweets$"), "GET /2/tweets", "_get_tweets"),
+    ("POST", re.compile(r"^/2/tweets$"), "POST /2/tweets", "_create_tweet"),
+    ("DELETE", re.compile(r"^/2/tweets/(\d+)$"), "DELETE /2/tweets/:id", "_delete_tweet"),
+]
+
+class RateLimitWindow:
+    """Fixed-window request counter for one endpoint"""
+
+    def __init__(self, limit, window_seconds):
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.used = 0
+        self.reset_at = 0
+
+    def hit(self, now):
+        """Count a request; returns (allowed, headers)"""
+        if now >= self.reset_at:
+            self.used = 0
+            self.reset_at = int(now + self.window_seconds) + 1
+        allowed = self.used < self.limit
+        if allowed:
+            self.used += 1
+        headers = {
+            "x-rate-limit-limit": str(self.limit),
+            "x-rate-limit-remaining": str(self.limit - self.used),
+            "x-rate-limit-reset": str(self.reset_at),
+        }
+        return allowed, headers
+
+class TwitterSimulator:
+    """Serves a simulated timeline for one user until stopped"""
+
+    def __init__(self, tweets, limits=None, window_seconds=DEFAULT_WINDOW_SECONDS, timeline_cap=DEFAULT_TIMELINE_CAP,
+                 latency_ms=0.0, jitter_ms=0.0, fault_rate=0.0, seed=0, host="127.0.0.1", port=0):
+        self.tweets = {}
+        for tweet in tweets:
+            self.tweets[int(tweet.id)] = {
+                "id": str(tweet.id),
+                "text": tweet.text,
+                "created_at": (tweet.created_at or datetime.now(timezone.utc)).strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+            }
+        # Negated ids in ascending order, i.e. the timeline newest first, for bisecting pagination tokens
+        self._order = sorted(-tweet_id for tweet_id in self.tweets)
+        self.timeline_cap = timeline_cap
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.fault_rate = fault_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        limits = {**DEFAULT_LIMITS, **(limits or {})}
+        self.windows = {endpoint: RateLimitWindow(limit, window_seconds) for endpoint, limit in limits.items()}
+        self.stats = {"requests": 0, "rate_limited": 0, "faults": 0, "deleted": 0, "created": 0}
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def start(self):
+        """Start serving in a background thread and return the base URL"""
+        threading.Thread(target=self.serve_forever, name="twitter-simulator", daemon=True).start()
+        return self.url
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def handle(self, method, path, query, body):
+        """Return (status, payload, headers) for one request"""
+        for route_method, pattern, endpoint, handler in _ROUTES:
+            match = pattern.match(path)
+            if route_method == method and match:
+                break
+        else:
+            return 404, {"title": "Not Found Error", "detail": f"{method} {path} is not simulated", "status": 404}, {}
+
+        with self._lock:
+            self.stats["requests"] += 1
+            allowed, headers = self.windows[endpoint].hit(time.time())
+            if not allowed:
+                self.stats["rate_limited"] += 1
+                return 429, {"title": "Too Many Requests", "detail": "Too Many Requests", "type": "about:blank",
+                             "status": 429}, headers
+            jitter = self._random.gauss(0.0, self.jitter_ms) if self.jitter_ms else 0.0
+            fault = self.fault_rate and self._random.random() < self.fault_rate
+
+        time.sleep(max(0.0, self.latency_ms + jitter) / 1000)
+        if fault:
+            with self._lock:
+                self.stats["faults"] += 1
+            return 503, {"title": "Service Unavailable", "detail": "Service Unavailable", "type": "about:blank",
+                         "status": 503}, headers
+
+        with self._lock:
+            status, payload = getattr(self, handler)(match, query, body)
+        return status, payload, headers
+
+    def _tweet_fields(self, tweet, query):
+        fields = set(",".join(query.get("tweet.fields", [])).split(","))
+        payload = {key: value for key, value in tweet.items() if key in ("id", "text") or key in fields}
+        # Always part of the v2 default fields
+        payload["edit_history_tweet_ids"] = [tweet["id"]]
+        return payload
+
+    def _get_me(self, match, query, body):
+        return 200, {"data": {"id": USER_ID, "name": "Simulated User", "username": USERNAME}}
+
+    def _get_users_tweets(self, match, query, body):
+        if match.group(1) != USER_ID:
+            return 404, {"title": "Not Found Error", "detail": f"Could not find user with id: [{match.group(1)}].",
+                         "status": 404}
+        max_results = int(query.get("max_results", ["10"])[0])
+        if not 5 <= max_results <= 100:
+            return 400, {"title": "Invalid Request", "detail": "max_results must be between 5 and 100", "status": 400}
+
+        # Tokens encode the last id served, so pages stay stable while tweets are deleted
+        token = query.get("pagination_token", [None])[0]
+        position = bisect.bisect_right(self._order, -int(token, 16)) if token else 0
+        end = len(self._order) if not self.timeline_cap else min(len(self._order), self.timeline_cap)
+        since_id = query.get("since_id", [None])[0]
+        if since_id:
+            # Newest first, so everything newer than since_id comes before it
+            end = min(end, bisect.bisect_left(self._order, -int(since_id)))
+        page = []
+        while position < end and len(page) < max_results:
+            tweet = self.tweets.get(-self._order[position])
+            if tweet is not None:
+                page.append(self._tweet_fields(tweet, query))
+            position += 1
+
+        meta = {"result_count": len(page)}
+        if page:
+            meta.update(newest_id=page[0]["id"], oldest_id=page[-1]["id"])
+            if position < end:
+                meta["next_token"] = format(int(page[-1]["id"]), "x")
+        return 200, ({"data": page, "meta": meta} if page else {"meta": meta})
+
+    def _get_tweets(self, match, query, body):
+        ids = [i for i in ",".join(query.get("ids", [])).split(",") if i]
+        data, errors = [], []
+        for tweet_id in ids:
+            tweet = self.tweets.get(int(tweet_id))
+            if tweet is None:
+                errors.append({"value": tweet_id, "detail": f"Could not find tweet with ids: [{tweet_id}].",
+                               "title": "Not Found Error", "resource_type": "tweet", "parameter": "ids",
+                               "resource_id": tweet_id,
+                               "type": "https://api.twitter.com/2/problems/resource-not-found"})
+            else:
+                data.append(self._tweet_fields(tweet, query))
+        payload = {}
+        if data:
+            payload["data"] = data
+        if errors:
+            payload["errors"] = errors
+        return 200, payload
+
+    def _create_tweet(self, match, query, body):
+        tweet_id = max(self.tweets, default=10**18) + 1
+        self.tweets[tweet_id] = {"id": str(tweet_id), "text": body.get("text", ""),
+                                 "created_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")}
+        self._order.insert(0, -tweet_id)
+        self.stats["created"] += 1
+        return 201, {"data": {"id": str(tweet_id), "text": body.get("text", "")}}
+
+    def _delete_tweet(self, match, query, body):
+        deleted = self.tweets.pop(int(match.group(1)), None) is not None
+        if deleted:
+            self.stats["deleted"] += 1
+        return 200, {"data": {"deleted": deleted}}
+
+    def _handler(self):
+        simulator = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _dispatch(self):
+                url = urlsplit(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}") if length else {}
+                status, payload, headers = simulator.handle(self.command, url.path, parse_qs(url.query), body)
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_DELETE = _dispatch
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve a local stand-in for the Twitter API v2 endpoints the cleaners use')
+    parser.add_argument('--port', type=int, default=8787, help='Port to listen on (default: 8787)')
+    parser.add_argument('--tweets', type=int, default=5000, help='Size of the synthetic timeline (default: 5000)')
+    parser.add_argument('--archive', help='Serve the tweets of a Twitter data export instead of a synthetic timeline')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the timeline, latency and faults')
+    parser.add_argument('--window-seconds', type=float, default=DEFAULT_WINDOW_SECONDS, help='Rate-limit window length (default: 900)')
+    parser.add_argument('--delete-limit', type=int, default=DEFAULT_LIMITS["DELETE /2/tweets/:id"], help='Deletions allowed per window (default: 50)')
+    parser.add_argument('--timeline-limit', type=int, default=DEFAULT_LIMITS["GET /2/users/:id/tweets"], help='Timeline pages allowed per window (default: 900)')
+    parser.add_argument('--timeline-cap', type=int, default=DEFAULT_TIMELINE_CAP, help='How many recent tweets the timeline reaches (0 for all; default: 3200)')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Latency added to every request')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='Standard deviation of the latency')
+    parser.add_argument('--fault-rate', type=float, default=0.0, help='Share of requests answered with 503 Service Unavailable')
+    args = parser.parse_args()
+
+    tweets = iter_archive_tweets(args.archive) if args.archive else synthetic_corpus(args.tweets, seed=args.seed)
+    limits = {"DELETE /2/tweets/:id": args.delete_limit, "GET /2/users/:id/tweets": args.timeline_limit}
+    simulator = TwitterSimulator(tweets, limits, args.window_seconds, args.timeline_cap,
+                                 args.latency_ms, args.jitter_ms, args.fault_rate, args.seed, port=args.port)
+    print(f"Twitter API simulator serving {len(simulator.tweets)} tweets on {simulator.url}")
+    print(f"Run the cleaner with TWITTER_API_BASE_URL={simulator.url}")
+    try:
+        simulator.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(f"Simulator stats: {simulator.stats}")
+
+if __name__ == "__main__":
+    main()